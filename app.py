@@ -9,14 +9,20 @@ Version: 2.1 Pro (Fixed)
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
 import pickle
-import warnings
-from streamlit_option_menu import option_menu
+import os
+import threading
 import time
+import uuid
+import warnings
+# Only what every run needs before the first paint is imported here: the snapshot manifest, the
+# rerun trace and the replay sidebar's defaults. Plotly figures and the analysis engines are
+# imported by the loader or page that uses them
+from stock_analysis.snapshot import load_table, read_manifest, SnapshotError, SNAPSHOT_DIR, TABLES, OPTIONAL_TABLES
+from stock_analysis.pyramid import PYRAMID_TABLES
+from stock_analysis.instrumentation import RunTrace, Profiler, PROFILE_MODES, span_logger
+from stock_analysis.replay import DEFAULT_REPLAY_DAYS, DEFAULT_SPEED, REPLAY_REFRESH_S, REPLAY_WAIT_S
 
 warnings.filterwarnings('ignore')
 
@@ -36,6 +42,21 @@ st.set_page_config(
     }
 )
 
+# ============================================================================
+# INSTRUMENTATION (SPANS PER RERUN, ?debug=1 PANEL, ?profile=cpu|memory)
+# ============================================================================
+
+debug_mode = st.query_params.get('debug') == '1'
+profile_mode = st.query_params.get('profile')
+profiler = Profiler(profile_mode) if profile_mode in PROFILE_MODES else None
+if profiler is not None:
+    profiler.start()
+
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex[:12]
+st.session_state['rerun_count'] = st.session_state.get('rerun_count', 0) + 1
+trace = RunTrace(st.session_state['session_id'], st.session_state['rerun_count'], logger=span_logger())
+
 # Premium Sunset Glow Palette with Gradients
 SUNSET_GLOW = {
     'dark_orange': '#FF6B35',
@@ -344,43 +365,6 @@ st.markdown(f"""
     </style>
 """, unsafe_allow_html=True)
 
-# ============================================================================
-# DATA LOADING WITH LOADING STATE
-# ============================================================================
-
-@st.cache_resource
-def load_processed_data():
-    """Load pre-processed data with error handling"""
-    try:
-        with open('./processed_data/processed_data.pkl', 'rb') as f:
-            data = pickle.load(f)
-        return data
-    except FileNotFoundError:
-        st.error("⚠️ Data not found. Please ensure processed_data.pkl exists in ./processed_data/")
-        return None
-    except Exception as e:
-        st.error(f"⚠️ Error loading data: {str(e)}")
-        return None
-
-# Loading State with Animation
-with st.spinner("🌅 Loading Market Data..."):
-    progress_bar = st.progress(0)
-    for i in range(100):
-        time.sleep(0.005)
-        progress_bar.progress(i + 1)
-    
-    data = load_processed_data()
-    progress_bar.empty()
-
-if data is None:
-    st.stop()
-
-master_df = data['master_data']
-metrics_df = data['metrics']
-correlation_matrix = data['correlation_matrix']
-monthly_df = data['monthly_performance']
-market_summary = data['market_summary']
-
 # ============================================================================
 # HEADER SECTION WITH ANIMATED TITLE
 # ============================================================================
@@ -408,6 +392,8 @@ st.markdown("""
 # ENHANCED SIDEBAR NAVIGATION
 # ============================================================================
 
+from streamlit_option_menu import option_menu
+
 with st.sidebar:
     st.markdown(f"""
         <div style='text-align: center; padding: 2rem 1rem;'>
@@ -447,12 +433,309 @@ with st.sidebar:
         }
     )
 
+# ============================================================================
+# DATA LOADING (LAZY, CACHED PER SNAPSHOT VERSION)
+# ============================================================================
+
+# Tables a page needs on top of metrics_df; the rest load on demand or are
+# warmed in the background after the first page has rendered
+PAGE_DATA = {
+    "Market Overview": ['master_data', 'alerts'],
+    "Volatility Analysis": ['rolling_engine'],
+    "Cumulative Returns": ['price_panel'],
+    "Sector Analysis": ['sector_performance'],
+    "Correlation Matrix": ['correlation_matrix', 'pair_index'],
+    "Monthly Trends": ['monthly_performance'],
+    "Stock Comparator": ['price_panel', 'indicator_engine'],
+}
+
+# Set when a `python -m stock_analysis.shared_panel` publisher runs next to the
+# workers: the price panel and correlation matrix are mapped from shared memory
+SHARED_PANEL = os.environ.get('STOCK_DASHBOARD_SHARED_PANEL') == '1'
+
+def load_manifest():
+    """Current snapshot manifest, or None to fall back to processed_data.pkl"""
+    try:
+        return read_manifest(SNAPSHOT_DIR)
+    except SnapshotError:
+        return None
+    except Exception as e:
+        st.warning(f"⚠️ Snapshot unreadable, falling back to pickle: {str(e)}")
+        return None
+
+@st.cache_resource(show_spinner=False)
+def get_shared_cache():
+    """Host-wide SQLite cache shared by every worker and kept across restarts (None if unusable)"""
+    import sqlite3
+    from stock_analysis.disk_cache import DiskCache
+    try:
+        return DiskCache()
+    except (OSError, sqlite3.Error) as e:
+        print(f"Warning: shared disk cache disabled: {e}")
+        return None
+
+def shared_result(key, snapshot_version, compute):
+    """compute() once per host and snapshot version; per-process only for the pickle fallback"""
+    cache = get_shared_cache()
+    if cache is None or snapshot_version is None:
+        return compute()
+    cache.use_version(snapshot_version)
+    return cache.get_or_compute(key, snapshot_version, compute)
+
+@st.cache_resource(show_spinner=False)
+def load_pickle_data():
+    """Load pre-processed data from the legacy pickle"""
+    with open('./processed_data/processed_data.pkl', 'rb') as f:
+        return pickle.load(f)
+
+@st.cache_resource(show_spinner=False, max_entries=1)
+def attach_shared_panel(snapshot_version):
+    """(price panel, correlation matrix) published in shared memory, or None to build them in-process"""
+    if not SHARED_PANEL or snapshot_version is None:
+        return None
+    from stock_analysis.shared_panel import SharedPanelError, attach_panel
+    try:
+        shared = attach_panel(snapshot_version)
+    except SharedPanelError as e:
+        print(f"Warning: {e}; building the price panel in this worker")
+        return None
+    return shared
+
+@st.cache_resource(show_spinner=False)
+def attached_versions():
+    """Snapshot versions this worker has run with, and the lock a version switch holds"""
+    return {'seen': set(), 'lock': threading.Lock()}
+
+def release_previous_versions(snapshot_version):
+    """
+    Unmap the shared memory of older snapshot versions once nothing in this
+    worker views it. The first run with a new version drops the cached views
+    of the previous one, before anything loads the new one (other runs wait
+    on the lock); every run then retries the detach.
+    """
+    if not SHARED_PANEL or snapshot_version is None:
+        return
+    from stock_analysis.shared_panel import detach
+    versions = attached_versions()
+    with versions['lock']:
+        if snapshot_version not in versions['seen']:
+            if versions['seen']:
+                for loader in (load_table_cached, load_price_panel, load_pair_index, load_rolling_engine,
+                               load_indicator_engine):
+                    loader.clear()
+            versions['seen'].add(snapshot_version)
+    detach(snapshot_version)
+
+@st.cache_resource(show_spinner=False, max_entries=2 * (len(TABLES) + len(OPTIONAL_TABLES)))
+def load_table_cached(name, snapshot_version, _manifest):
+    """One table of the given snapshot version (memory-mapped), or from the pickle"""
+    if snapshot_version is None:
+        return load_pickle_data()[name]
+    if name == 'correlation_matrix' and attach_shared_panel(snapshot_version) is not None:
+        return attach_shared_panel(snapshot_version)[1]
+    return load_table(name, SNAPSHOT_DIR, _manifest)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_price_panel(snapshot_version, _manifest):
+    """Dense date x symbol price panel (with its cumulative-growth matrix), built once per host and snapshot version"""
+    from stock_analysis.panel import build_panel
+    shared = attach_shared_panel(snapshot_version)
+    if shared is not None:
+        return shared[0]
+    return shared_result('price_panel', snapshot_version,
+                         lambda: build_panel(load_table_cached('master_data', snapshot_version, _manifest)))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_pair_index(snapshot_version, _manifest):
+    """Correlation pairs sorted once per host and snapshot version"""
+    from stock_analysis.correlation import PairIndex
+    return shared_result('pair_index', snapshot_version,
+                         lambda: PairIndex(load_table_cached('correlation_matrix', snapshot_version, _manifest)))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_sector_performance(snapshot_version, _manifest):
+    """Sector Analysis aggregates, computed once per host and snapshot version"""
+    from stock_analysis.metrics import compute_sector_performance
+    return shared_result('sector_performance', snapshot_version,
+                         lambda: compute_sector_performance(load_table_cached('metrics', snapshot_version, _manifest)))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_rolling_engine(snapshot_version, _manifest):
+    """Rolling-window statistics over the price panel; results memoized per snapshot version"""
+    from stock_analysis.rolling import RollingEngine
+    return RollingEngine(load_price_panel(snapshot_version, _manifest))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_indicator_engine(snapshot_version, _manifest):
+    """Technical indicators over the price panel; each one computed once per snapshot version on first use"""
+    from stock_analysis.indicators import IndicatorEngine
+    return IndicatorEngine(load_price_panel(snapshot_version, _manifest))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def load_alerts(snapshot_version, _manifest):
+    """Anomaly alerts from the snapshot (detected once per host for older snapshots and the pickle)"""
+    from stock_analysis.anomalies import detect_anomalies
+    if snapshot_version is not None and 'alerts' in _manifest['tables']:
+        return load_table_cached('alerts', snapshot_version, _manifest)
+    return shared_result('alerts', snapshot_version,
+                         lambda: detect_anomalies(load_table_cached('master_data', snapshot_version, _manifest))[1])
+
+@st.cache_resource(show_spinner=False, max_entries=2 * len(PYRAMID_TABLES))
+def load_bars(resolution, snapshot_version, _manifest):
+    """Weekly / monthly / quarterly / yearly OHLCV bars from the snapshot (built on the fly for older ones)"""
+    from stock_analysis.pyramid import build_bars
+    name = f"bars_{resolution}"
+    if snapshot_version is not None and name in _manifest['tables']:
+        return load_table_cached(name, snapshot_version, _manifest)
+    return build_bars(load_table_cached('master_data', snapshot_version, _manifest), resolution)
+
+@st.cache_resource(show_spinner=False, max_entries=512)
+def load_chart_series(snapshot_version, kind, symbol, time_range, budget, _manifest):
+    """
+    One line-chart series ('close' or 'cumulative') over a time range, read
+    from the coarsest pyramid level that covers it and decimated to budget points
+    """
+    from stock_analysis.decimation import decimate_series
+    from stock_analysis.pyramid import bars_in_range
+    panel = load_price_panel(snapshot_version, _manifest)
+    start = range_start(panel, time_range)
+    resolution = chart_resolution(panel, time_range)
+    if kind == 'cumulative':
+        series = panel.cumulative_returns([symbol], start=start)[symbol] * 100
+        if resolution != 'daily':
+            # Sample the daily-compounded curve at each bar's last trading day
+            series = series.loc[bars_in_range(load_bars(resolution, snapshot_version, _manifest), symbol, start).index]
+    elif resolution != 'daily':
+        series = bars_in_range(load_bars(resolution, snapshot_version, _manifest), symbol, start)['Close']
+    else:
+        history = panel.symbol_frame(symbol, ['Close'])
+        series = history.set_index('Date')['Close'].loc[start:]
+    return decimate_series(series, budget, DECIMATION_METHOD)
+
+@st.cache_resource(show_spinner=False, max_entries=512)
+def load_indicator_series(snapshot_version, indicator, symbol, time_range, budget, _manifest):
+    """One indicator line over a time range, sampled like load_chart_series and decimated to budget points"""
+    from stock_analysis.decimation import decimate_series
+    from stock_analysis.pyramid import bars_in_range
+    panel = load_price_panel(snapshot_version, _manifest)
+    start = range_start(panel, time_range)
+    resolution = chart_resolution(panel, time_range)
+    series = load_indicator_engine(snapshot_version, _manifest).series(symbol, indicator).loc[start:]
+    if resolution != 'daily':
+        # Daily indicator values at each bar's last trading day, aligned with the bar closes
+        series = series.loc[bars_in_range(load_bars(resolution, snapshot_version, _manifest), symbol, start).index]
+    return decimate_series(series.dropna(), budget, DECIMATION_METHOD)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def start_cache_warmup(snapshot_version, _manifest):
+    """Load every remaining table and the price panel in a background thread, once per snapshot"""
+    from stock_analysis.pyramid import BAR_RESOLUTIONS
+    def warm():
+        for name in TABLES:
+            load_table_cached(name, snapshot_version, _manifest)
+        load_price_panel(snapshot_version, _manifest)
+        load_pair_index(snapshot_version, _manifest)
+        load_sector_performance(snapshot_version, _manifest)
+        load_rolling_engine(snapshot_version, _manifest)
+        load_indicator_engine(snapshot_version, _manifest)
+        for resolution in BAR_RESOLUTIONS:
+            load_bars(resolution, snapshot_version, _manifest)
+
+    thread = threading.Thread(target=warm, name="cache-warmup", daemon=True)
+    thread.start()
+    return thread
+
+# Cumulative Returns / Stock Comparator pages: look-back windows ending at the latest date (None = full history)
+TIME_RANGES = {
+    "All": None,
+    "1Y": pd.DateOffset(years=1),
+    "6M": pd.DateOffset(months=6),
+    "3M": pd.DateOffset(months=3),
+    "1M": pd.DateOffset(months=1),
+}
+MAX_CUMULATIVE_STOCKS = 10
+
+# Line charts send at most this many points per series (about two per pixel of a
+# full-width chart); longer series are decimated server-side, keeping peaks and troughs
+CHART_POINT_BUDGET = 2000
+DECIMATION_METHOD = 'minmax'
+
+def range_start(panel, time_range):
+    """First date of a TIME_RANGES window on the panel's date axis (None = full history)"""
+    offset = TIME_RANGES[time_range]
+    return panel.dates[-1] - offset if offset is not None else None
+
+def chart_resolution(panel, time_range):
+    """Pyramid level a line chart over time_range is drawn from ('daily' until the range spans years)"""
+    from stock_analysis.pyramid import select_resolution
+    start = range_start(panel, time_range)
+    return select_resolution(panel.dates[0] if start is None else start, panel.dates[-1])
+
+# Volatility Analysis page: background shading per market volatility regime
+REGIME_COLORS = {'Low': SUNSET_GLOW['success'], 'Normal': SUNSET_GLOW['peach'], 'High': SUNSET_GLOW['danger']}
+
+ALERT_LABELS = {
+    'VOLUME_SPIKE': "🔊 Volume Spike",
+    'GAP_UP': "⏫ Gap Up",
+    'GAP_DOWN': "⏬ Gap Down",
+    'RANGE_OUTLIER': "↕️ Range Outlier",
+}
+
+def get_data(name):
+    """Table (or a derived 'price_panel' / 'pair_index' / 'rolling_engine' / 'indicator_engine' / 'sector_performance' / 'alerts') for the current snapshot, loading it on first use"""
+    with trace.span(f"get_data:{name}"):
+        if name == 'price_panel':
+            return load_price_panel(snapshot_version, manifest)
+        if name == 'pair_index':
+            return load_pair_index(snapshot_version, manifest)
+        if name == 'rolling_engine':
+            return load_rolling_engine(snapshot_version, manifest)
+        if name == 'indicator_engine':
+            return load_indicator_engine(snapshot_version, manifest)
+        if name == 'sector_performance':
+            return load_sector_performance(snapshot_version, manifest)
+        if name == 'alerts':
+            return load_alerts(snapshot_version, manifest)
+        return load_table_cached(name, snapshot_version, manifest)
+
+trace.page = selected_page
+data_span = trace.start('data_load')
+manifest = load_manifest()
+snapshot_version = manifest['build_hash'] if manifest else None
+release_previous_versions(snapshot_version)
+
+# Real progress, tied to the loads this page needs - first load of a session only
+first_load = 'data_loaded' not in st.session_state
+load_steps = ['metrics'] + PAGE_DATA.get(selected_page, [])
+progress_bar = st.progress(0, text="🌅 Loading Market Data...") if first_load else None
+
+try:
+    for step, name in enumerate(load_steps):
+        if progress_bar is not None:
+            progress_bar.progress(step / len(load_steps), text=f"🌅 Loading {name.replace('_', ' ')}...")
+        get_data(name)
+    market_summary = manifest['market_summary'] if manifest else load_pickle_data()['market_summary']
+except FileNotFoundError:
+    st.error("⚠️ Data not found. Please ensure processed_data/snapshot or processed_data.pkl exists in ./processed_data/")
+    st.stop()
+except Exception as e:
+    st.error(f"⚠️ Error loading data: {str(e)}")
+    st.stop()
+
+if progress_bar is not None:
+    progress_bar.empty()
+    st.session_state['data_loaded'] = True
+trace.end(data_span, snapshot_version=snapshot_version, first_load=first_load)
+
+metrics_df = get_data('metrics')
+
 # ============================================================================
 # HELPER FUNCTIONS FOR VISUALIZATIONS
 # ============================================================================
 
 def create_gauge_chart(value, title, max_val=100):
     """Create a beautiful gauge chart for metrics"""
+    import plotly.graph_objects as go
     fig = go.Figure(go.Indicator(
         mode="gauge+number",
         value=value,
@@ -485,6 +768,29 @@ def create_gauge_chart(value, title, max_val=100):
     )
     return fig
 
+@st.cache_resource(show_spinner=False)
+def get_figure_cache():
+    """Figure cache shared by every session of this server process"""
+    from stock_analysis.figure_cache import FigureCache
+    return FigureCache()
+
+figure_cache = get_figure_cache()
+figure_cache.use_version(snapshot_version)
+
+def cached_figure(name, params, build):
+    """Figure `name` of the current page for these widget params; build() only runs on a cache miss"""
+    from stock_analysis.figure_cache import figure_key
+    with trace.span(f"figure:{name}") as span:
+        misses = figure_cache.misses
+        fig = figure_cache.get_or_build(figure_key(selected_page, name, params, snapshot_version), build)
+        span['attrs']['cache'] = 'miss' if figure_cache.misses > misses else 'hit'
+        return fig
+
+def render_chart(fig, **kwargs):
+    """st.plotly_chart inside a span: the figure's JSON serialization and hand-off to the frontend"""
+    with trace.span('plotly_chart', title=fig.layout.title.text):
+        st.plotly_chart(fig, **kwargs)
+
 def style_plotly_chart(fig, title):
     """Apply consistent styling to Plotly charts"""
     fig.update_layout(
@@ -521,12 +827,127 @@ def style_plotly_chart(fig, title):
     )
     return fig
 
+# ============================================================================
+# MARKET REPLAY (ASYNCIO FEED, FRAGMENT REFRESH)
+# ============================================================================
+
+# The replay runs on its own event-loop thread per session; only the live
+# panel fragment reruns to pick up new days, never the whole script
+REPLAY_SOURCES = {"Data folder (YAML days)": 'yaml', "Synthetic feed": 'synthetic'}
+REPLAY_DATA_DIR = os.environ.get('STOCK_DASHBOARD_DATA', 'data')
+
+with st.sidebar:
+    replay = st.session_state.get('market_replay')
+    with st.expander("🎬 Market Replay", expanded=replay is not None):
+        replay_source = st.radio("Feed", list(REPLAY_SOURCES), key='replay_source')
+        replay_speed = st.slider("Speed (trading days / s)", 0.5, 20.0, DEFAULT_SPEED, 0.5, key='replay_speed')
+        replay_days = st.number_input("Replay the last N trading days", 5, 250, DEFAULT_REPLAY_DAYS,
+                                      key='replay_days', disabled=REPLAY_SOURCES[replay_source] == 'synthetic')
+        play_col, pause_col, stop_col = st.columns(3)
+        if play_col.button("▶️", help="Start / resume", use_container_width=True):
+            if replay is None or not replay.running:
+                from stock_analysis.replay import MarketReplay
+                with st.spinner("Seeding replay state..."):
+                    replay = MarketReplay(get_data('master_data'), data_folder=REPLAY_DATA_DIR,
+                                          source=REPLAY_SOURCES[replay_source], speed=replay_speed,
+                                          replay_days=int(replay_days))
+                    replay.start()
+                st.session_state['market_replay'] = replay
+            else:
+                replay.resume()
+        if pause_col.button("⏸️", help="Pause", use_container_width=True) and replay is not None:
+            replay.pause()
+        if stop_col.button("⏹️", help="Stop and close the replay", use_container_width=True) and replay is not None:
+            replay.stop()
+            del st.session_state['market_replay']
+            replay = None
+        if replay is not None:
+            replay.set_speed(replay_speed)
+            st.caption(f"Replay {replay.status} • {REPLAY_SOURCES[replay_source]} feed from "
+                       f"{replay.start_date:%b %d, %Y} • the live panel is on Market Overview")
+
+@st.fragment(run_every=REPLAY_REFRESH_S if replay is not None and replay.running else None)
+def live_replay_panel(replay):
+    """Live KPIs, breadth and movers of the replayed day; reruns on its own every REPLAY_REFRESH_S"""
+    import plotly.graph_objects as go
+    from stock_analysis.replay import top_movers
+    started = time.perf_counter()
+    # Fragment reruns long-poll: a newer day is drawn as soon as it is applied.
+    # The first draw of a full script run must not hold up the rest of the page.
+    full_run = st.session_state.get('replay_drawn_run') != trace.run
+    st.session_state['replay_drawn_run'] = trace.run
+    view = replay.view(wait=0.0 if full_run else REPLAY_WAIT_S)
+    summary = view['market_summary']
+    progress = f"day {view['seq']}/{replay.total_days}" if replay.total_days is not None else f"day {view['seq']}"
+
+    st.markdown(f"""
+        <div class='glass-card' style='border-left: 4px solid {SUNSET_GLOW["coral"]};'>
+            <h4 style='margin: 0; color: {SUNSET_GLOW["muted_text"]}; font-size: 0.9rem;'>🎬 Market Replay • {replay.status}</h4>
+            <h2 style='margin: 10px 0; color: white; font-size: 2rem;'>{view['date']:%B %d, %Y}</h2>
+            <p style='margin: 0; color: {SUNSET_GLOW["muted_text"]}; font-size: 0.85rem;'>
+                {progress} • {replay.speed:g} trading days / s
+            </p>
+        </div>
+    """, unsafe_allow_html=True)
+    if replay.total_days:
+        st.progress(min(view['seq'] / replay.total_days, 1.0))
+    if replay.error is not None:
+        st.error(f"⚠️ Replay stopped: {replay.error}")
+
+    breadth = view['breadth']
+    today = breadth.iloc[-1] if len(breadth) else None
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Green Stocks", summary['Green_Stocks'], f"{summary['Green_Percentage']:.1f}% of market")
+    col2.metric("Red Stocks", summary['Red_Stocks'], f"-{summary['Red_Percentage']:.1f}% of market")
+    col3.metric("Avg Return", f"{summary['Avg_Return']:.2f}%")
+    col4.metric("Advancers / Decliners", f"{today['Advancers']} / {today['Decliners']}" if today is not None else "-",
+                f"{today['Avg_Change']:+.2f}% avg" if today is not None else None)
+
+    if len(breadth):
+        # Live data: drawn fresh on every tick, so the figure cache is bypassed
+        fig = go.Figure(go.Bar(
+            x=breadth['Date'], y=breadth['Advancers'] - breadth['Decliners'],
+            marker_color=np.where(breadth['Advancers'] >= breadth['Decliners'],
+                                  SUNSET_GLOW['success'], SUNSET_GLOW['danger']),
+            hovertemplate='%{x|%b %d, %Y}<br>Advancers - Decliners: %{y}<extra></extra>'
+        ))
+        fig = style_plotly_chart(fig, "📶 Replay Market Breadth")
+        fig.update_layout(height=300, margin=dict(l=20, r=20, t=60, b=20))
+        st.plotly_chart(fig, use_container_width=True)
+
+    movers = top_movers(view)
+    if not movers.empty:
+        st.dataframe(movers, hide_index=True, use_container_width=True)
+
+    if len(view['alerts']):
+        st.markdown("**🚨 Alerts raised during the replay**")
+        st.dataframe(view['alerts'].assign(Date=view['alerts']['Date'].dt.date,
+                                           Alert=view['alerts']['Alert'].map(ALERT_LABELS)).round(2),
+                     hide_index=True, use_container_width=True)
+
+    replay.record_render(view, started)
+    latency = replay.latency_summary()
+    if not latency.empty:
+        st.caption(f"⏱ Tick-to-screen p50 {latency.loc['total_ms', 'p50']:.0f} ms • "
+                   f"p95 {latency.loc['total_ms', 'p95']:.0f} ms over {len(replay.latency)} ticks • "
+                   f"{replay.skipped} days replaced before they were drawn")
+        if debug_mode:
+            st.dataframe(latency, use_container_width=True)
+
 # ============================================================================
 # MARKET OVERVIEW PAGE (ENHANCED)
 # ============================================================================
 
+page_span = trace.start(f"page:{selected_page}")
+
 if selected_page == "Market Overview":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
+    import plotly.graph_objects as go
+    from stock_analysis.anomalies import ALERT_TYPES, query_alerts
+    master_df = get_data('master_data')
+
+    if replay is not None:
+        live_replay_panel(replay)
     
     # Key Metrics Row
     col1, col2, col3, col4 = st.columns(4)
@@ -594,35 +1015,86 @@ if selected_page == "Market Overview":
     st.markdown("<div class='glass-card' style='margin-top: 2rem;'>", unsafe_allow_html=True)
     st.subheader("🎯 Market Sentiment Distribution")
     
-    fig_pie = go.Figure(data=[go.Pie(
-        labels=['Green Stocks', 'Red Stocks'],
-        values=[market_summary['Green_Stocks'], market_summary['Red_Stocks']],
-        hole=0.65,
-        marker=dict(
-            colors=[SUNSET_GLOW['success'], SUNSET_GLOW['danger']],
-            line=dict(color='rgba(255,255,255,0.2)', width=2)
-        ),
-        textinfo='label+percent',
-        textfont=dict(size=16, color='white', family='Inter'),
-        hovertemplate='<b>%{label}</b><br>Stocks: %{value}<br>Share: %{percent}<extra></extra>'
-    )])
+    def build_sentiment_pie():
+        fig_pie = go.Figure(data=[go.Pie(
+            labels=['Green Stocks', 'Red Stocks'],
+            values=[market_summary['Green_Stocks'], market_summary['Red_Stocks']],
+            hole=0.65,
+            marker=dict(
+                colors=[SUNSET_GLOW['success'], SUNSET_GLOW['danger']],
+                line=dict(color='rgba(255,255,255,0.2)', width=2)
+            ),
+            textinfo='label+percent',
+            textfont=dict(size=16, color='white', family='Inter'),
+            hovertemplate='<b>%{label}</b><br>Stocks: %{value}<br>Share: %{percent}<extra></extra>'
+        )])
+        
+        fig_pie.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            showlegend=False,
+            margin=dict(l=20, r=20, t=60, b=20),
+            height=500,
+            annotations=[dict(
+                text=f"<b>{market_summary['Green_Stocks']}</b><br><span style='font-size:14px;color:#94a3b8'>Advancing</span>",
+                x=0.5, y=0.5,
+                font_size=28,
+                font_color=SUNSET_GLOW['success'],
+                showarrow=False,
+                font_family='Space Grotesk'
+            )]
+        )
+        return fig_pie
     
-    fig_pie.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        showlegend=False,
-        margin=dict(l=20, r=20, t=60, b=20),
-        height=500,
-        annotations=[dict(
-            text=f"<b>{market_summary['Green_Stocks']}</b><br><span style='font-size:14px;color:#94a3b8'>Advancing</span>",
-            x=0.5, y=0.5,
-            font_size=28,
-            font_color=SUNSET_GLOW['success'],
-            showarrow=False,
-            font_family='Space Grotesk'
-        )]
-    )
-    st.plotly_chart(fig_pie, use_container_width=True)
+    fig_pie = cached_figure("sentiment_pie", None, build_sentiment_pie)
+    render_chart(fig_pie, use_container_width=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Anomaly alerts (volume spikes, opening gaps, range outliers) from the streaming detector
+    st.markdown("<div class='glass-card' style='margin-top: 2rem;'>", unsafe_allow_html=True)
+    st.subheader("🚨 Market Alerts")
+    alerts_df = get_data('alerts')
+
+    col1, col2, col3, col4 = st.columns([2, 2, 1, 1])
+    with col1:
+        alert_types = st.multiselect("Alert Types", ALERT_TYPES, default=ALERT_TYPES,
+                                     format_func=ALERT_LABELS.get, key='alert_types')
+    with col2:
+        alert_symbols = st.multiselect("Stocks", sorted(alerts_df['Symbol'].unique()), key='alert_symbols',
+                                       placeholder="All stocks")
+    with col3:
+        alert_range = st.selectbox("Period", list(TIME_RANGES), index=list(TIME_RANGES).index("3M"),
+                                   key='alert_range')
+    with col4:
+        alert_min_z = st.slider("Min |z|", 3.0, 10.0, 3.0, 0.5, key='alert_min_z')
+
+    alert_start = None
+    if TIME_RANGES[alert_range] is not None and len(alerts_df):
+        alert_start = alerts_df['Date'].max() - TIME_RANGES[alert_range]
+    with trace.span('query_alerts'):
+        shown = query_alerts(alerts_df, types=alert_types, symbols=alert_symbols, start=alert_start,
+                             min_z=alert_min_z)
+
+    count_cols = st.columns(len(ALERT_TYPES))
+    counts = shown['Alert'].value_counts()
+    for col, alert in zip(count_cols, ALERT_TYPES):
+        col.metric(ALERT_LABELS[alert], int(counts.get(alert, 0)))
+
+    if shown.empty:
+        st.info("No alerts match these filters")
+    else:
+        st.dataframe(
+            shown.assign(Date=shown['Date'].dt.date, Alert=shown['Alert'].map(ALERT_LABELS)),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                'Value': st.column_config.NumberColumn("Value", format="%.2f",
+                                                       help="Volume, opening gap % or intraday range %"),
+                'Baseline': st.column_config.NumberColumn("Baseline", format="%.2f",
+                                                          help="Typical volume, daily move % or range % before the day"),
+                'Z_Score': st.column_config.NumberColumn("z", format="%.1f"),
+            }
+        )
     st.markdown("</div>", unsafe_allow_html=True)
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -633,32 +1105,37 @@ if selected_page == "Market Overview":
 elif selected_page == "Top Performers":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("🏆 Elite Performers - Top 10 Gainers")
+    import plotly.graph_objects as go
     
     top_10 = metrics_df.head(10).copy()
     top_10['Return_Val'] = top_10['Yearly_Return']
     
     # Interactive Bar Chart
-    fig = go.Figure()
-    
-    colors_list = [SUNSET_GLOW['success'] if x > 50 else SUNSET_GLOW['peach'] if x > 25 else SUNSET_GLOW['coral'] for x in top_10['Yearly_Return']]
-    
-    fig.add_trace(go.Bar(
-        x=top_10['Symbol'],
-        y=top_10['Yearly_Return'],
-        marker=dict(
-            color=colors_list,
-            line=dict(color='rgba(255,255,255,0.2)', width=2)
-        ),
-        text=top_10['Yearly_Return'].apply(lambda x: f'+{x:.2f}%'),
-        textposition='outside',
-        textfont=dict(color=SUNSET_GLOW['white_text'], size=13, family='Inter'),
-        hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<br>Rank: %{customdata}<extra></extra>',
-        customdata=[f'#{i+1}' for i in range(len(top_10))]
-    ))
+    def build_top_performers_bar():
+        fig = go.Figure()
+        
+        colors_list = [SUNSET_GLOW['success'] if x > 50 else SUNSET_GLOW['peach'] if x > 25 else SUNSET_GLOW['coral'] for x in top_10['Yearly_Return']]
+        
+        fig.add_trace(go.Bar(
+            x=top_10['Symbol'],
+            y=top_10['Yearly_Return'],
+            marker=dict(
+                color=colors_list,
+                line=dict(color='rgba(255,255,255,0.2)', width=2)
+            ),
+            text=top_10['Yearly_Return'].apply(lambda x: f'+{x:.2f}%'),
+            textposition='outside',
+            textfont=dict(color=SUNSET_GLOW['white_text'], size=13, family='Inter'),
+            hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<br>Rank: %{customdata}<extra></extra>',
+            customdata=[f'#{i+1}' for i in range(len(top_10))]
+        ))
+        
+        fig = style_plotly_chart(fig, "Top 10 Performing Stocks - Annual Returns")
+        fig.update_layout(height=500, showlegend=False)
+        return fig
     
-    fig = style_plotly_chart(fig, "Top 10 Performing Stocks - Annual Returns")
-    fig.update_layout(height=500, showlegend=False)
-    st.plotly_chart(fig, use_container_width=True)
+    fig = cached_figure("top_performers_bar", None, build_top_performers_bar)
+    render_chart(fig, use_container_width=True)
     
     # Detailed Cards
     st.subheader("💎 Detailed Performance Metrics")
@@ -700,28 +1177,33 @@ elif selected_page == "Top Performers":
 elif selected_page == "Worst Performers":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("⚠️ Risk Alert - Top 10 Decliners")
+    import plotly.graph_objects as go
     
     worst_10 = metrics_df.tail(10).copy().sort_values('Yearly_Return')
     
-    colors_list = [SUNSET_GLOW['danger'] if x < -30 else '#f87171' if x < -15 else '#fca5a5' for x in worst_10['Yearly_Return']]
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=worst_10['Symbol'],
-        y=worst_10['Yearly_Return'],
-        marker=dict(
-            color=colors_list,
-            line=dict(color='rgba(255,255,255,0.2)', width=2)
-        ),
-        text=worst_10['Yearly_Return'].apply(lambda x: f'{x:.2f}%'),
-        textposition='outside',
-        textfont=dict(color=SUNSET_GLOW['white_text'], size=13)
-    ))
+    def build_worst_performers_bar():
+        colors_list = [SUNSET_GLOW['danger'] if x < -30 else '#f87171' if x < -15 else '#fca5a5' for x in worst_10['Yearly_Return']]
+        
+        fig = go.Figure()
+        
+        fig.add_trace(go.Bar(
+            x=worst_10['Symbol'],
+            y=worst_10['Yearly_Return'],
+            marker=dict(
+                color=colors_list,
+                line=dict(color='rgba(255,255,255,0.2)', width=2)
+            ),
+            text=worst_10['Yearly_Return'].apply(lambda x: f'{x:.2f}%'),
+            textposition='outside',
+            textfont=dict(color=SUNSET_GLOW['white_text'], size=13)
+        ))
+        
+        fig = style_plotly_chart(fig, "Stocks Requiring Attention - Annual Performance")
+        fig.update_layout(height=500)
+        return fig
     
-    fig = style_plotly_chart(fig, "Stocks Requiring Attention - Annual Performance")
-    fig.update_layout(height=500)
-    st.plotly_chart(fig, use_container_width=True)
+    fig = cached_figure("worst_performers_bar", None, build_worst_performers_bar)
+    render_chart(fig, use_container_width=True)
     
     # Risk Indicators
     st.subheader("🚨 Risk Assessment Cards")
@@ -750,6 +1232,10 @@ elif selected_page == "Worst Performers":
 elif selected_page == "Volatility Analysis":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("📊 Volatility & Risk Assessment")
+    import plotly.express as px
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from stock_analysis.rolling import ROLLING_WINDOWS, regime_spans
     
     st.markdown("""
         <div class='glass-card info-box' style='margin-bottom: 2rem;'>
@@ -765,74 +1251,181 @@ elif selected_page == "Volatility Analysis":
     top_volatile = metrics_df.nlargest(10, 'Volatility')
     
     # Volatility Scatter Plot
-    fig = px.scatter(
-        metrics_df,
-        x='Volatility',
-        y='Yearly_Return',
-        color='Yearly_Return',
-        size='Avg_Price',
-        hover_data=['Symbol', 'Sector'],
-        color_continuous_scale=['#ef476f', '#ffd166', '#06d6a0'],
-        title="Risk vs Return Analysis - Complete Market View"
-    )
-    
-    fig = style_plotly_chart(fig, "Risk-Return Matrix")
-    fig.update_traces(
-        marker=dict(
-            line=dict(color='rgba(255,255,255,0.3)', width=1),
-            sizemode='area',
-            sizeref=2.*max(metrics_df['Avg_Price'])/(40.**2)
-        ),
-        selector=dict(mode='markers')
-    )
-    fig.add_hline(y=0, line_dash="dash", line_color="rgba(255,255,255,0.2)", line_width=2)
-    fig.add_vline(x=metrics_df['Volatility'].median(), line_dash="dash", line_color="rgba(255,255,255,0.2)", line_width=2)
-    fig.add_annotation(x=metrics_df['Volatility'].max()*0.9, y=metrics_df['Yearly_Return'].max()*0.9,
-                      text="High Risk<br>High Return", showarrow=False, font=dict(color='white', size=12),
-                      bgcolor='rgba(255,255,255,0.1)', bordercolor='rgba(255,255,255,0.2)', borderwidth=1)
+    def build_risk_return_scatter():
+        fig = px.scatter(
+            metrics_df,
+            x='Volatility',
+            y='Yearly_Return',
+            color='Yearly_Return',
+            size='Avg_Price',
+            hover_data=['Symbol', 'Sector'],
+            color_continuous_scale=['#ef476f', '#ffd166', '#06d6a0'],
+            title="Risk vs Return Analysis - Complete Market View"
+        )
+        
+        fig = style_plotly_chart(fig, "Risk-Return Matrix")
+        fig.update_traces(
+            marker=dict(
+                line=dict(color='rgba(255,255,255,0.3)', width=1),
+                sizemode='area',
+                sizeref=2.*max(metrics_df['Avg_Price'])/(40.**2)
+            ),
+            selector=dict(mode='markers')
+        )
+        fig.add_hline(y=0, line_dash="dash", line_color="rgba(255,255,255,0.2)", line_width=2)
+        fig.add_vline(x=metrics_df['Volatility'].median(), line_dash="dash", line_color="rgba(255,255,255,0.2)", line_width=2)
+        fig.add_annotation(x=metrics_df['Volatility'].max()*0.9, y=metrics_df['Yearly_Return'].max()*0.9,
+                          text="High Risk<br>High Return", showarrow=False, font=dict(color='white', size=12),
+                          bgcolor='rgba(255,255,255,0.1)', bordercolor='rgba(255,255,255,0.2)', borderwidth=1)
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    fig = cached_figure("risk_return_scatter", None, build_risk_return_scatter)
+    render_chart(fig, use_container_width=True)
     
     # Top Volatile Stocks
     col1, col2 = st.columns([2, 1])
     
     with col1:
         st.subheader("⚡ Highest Volatility Stocks")
-        fig_bar = go.Figure(go.Bar(
-            x=top_volatile['Symbol'],
-            y=top_volatile['Volatility'],
-            marker=dict(
-                color=top_volatile['Volatility'],
-                colorscale='Reds',
-                line=dict(color='rgba(255,255,255,0.2)', width=2)
-            ),
-            text=top_volatile['Volatility'].apply(lambda x: f'{x:.2f}'),
-            textposition='auto',
-            textfont=dict(color='white')
-        ))
-        fig_bar = style_plotly_chart(fig_bar, "Volatility Rankings")
-        fig_bar.update_layout(height=450)
-        st.plotly_chart(fig_bar, use_container_width=True)
+        def build_volatility_bar():
+            fig_bar = go.Figure(go.Bar(
+                x=top_volatile['Symbol'],
+                y=top_volatile['Volatility'],
+                marker=dict(
+                    color=top_volatile['Volatility'],
+                    colorscale='Reds',
+                    line=dict(color='rgba(255,255,255,0.2)', width=2)
+                ),
+                text=top_volatile['Volatility'].apply(lambda x: f'{x:.2f}'),
+                textposition='auto',
+                textfont=dict(color='white')
+            ))
+            fig_bar = style_plotly_chart(fig_bar, "Volatility Rankings")
+            fig_bar.update_layout(height=450)
+            return fig_bar
+        
+        fig_bar = cached_figure("volatility_bar", None, build_volatility_bar)
+        render_chart(fig_bar, use_container_width=True)
     
     with col2:
         st.subheader("📈 Distribution")
-        fig_hist = go.Figure(go.Histogram(
-            x=metrics_df['Volatility'],
-            nbinsx=20,
-            marker=dict(
-                color=SUNSET_GLOW['coral'],
-                line=dict(color='rgba(255,255,255,0.2)', width=1)
-            ),
-            opacity=0.8
+        def build_volatility_histogram():
+            fig_hist = go.Figure(go.Histogram(
+                x=metrics_df['Volatility'],
+                nbinsx=20,
+                marker=dict(
+                    color=SUNSET_GLOW['coral'],
+                    line=dict(color='rgba(255,255,255,0.2)', width=1)
+                ),
+                opacity=0.8
+            ))
+            fig_hist = style_plotly_chart(fig_hist, "Volatility Spread")
+            fig_hist.update_layout(
+                height=450,
+                bargap=0.1,
+                xaxis_title="Volatility (%)",
+                yaxis_title="Frequency"
+            )
+            return fig_hist
+        
+        fig_hist = cached_figure("volatility_histogram", None, build_volatility_histogram)
+        render_chart(fig_hist, use_container_width=True)
+    
+    # Volatility Regimes Over Time
+    st.subheader("🌊 Volatility Regimes")
+    rolling_engine = get_data('rolling_engine')
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        rolling_window = st.selectbox("Rolling Window (days)", ROLLING_WINDOWS, index=1)
+    with col2:
+        regime_stocks = st.multiselect(
+            "Stocks to Track",
+            options=metrics_df['Symbol'].tolist(),
+            default=top_volatile.head(3)['Symbol'].tolist()
+        )
+    
+    regimes = rolling_engine.volatility_regimes(rolling_window)
+    
+    def build_volatility_regimes():
+        rolling_vol = rolling_engine.volatility(rolling_window)
+        # One shapes list instead of add_vrect per span (each call re-validates every shape)
+        fig = go.Figure(layout=dict(shapes=[
+            dict(type='rect', xref='x', yref='paper', x0=start, x1=end, y0=0, y1=1,
+                 fillcolor=REGIME_COLORS[label], opacity=0.12, line_width=0, layer='below')
+            for start, end, label in regime_spans(regimes)
+        ]))
+        
+        fig.add_trace(go.Scatter(
+            x=regimes.index,
+            y=regimes['Market_Volatility'],
+            name='Market (median)',
+            mode='lines',
+            line=dict(color=SUNSET_GLOW['white_text'], width=3, dash='dot')
         ))
-        fig_hist = style_plotly_chart(fig_hist, "Volatility Spread")
-        fig_hist.update_layout(
-            height=450,
-            bargap=0.1,
-            xaxis_title="Volatility (%)",
-            yaxis_title="Frequency"
+        colors = [SUNSET_GLOW['coral'], SUNSET_GLOW['accent'], SUNSET_GLOW['pink'], SUNSET_GLOW['success'], SUNSET_GLOW['peach']]
+        for idx, symbol in enumerate(regime_stocks):
+            fig.add_trace(go.Scatter(
+                x=rolling_vol.index,
+                y=rolling_vol[symbol],
+                name=symbol,
+                mode='lines',
+                line=dict(color=colors[idx % len(colors)], width=2)
+            ))
+        
+        fig = style_plotly_chart(fig, f"{rolling_window}-Day Rolling Volatility & Market Regimes")
+        fig.update_layout(
+            height=500,
+            xaxis_title="Date",
+            yaxis_title="Volatility (%)",
+            hovermode="x unified"
         )
-        st.plotly_chart(fig_hist, use_container_width=True)
+        return fig
+    
+    fig_regimes = cached_figure("volatility_regimes", [rolling_window, regime_stocks], build_volatility_regimes)
+    render_chart(fig_regimes, use_container_width=True)
+    
+    if not regimes.empty:
+        current_regime = regimes['Regime'].iloc[-1]
+        st.markdown(f"""
+            <div class='glass-card' style='border-left: 4px solid {REGIME_COLORS[current_regime]};'>
+                <h4 style='margin: 0; color: {SUNSET_GLOW["muted_text"]}; font-size: 0.9rem;'>Current Market Regime</h4>
+                <h2 style='margin: 10px 0; color: {REGIME_COLORS[current_regime]}; font-size: 2rem;'>{current_regime} Volatility</h2>
+                <p style='margin: 0; color: {SUNSET_GLOW["muted_text"]}; font-size: 0.85rem;'>
+                    Median {rolling_window}-day volatility {regimes['Market_Volatility'].iloc[-1]:.2f}% • regimes are terciles of its history
+                </p>
+            </div>
+        """, unsafe_allow_html=True)
+    
+    # Rolling Beta & Correlation to a Reference Stock
+    st.subheader("📐 Rolling Beta & Correlation")
+    symbols = metrics_df['Symbol'].tolist()
+    reference = st.selectbox(
+        "Reference Stock",
+        symbols,
+        index=symbols.index('RELIANCE') if 'RELIANCE' in symbols else 0
+    )
+    
+    def build_rolling_beta():
+        rolling_beta = rolling_engine.beta(reference, rolling_window)
+        rolling_corr = rolling_engine.correlation(reference, rolling_window)
+        fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                            subplot_titles=(f"Beta vs {reference}", f"Correlation with {reference}"))
+        colors = [SUNSET_GLOW['coral'], SUNSET_GLOW['accent'], SUNSET_GLOW['pink'], SUNSET_GLOW['success'], SUNSET_GLOW['peach']]
+        for idx, symbol in enumerate(s for s in regime_stocks if s != reference):
+            color = colors[idx % len(colors)]
+            fig.add_trace(go.Scatter(x=rolling_beta.index, y=rolling_beta[symbol], name=symbol, mode='lines',
+                                     line=dict(color=color, width=2), legendgroup=symbol), row=1, col=1)
+            fig.add_trace(go.Scatter(x=rolling_corr.index, y=rolling_corr[symbol], name=symbol, mode='lines',
+                                     line=dict(color=color, width=2), legendgroup=symbol, showlegend=False), row=2, col=1)
+        fig.add_hline(y=1, line_dash="dash", line_color="rgba(255,255,255,0.2)", row=1, col=1)
+        fig.add_hline(y=0, line_dash="dash", line_color="rgba(255,255,255,0.2)", row=2, col=1)
+        fig = style_plotly_chart(fig, f"{rolling_window}-Day Rolling Beta & Correlation")
+        fig.update_layout(height=600, hovermode="x unified")
+        return fig
+    
+    fig_beta = cached_figure("rolling_beta", [rolling_window, regime_stocks, reference], build_rolling_beta)
+    render_chart(fig_beta, use_container_width=True)
     
     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -843,53 +1436,63 @@ elif selected_page == "Volatility Analysis":
 elif selected_page == "Cumulative Returns":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("🚀 Wealth Growth Trajectory")
+    import plotly.express as px
+    import plotly.graph_objects as go
+    price_panel = get_data('price_panel')
     
     # Stock Selector
     col1, col2 = st.columns([3, 1])
     with col1:
         selected_stocks = st.multiselect(
-            "Select Stocks to Compare (Max 5)",
+            f"Select Stocks to Compare (Max {MAX_CUMULATIVE_STOCKS})",
             options=metrics_df['Symbol'].tolist(),
             default=metrics_df.head(5)['Symbol'].tolist()
         )
     with col2:
-        time_range = st.selectbox("Time Range", ["1Y", "6M", "3M", "1M"], index=0)
+        time_range = st.selectbox("Time Range", list(TIME_RANGES), index=0)
     
-    if len(selected_stocks) > 5:
-        st.warning("⚠️ Please select maximum 5 stocks for optimal viewing")
-        selected_stocks = selected_stocks[:5]
+    if len(selected_stocks) > MAX_CUMULATIVE_STOCKS:
+        st.warning(f"⚠️ Please select maximum {MAX_CUMULATIVE_STOCKS} stocks for optimal viewing")
+        selected_stocks = selected_stocks[:MAX_CUMULATIVE_STOCKS]
     
     if selected_stocks:
-        # Calculate Cumulative Returns
-        fig = go.Figure()
-        colors = px.colors.sequential.Plasma[:len(selected_stocks)]
+        # Slice the precomputed cumulative-return matrix to the window and rebase it
+        cumulative = price_panel.cumulative_returns(selected_stocks, start=range_start(price_panel, time_range)) * 100
         
-        for idx, symbol in enumerate(selected_stocks):
-            symbol_data = master_df[master_df['Symbol'] == symbol].sort_values('Date')
-            symbol_data['Cumulative_Return'] = (1 + symbol_data['Daily_Return'] / 100).cumprod() - 1
+        def build_cumulative_returns():
+            fig = go.Figure()
+            colors = px.colors.sequential.Plasma
             
-            # Convert hex color to rgba for fill
-            fill_color = hex_to_rgba(colors[idx], 0.1) if idx == 0 else 'rgba(0,0,0,0)'
+            for idx, symbol in enumerate(selected_stocks):
+                color = colors[idx % len(colors)]
+                # Convert hex color to rgba for fill
+                fill_color = hex_to_rgba(color, 0.1) if idx == 0 else 'rgba(0,0,0,0)'
+                series = load_chart_series(snapshot_version, 'cumulative', symbol, time_range, CHART_POINT_BUDGET, manifest)
+                
+                fig.add_trace(go.Scatter(
+                    x=series.index,
+                    y=series,
+                    mode='lines',
+                    name=symbol,
+                    line=dict(color=color, width=3),
+                    fill='tonexty' if idx == 0 else 'none',
+                    fillcolor=fill_color
+                ))
             
-            fig.add_trace(go.Scatter(
-                x=symbol_data['Date'],
-                y=symbol_data['Cumulative_Return'] * 100,
-                mode='lines',
-                name=symbol,
-                line=dict(color=colors[idx], width=3),
-                fill='tonexty' if idx == 0 else 'none',
-                fillcolor=fill_color
-            ))
-        
-        fig = style_plotly_chart(fig, "Cumulative Returns Comparison")
-        fig.update_layout(
-            xaxis_title="Date",
-            yaxis_title="Cumulative Return (%)",
-            hovermode="x unified",
-            height=600
-        )
+            fig = style_plotly_chart(fig, f"Cumulative Returns Comparison ({time_range})")
+            fig.update_layout(
+                xaxis_title="Date",
+                yaxis_title="Cumulative Return (%)",
+                hovermode="x unified",
+                height=600
+            )
+            return fig
         
-        st.plotly_chart(fig, use_container_width=True)
+        fig = cached_figure("cumulative_returns", [selected_stocks, time_range], build_cumulative_returns)
+        render_chart(fig, use_container_width=True)
+        resolution = chart_resolution(price_panel, time_range)
+        if resolution != 'daily':
+            st.caption(f"📐 Sampled at {resolution} bar closes for this range")
         
         # Performance Summary Table
         summary_data = []
@@ -897,6 +1500,7 @@ elif selected_page == "Cumulative Returns":
             sym_data = metrics_df[metrics_df['Symbol'] == symbol].iloc[0]
             summary_data.append({
                 'Symbol': symbol,
+                f'Return ({time_range})': f"{cumulative[symbol].dropna().iloc[-1]:.2f}%" if cumulative[symbol].notna().any() else "-",
                 'Total Return': f"{sym_data['Yearly_Return']:.2f}%",
                 'Volatility': f"{sym_data['Volatility']:.2f}",
                 'Risk Class': "🔴 High" if sym_data['Volatility'] > 30 else "🟡 Medium" if sym_data['Volatility'] > 20 else "🟢 Low"
@@ -917,39 +1521,38 @@ elif selected_page == "Cumulative Returns":
 elif selected_page == "Sector Analysis":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("🏭 Sector Intelligence")
+    import plotly.graph_objects as go
     
-    sector_performance = metrics_df.groupby('Sector').agg({
-        'Yearly_Return': ['mean', 'count', 'sum'],
-        'Volatility': 'mean'
-    }).round(2)
-    
-    sector_performance.columns = ['Avg_Return', 'Stock_Count', 'Total_Return', 'Avg_Volatility']
-    sector_performance = sector_performance.reset_index().sort_values('Avg_Return', ascending=False)
+    sector_performance = get_data('sector_performance')
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
         # Sunburst Chart
-        fig = go.Figure(go.Sunburst(
-            labels=sector_performance['Sector'].tolist() + metrics_df['Symbol'].tolist(),
-            parents=['']*len(sector_performance) + sector_performance['Sector'].tolist(),
-            values=sector_performance['Stock_Count'].tolist() + [1]*len(metrics_df),
-            branchvalues="total",
-            marker=dict(
-                colors=sector_performance['Avg_Return'].tolist() + metrics_df['Yearly_Return'].tolist(),
-                colorscale='RdYlGn',
-                cmid=0
-            ),
-            hovertemplate='<b>%{label}</b><br>Return: %{color:.2f}%<extra></extra>',
-            maxdepth=2
-        ))
+        def build_sector_sunburst():
+            fig = go.Figure(go.Sunburst(
+                labels=sector_performance['Sector'].tolist() + metrics_df['Symbol'].tolist(),
+                parents=['']*len(sector_performance) + sector_performance['Sector'].tolist(),
+                values=sector_performance['Stock_Count'].tolist() + [1]*len(metrics_df),
+                branchvalues="total",
+                marker=dict(
+                    colors=sector_performance['Avg_Return'].tolist() + metrics_df['Yearly_Return'].tolist(),
+                    colorscale='RdYlGn',
+                    cmid=0
+                ),
+                hovertemplate='<b>%{label}</b><br>Return: %{color:.2f}%<extra></extra>',
+                maxdepth=2
+            ))
+            
+            fig.update_layout(
+                margin=dict(t=20, l=0, r=0, b=0),
+                paper_bgcolor='rgba(0,0,0,0)',
+                height=600
+            )
+            return fig
         
-        fig.update_layout(
-            margin=dict(t=20, l=0, r=0, b=0),
-            paper_bgcolor='rgba(0,0,0,0)',
-            height=600
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        fig = cached_figure("sector_sunburst", None, build_sector_sunburst)
+        render_chart(fig, use_container_width=True)
     
     with col2:
         st.subheader("Sector Leaderboard")
@@ -984,6 +1587,8 @@ elif selected_page == "Sector Analysis":
 elif selected_page == "Correlation Matrix":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("🔗 Portfolio Correlation Matrix")
+    import plotly.express as px
+    correlation_matrix = get_data('correlation_matrix')
     
     st.markdown("""
         <div class='glass-card info-box'>
@@ -1002,53 +1607,46 @@ elif selected_page == "Correlation Matrix":
     corr_subset = correlation_matrix.loc[top_symbols, top_symbols]
     
     # Heatmap with better colorscale
-    fig = px.imshow(
-        corr_subset,
-        text_auto='.2f',
-        aspect="auto",
-        color_continuous_scale=[
-            [0, "#ef476f"],
-            [0.5, "#ffd166"],
-            [1, "#06d6a0"]
-        ],
-        zmin=-1,
-        zmax=1
-    )
-    
-    fig.update_layout(
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        font=dict(color=SUNSET_GLOW['white_text']),
-        height=800,
-        xaxis=dict(tickangle=45, tickfont=dict(size=10)),
-        yaxis=dict(tickfont=dict(size=10)),
-        title=dict(
-            text=f"Correlation Heatmap - Top {num_stocks} Performers",
-            font=dict(size=24, color=SUNSET_GLOW['accent']),
-            x=0.5,
-            xanchor='center'
+    def build_correlation_heatmap():
+        fig = px.imshow(
+            corr_subset,
+            text_auto='.2f',
+            aspect="auto",
+            color_continuous_scale=[
+                [0, "#ef476f"],
+                [0.5, "#ffd166"],
+                [1, "#06d6a0"]
+            ],
+            zmin=-1,
+            zmax=1
         )
-    )
+        
+        fig.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color=SUNSET_GLOW['white_text']),
+            height=800,
+            xaxis=dict(tickangle=45, tickfont=dict(size=10)),
+            yaxis=dict(tickfont=dict(size=10)),
+            title=dict(
+                text=f"Correlation Heatmap - Top {num_stocks} Performers",
+                font=dict(size=24, color=SUNSET_GLOW['accent']),
+                x=0.5,
+                xanchor='center'
+            )
+        )
+        return fig
     
-    st.plotly_chart(fig, use_container_width=True)
+    fig = cached_figure("correlation_heatmap", num_stocks, build_correlation_heatmap)
+    render_chart(fig, use_container_width=True)
     
     # Correlation Insights
     st.subheader("💡 Correlation Insights")
-    corr_pairs = []
-    for i in range(len(corr_subset.columns)):
-        for j in range(i+1, len(corr_subset.columns)):
-            corr_pairs.append({
-                'Stock 1': corr_subset.columns[i],
-                'Stock 2': corr_subset.columns[j],
-                'Correlation': corr_subset.iloc[i, j]
-            })
-    
-    corr_df = pd.DataFrame(corr_pairs).sort_values('Correlation', ascending=False)
+    high_corr, low_corr = get_data('pair_index').extremes(top_symbols, k=5)
     
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("**📈 Highly Correlated (Move Together)**")
-        high_corr = corr_df.head(5)
         for _, row in high_corr.iterrows():
             st.markdown(f"""
                 <div style='background: rgba(6, 214, 160, 0.1); padding: 12px; border-radius: 10px; margin: 8px 0; border-left: 3px solid {SUNSET_GLOW['success']};'>
@@ -1059,7 +1657,6 @@ elif selected_page == "Correlation Matrix":
     
     with col2:
         st.markdown("**📉 Negatively Correlated (Hedge Potential)**")
-        low_corr = corr_df.tail(5)
         for _, row in low_corr.iterrows():
             st.markdown(f"""
                 <div style='background: rgba(239, 71, 111, 0.1); padding: 12px; border-radius: 10px; margin: 8px 0; border-left: 3px solid {SUNSET_GLOW['danger']};'>
@@ -1077,6 +1674,8 @@ elif selected_page == "Correlation Matrix":
 elif selected_page == "Monthly Trends":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("📅 Temporal Analysis")
+    import plotly.graph_objects as go
+    monthly_df = get_data('monthly_performance')
     
     # Month Selector with Styling
     months = sorted(monthly_df['Month_Year'].unique(), reverse=True)
@@ -1121,96 +1720,102 @@ elif selected_page == "Monthly Trends":
             st.markdown("<h3 style='color: #06d6a0; margin-bottom: 20px; text-align: center;'>🚀 Top 5 Gainers</h3>", unsafe_allow_html=True)
             top_gainers = month_data.head(5)
             
-            fig1 = go.Figure(go.Bar(
-                x=top_gainers['Symbol'],
-                y=top_gainers['Monthly_Return'],
-                marker=dict(
-                    color='#06d6a0',
-                    line=dict(color='rgba(255,255,255,0.3)', width=1)
-                ),
-                text=top_gainers['Monthly_Return'].apply(lambda x: f'+{x:.2f}%'),
-                textposition='outside',
-                textfont=dict(color='white', size=12, family='Inter'),
-                hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<extra></extra>'
-            ))
-            
-            fig1.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(20,25,40,0.3)',
-                height=400,
-                margin=dict(l=20, r=20, t=40, b=40),
-                xaxis=dict(
-                    tickangle=0,
-                    gridcolor='rgba(255,255,255,0.05)',
-                    linecolor='rgba(255,255,255,0.1)',
-                    tickfont=dict(color='white', size=12),
-                    title=dict(text='Stock Symbol', font=dict(color='white', size=13))
-                ),
-                yaxis=dict(
-                    gridcolor='rgba(255,255,255,0.05)',
-                    linecolor='rgba(255,255,255,0.1)',
-                    tickfont=dict(color='white', size=11),
-                    title=dict(text='Monthly Return (%)', font=dict(color='white', size=13))
-                ),
-                font=dict(color='white'),
-                showlegend=False,
-                title=dict(
-                    text=f'Top Gainers - {selected_month}',
-                    font=dict(color='#06d6a0', size=18, family='Space Grotesk'),
-                    x=0.5,
-                    xanchor='center'
+            def build_monthly_gainers():
+                fig1 = go.Figure(go.Bar(
+                    x=top_gainers['Symbol'],
+                    y=top_gainers['Monthly_Return'],
+                    marker=dict(
+                        color='#06d6a0',
+                        line=dict(color='rgba(255,255,255,0.3)', width=1)
+                    ),
+                    text=top_gainers['Monthly_Return'].apply(lambda x: f'+{x:.2f}%'),
+                    textposition='outside',
+                    textfont=dict(color='white', size=12, family='Inter'),
+                    hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<extra></extra>'
+                ))
+                
+                fig1.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(20,25,40,0.3)',
+                    height=400,
+                    margin=dict(l=20, r=20, t=40, b=40),
+                    xaxis=dict(
+                        tickangle=0,
+                        gridcolor='rgba(255,255,255,0.05)',
+                        linecolor='rgba(255,255,255,0.1)',
+                        tickfont=dict(color='white', size=12),
+                        title=dict(text='Stock Symbol', font=dict(color='white', size=13))
+                    ),
+                    yaxis=dict(
+                        gridcolor='rgba(255,255,255,0.05)',
+                        linecolor='rgba(255,255,255,0.1)',
+                        tickfont=dict(color='white', size=11),
+                        title=dict(text='Monthly Return (%)', font=dict(color='white', size=13))
+                    ),
+                    font=dict(color='white'),
+                    showlegend=False,
+                    title=dict(
+                        text=f'Top Gainers - {selected_month}',
+                        font=dict(color='#06d6a0', size=18, family='Space Grotesk'),
+                        x=0.5,
+                        xanchor='center'
+                    )
                 )
-            )
+                return fig1
             
-            st.plotly_chart(fig1, use_container_width=True)
+            fig1 = cached_figure("monthly_gainers", selected_month, build_monthly_gainers)
+            render_chart(fig1, use_container_width=True)
     
     with col2:
         with st.container():
             st.markdown("<h3 style='color: #ef476f; margin-bottom: 20px; text-align: center;'>⚠️ Top 5 Losers</h3>", unsafe_allow_html=True)
             top_losers = month_data.tail(5).sort_values('Monthly_Return')
             
-            fig2 = go.Figure(go.Bar(
-                x=top_losers['Symbol'],
-                y=top_losers['Monthly_Return'],
-                marker=dict(
-                    color='#ef476f',
-                    line=dict(color='rgba(255,255,255,0.3)', width=1)
-                ),
-                text=top_losers['Monthly_Return'].apply(lambda x: f'{x:.2f}%'),
-                textposition='outside',
-                textfont=dict(color='white', size=12, family='Inter'),
-                hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<extra></extra>'
-            ))
-            
-            fig2.update_layout(
-                paper_bgcolor='rgba(0,0,0,0)',
-                plot_bgcolor='rgba(20,25,40,0.3)',
-                height=400,
-                margin=dict(l=20, r=20, t=40, b=40),
-                xaxis=dict(
-                    tickangle=0,
-                    gridcolor='rgba(255,255,255,0.05)',
-                    linecolor='rgba(255,255,255,0.1)',
-                    tickfont=dict(color='white', size=12),
-                    title=dict(text='Stock Symbol', font=dict(color='white', size=13))
-                ),
-                yaxis=dict(
-                    gridcolor='rgba(255,255,255,0.05)',
-                    linecolor='rgba(255,255,255,0.1)',
-                    tickfont=dict(color='white', size=11),
-                    title=dict(text='Monthly Return (%)', font=dict(color='white', size=13))
-                ),
-                font=dict(color='white'),
-                showlegend=False,
-                title=dict(
-                    text=f'Top Losers - {selected_month}',
-                    font=dict(color='#ef476f', size=18, family='Space Grotesk'),
-                    x=0.5,
-                    xanchor='center'
+            def build_monthly_losers():
+                fig2 = go.Figure(go.Bar(
+                    x=top_losers['Symbol'],
+                    y=top_losers['Monthly_Return'],
+                    marker=dict(
+                        color='#ef476f',
+                        line=dict(color='rgba(255,255,255,0.3)', width=1)
+                    ),
+                    text=top_losers['Monthly_Return'].apply(lambda x: f'{x:.2f}%'),
+                    textposition='outside',
+                    textfont=dict(color='white', size=12, family='Inter'),
+                    hovertemplate='<b>%{x}</b><br>Return: %{y:.2f}%<extra></extra>'
+                ))
+                
+                fig2.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(20,25,40,0.3)',
+                    height=400,
+                    margin=dict(l=20, r=20, t=40, b=40),
+                    xaxis=dict(
+                        tickangle=0,
+                        gridcolor='rgba(255,255,255,0.05)',
+                        linecolor='rgba(255,255,255,0.1)',
+                        tickfont=dict(color='white', size=12),
+                        title=dict(text='Stock Symbol', font=dict(color='white', size=13))
+                    ),
+                    yaxis=dict(
+                        gridcolor='rgba(255,255,255,0.05)',
+                        linecolor='rgba(255,255,255,0.1)',
+                        tickfont=dict(color='white', size=11),
+                        title=dict(text='Monthly Return (%)', font=dict(color='white', size=13))
+                    ),
+                    font=dict(color='white'),
+                    showlegend=False,
+                    title=dict(
+                        text=f'Top Losers - {selected_month}',
+                        font=dict(color='#ef476f', size=18, family='Space Grotesk'),
+                        x=0.5,
+                        xanchor='center'
+                    )
                 )
-            )
+                return fig2
             
-            st.plotly_chart(fig2, use_container_width=True)
+            fig2 = cached_figure("monthly_losers", selected_month, build_monthly_losers)
+            render_chart(fig2, use_container_width=True)
     
     # FIXED: Monthly Movers Table with Sector merge
     st.subheader("📋 Complete Monthly Performance")
@@ -1242,12 +1847,37 @@ elif selected_page == "Monthly Trends":
 elif selected_page == "Stock Comparator":
     st.markdown("<div class='animate-in'>", unsafe_allow_html=True)
     st.header("⚖️ Advanced Stock Comparator")
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    from stock_analysis.indicators import (ATR_PERIOD, BOLLINGER_WINDOW, BOLLINGER_WIDTH, EMA_SPANS, MACD_SPANS,
+                                           RSI_PERIOD, SMA_WINDOWS)
+
+    # Indicator lines drawn over the prices, and the oscillator panel below them
+    PRICE_OVERLAYS = {
+        **{f"SMA {window}": ['SMA_' + str(window)] for window in SMA_WINDOWS},
+        **{f"EMA {span}": ['EMA_' + str(span)] for span in EMA_SPANS},
+        f"Bollinger Bands ({BOLLINGER_WINDOW}, {BOLLINGER_WIDTH:g}σ)": ['BB_Upper', 'BB_Lower'],
+    }
+    OSCILLATORS = {
+        "None": [],
+        f"RSI {RSI_PERIOD}": [f"RSI_{RSI_PERIOD}"],
+        f"MACD ({', '.join(map(str, MACD_SPANS))})": ['MACD', 'MACD_Signal'],
+        f"ATR {ATR_PERIOD}": [f"ATR_{ATR_PERIOD}"],
+    }
     
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([2, 2, 1])
     with col1:
         stock1 = st.selectbox("Select Stock A", metrics_df['Symbol'].tolist(), index=0)
     with col2:
         stock2 = st.selectbox("Select Stock B", metrics_df['Symbol'].tolist(), index=1)
+    with col3:
+        time_range = st.selectbox("Time Range", list(TIME_RANGES), index=0)
+    
+    col4, col5 = st.columns([3, 1])
+    with col4:
+        overlays = st.multiselect("Indicator Overlays", list(PRICE_OVERLAYS), default=[])
+    with col5:
+        oscillator = st.selectbox("Oscillator", list(OSCILLATORS), index=0)
     
     if stock1 and stock2:
         s1_data = metrics_df[metrics_df['Symbol'] == stock1].iloc[0]
@@ -1291,48 +1921,88 @@ elif selected_page == "Stock Comparator":
                 """, unsafe_allow_html=True)
         
         # Price Movement Comparison Chart
-        s1_hist = master_df[master_df['Symbol'] == stock1].sort_values('Date')
-        s2_hist = master_df[master_df['Symbol'] == stock2].sort_values('Date')
-        
-        fig = make_subplots(rows=1, cols=1, shared_xaxes=True)
-        
-        fig.add_trace(go.Scatter(
-            x=s1_hist['Date'],
-            y=s1_hist['Close'],
-            name=stock1,
-            line=dict(color=SUNSET_GLOW['coral'], width=3),
-            mode='lines',
-            fill='tonexty',
-            fillcolor=hex_to_rgba(SUNSET_GLOW['coral'], 0.1)
-        ))
-        
-        fig.add_trace(go.Scatter(
-            x=s2_hist['Date'],
-            y=s2_hist['Close'],
-            name=stock2,
-            line=dict(color=SUNSET_GLOW['success'], width=3),
-            mode='lines',
-            fill='tonexty',
-            fillcolor=hex_to_rgba(SUNSET_GLOW['success'], 0.1)
-        ))
-        
-        fig = style_plotly_chart(fig, f"Price Movement Comparison: {stock1} vs {stock2}")
-        fig.update_layout(
-            height=500,
-            yaxis_title="Price (₹)",
-            hovermode="x unified",
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1
+        def build_price_comparison():
+            s1_hist = load_chart_series(snapshot_version, 'close', stock1, time_range, CHART_POINT_BUDGET, manifest)
+            s2_hist = load_chart_series(snapshot_version, 'close', stock2, time_range, CHART_POINT_BUDGET, manifest)
+            
+            rows = 2 if OSCILLATORS[oscillator] else 1
+            fig = make_subplots(rows=rows, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+                                row_heights=[0.7, 0.3] if rows == 2 else None)
+            
+            fig.add_trace(go.Scatter(
+                x=s1_hist.index,
+                y=s1_hist,
+                name=stock1,
+                line=dict(color=SUNSET_GLOW['coral'], width=3),
+                mode='lines',
+                fill='tonexty',
+                fillcolor=hex_to_rgba(SUNSET_GLOW['coral'], 0.1)
+            ))
+            
+            fig.add_trace(go.Scatter(
+                x=s2_hist.index,
+                y=s2_hist,
+                name=stock2,
+                line=dict(color=SUNSET_GLOW['success'], width=3),
+                mode='lines',
+                fill='tonexty',
+                fillcolor=hex_to_rgba(SUNSET_GLOW['success'], 0.1)
+            ))
+            
+            # Indicator overlays (dotted, in each stock's colour) and the oscillator panel
+            stock_colors = {stock1: SUNSET_GLOW['coral'], stock2: SUNSET_GLOW['success']}
+            for symbol, color in stock_colors.items():
+                for label in overlays:
+                    for indicator in PRICE_OVERLAYS[label]:
+                        series = load_indicator_series(snapshot_version, indicator, symbol, time_range,
+                                                       CHART_POINT_BUDGET, manifest)
+                        fig.add_trace(go.Scatter(
+                            x=series.index, y=series, name=f"{symbol} {indicator.replace('_', ' ')}",
+                            line=dict(color=hex_to_rgba(color, 0.7), width=1.5,
+                                      dash='dash' if indicator.startswith('BB_') else 'dot'),
+                            mode='lines', legendgroup=symbol
+                        ), row=1, col=1)
+                for k, indicator in enumerate(OSCILLATORS[oscillator]):
+                    series = load_indicator_series(snapshot_version, indicator, symbol, time_range,
+                                                   CHART_POINT_BUDGET, manifest)
+                    fig.add_trace(go.Scatter(
+                        x=series.index, y=series, name=f"{symbol} {indicator.replace('_', ' ')}",
+                        line=dict(color=color if k == 0 else hex_to_rgba(color, 0.6), width=2 if k == 0 else 1.5,
+                                  dash='solid' if k == 0 else 'dot'),
+                        mode='lines', legendgroup=symbol
+                    ), row=2, col=1)
+            if oscillator.startswith("RSI"):
+                for level in (30, 70):
+                    fig.add_hline(y=level, line=dict(color=SUNSET_GLOW['muted_text'], width=1, dash='dot'), row=2, col=1)
+            if rows == 2:
+                fig.update_yaxes(title_text=oscillator, gridcolor='rgba(255,255,255,0.05)',
+                                 tickfont=dict(color=SUNSET_GLOW['muted_text']), row=2, col=1)
+            
+            fig = style_plotly_chart(fig, f"Price Movement Comparison: {stock1} vs {stock2} ({time_range})")
+            fig.update_layout(
+                height=500 if rows == 1 else 680,
+                yaxis_title="Price (₹)",
+                hovermode="x unified",
+                legend=dict(
+                    orientation="h",
+                    yanchor="bottom",
+                    y=1.02,
+                    xanchor="right",
+                    x=1
+                )
             )
-        )
-        st.plotly_chart(fig, use_container_width=True)
+            return fig
+        
+        fig = cached_figure("price_comparison", [stock1, stock2, time_range, overlays, oscillator], build_price_comparison)
+        render_chart(fig, use_container_width=True)
+        resolution = chart_resolution(get_data('price_panel'), time_range)
+        if resolution != 'daily':
+            st.caption(f"📐 Drawn from {resolution} OHLCV bars for this range")
     
     st.markdown("</div>", unsafe_allow_html=True)
 
+trace.end(page_span)
+
 # ============================================================================
 # FOOTER
 # ============================================================================
@@ -1357,4 +2027,35 @@ st.markdown(f"""
             © 2025 Stock Analysis Team. All rights reserved.
         </p>
     </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+# The page is on screen; load everything else so the next navigation is a cache hit
+start_cache_warmup(snapshot_version, manifest)
+
+# ============================================================================
+# RERUN SPANS & DEBUG PANEL
+# ============================================================================
+
+span_records = trace.finish()
+profile_report = profiler.stop() if profiler is not None else None
+
+if debug_mode or profile_report:
+    with st.sidebar:
+        with st.expander("🛠️ Performance Debug", expanded=True):
+            st.caption(f"Session {trace.session_id} • rerun #{trace.run} • {trace.total() * 1000:.0f} ms")
+            spans_df = pd.DataFrame(span_records)
+            if not spans_df.empty:
+                spans_df['span'] = ['\u2003' * depth + name for depth, name in zip(spans_df['depth'], spans_df['name'])]
+                spans_df['cache'] = spans_df['attrs'].map(lambda attrs: attrs.get('cache', ''))
+                st.dataframe(spans_df[['span', 'duration_ms', 'cache']], hide_index=True, use_container_width=True)
+            cache_stats = figure_cache.stats()
+            st.caption(f"Figure cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1024:.0f} KB, "
+                       f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+            shared_cache = get_shared_cache()
+            if shared_cache is not None:
+                disk_stats = shared_cache.stats()
+                st.caption(f"Shared disk cache: {disk_stats['entries']} entries, {disk_stats['bytes'] / 1024:.0f} KB, "
+                           f"{disk_stats['hits']} hits / {disk_stats['misses']} misses in this process")
+            if profile_report:
+                st.markdown(f"**{profile_mode.upper()} profile (this rerun)**")
+                st.code(profile_report, language=None)
@@ -0,0 +1,83 @@
+"""
+Dashboard Cold Start Benchmark
+Time-to-first-render and rerun latency of app.py, measured with Streamlit's AppTest
+
+Each sample runs in a fresh interpreter so nothing is cached: the first run
+covers imports, snapshot loading and rendering the default page, the reruns
+are the cost of a widget interaction in the same session.
+
+Usage:
+    python benchmarks/bench_cold_start.py
+    python benchmarks/bench_cold_start.py --page "Stock Comparator" --samples 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Targets on a single-core container; the exit code is 1 when a median misses one
+FIRST_RENDER_TARGET_S = 1.5
+RERUN_TARGET_S = 0.5
+
+_SAMPLE_SCRIPT = r"""
+import json, sys, time
+from unittest import mock
+from streamlit.testing.v1 import AppTest
+
+page, reruns = sys.argv[1], int(sys.argv[2])
+with mock.patch('streamlit_option_menu.option_menu', return_value=page):
+    at = AppTest.from_file('app.py', default_timeout=120)
+    start = time.perf_counter()
+    at.run()
+    first = time.perf_counter() - start
+    errors = [str(e.value) for e in at.exception]
+    rerun_times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        rerun_times.append(time.perf_counter() - start)
+print(json.dumps({'first': first, 'reruns': rerun_times, 'errors': errors}))
+"""
+
+
+def sample(page, reruns):
+    """One fresh-process measurement: first run + in-session reruns"""
+    result = subprocess.run([sys.executable, '-c', _SAMPLE_SCRIPT, page, str(reruns)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--page', default="Market Overview")
+    parser.add_argument('--samples', type=int, default=3)
+    parser.add_argument('--reruns', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    firsts, reruns = [], []
+    for _ in range(args.samples):
+        result = sample(args.page, args.reruns)
+        if result['errors']:
+            raise SystemExit(f"app.py raised: {result['errors'][0]}")
+        firsts.append(result['first'])
+        reruns.extend(result['reruns'])
+
+    first_median = statistics.median(firsts)
+    rerun_median = statistics.median(reruns)
+    print(f"Page: {args.page}")
+    print(f"  first render  median {first_median:.3f}s  (target {FIRST_RENDER_TARGET_S:.1f}s)  "
+          f"samples {', '.join(f'{t:.3f}' for t in firsts)}")
+    print(f"  rerun         median {rerun_median:.3f}s  (target {RERUN_TARGET_S:.1f}s)")
+
+    missed = first_median > FIRST_RENDER_TARGET_S or rerun_median > RERUN_TARGET_S
+    print("Warning: latency target missed" if missed else "✓ Within latency targets")
+    return 1 if missed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
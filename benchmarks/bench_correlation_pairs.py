@@ -0,0 +1,100 @@
+"""
+Correlation Pair Benchmark
+Times the Correlation Matrix page's nested pair loop against stock_analysis.correlation
+
+Usage:
+    python benchmarks/bench_correlation_pairs.py
+    python benchmarks/bench_correlation_pairs.py --sizes 30 500 --subset 30
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_analysis.correlation import PairIndex, top_k_pairs  # noqa: E402
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def synthetic_correlation_matrix(n_symbols, n_days=284, seed=0):
+    """Correlation of random factor-driven returns, rounded like correlation_matrix.csv"""
+    rng = np.random.default_rng(seed)
+    market = rng.normal(size=(n_days, 1))
+    returns = 0.5 * market + rng.normal(size=(n_days, n_symbols))
+    symbols = [f"SYM{i:04d}" for i in range(n_symbols)]
+    return pd.DataFrame(returns, columns=symbols).corr().round(3)
+
+# ============================================================================
+# REFERENCE (app.py before the pair engine)
+# ============================================================================
+
+def legacy_extremes(corr_subset, k=5):
+    corr_pairs = []
+    for i in range(len(corr_subset.columns)):
+        for j in range(i+1, len(corr_subset.columns)):
+            corr_pairs.append({
+                'Stock 1': corr_subset.columns[i],
+                'Stock 2': corr_subset.columns[j],
+                'Correlation': corr_subset.iloc[i, j]
+            })
+    corr_df = pd.DataFrame(corr_pairs).sort_values('Correlation', ascending=False)
+    return corr_df.head(k), corr_df.tail(k)
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def _same_values(expected, actual):
+    np.testing.assert_array_equal(expected['Correlation'].to_numpy(), actual['Correlation'].to_numpy())
+
+
+def run(sizes, subset_size, legacy_max_size):
+    print(f"{'symbols':>8} {'pairs':>10} {'loop (s)':>10} {'top_k (s)':>10} "
+          f"{'index build':>12} {'subset query':>13}")
+    for n_symbols in sizes:
+        matrix = synthetic_correlation_matrix(n_symbols, seed=n_symbols)
+        subset = list(matrix.columns[::max(n_symbols // subset_size, 1)][:subset_size])
+
+        (high, low), top_k_s = _timed(top_k_pairs, matrix)
+        index, build_s = _timed(PairIndex, matrix)
+        (sub_high, sub_low), query_s = _timed(index.extremes, subset)
+
+        if n_symbols <= legacy_max_size:
+            (ref_high, ref_low), legacy_s = _timed(legacy_extremes, matrix)
+            for expected, actual in ((ref_high, high), (ref_low, low)):
+                _same_values(expected, actual)
+            ref_sub_high, ref_sub_low = legacy_extremes(matrix.loc[subset, subset])
+            _same_values(ref_sub_high, sub_high)
+            _same_values(ref_sub_low, sub_low)
+            legacy_col = f"{legacy_s:.4f}"
+        else:
+            legacy_col = 'skipped'
+        print(f"{n_symbols:>8,} {len(index):>10,} {legacy_col:>10} {top_k_s:>10.4f} "
+              f"{build_s:>12.4f} {query_s:>13.5f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[30, 100, 500, 2000])
+    parser.add_argument('--subset', type=int, default=30, help="symbols in the subset query")
+    parser.add_argument('--legacy-max-size', type=int, default=500,
+                        help="skip the nested-loop reference above this many symbols")
+    args = parser.parse_args(argv)
+    run(args.sizes, args.subset, args.legacy_max_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Chart Decimation Benchmark
+Plotly payload size and decimation time for long price series, full vs decimated
+
+Usage:
+    python benchmarks/bench_decimation.py
+    python benchmarks/bench_decimation.py --lengths 284 100000 --budget 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_analysis.decimation import DECIMATION_METHODS, decimate_series  # noqa: E402
+from stock_analysis.figure_cache import figure_to_json  # noqa: E402
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def synthetic_price_series(n_points, seed=0):
+    """Random-walk closing prices on a minute (long) or business-day (short) axis"""
+    rng = np.random.default_rng(seed)
+    freq = 'min' if n_points > 10_000 else 'B'
+    index = pd.date_range('2015-01-01', periods=n_points, freq=freq, name='Date')
+    prices = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, n_points)))
+    return pd.Series(prices, index=index, name='Close')
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def payload_bytes(series):
+    """Size of the figure JSON the page would send for one filled line trace"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Scatter(x=series.index, y=series, mode='lines', fill='tonexty'))
+    return len(figure_to_json(fig))
+
+
+def run(lengths, budget):
+    print(f"{'points':>10} {'method':>7} {'kept':>6} {'time (ms)':>10} {'payload':>12} {'full payload':>13}")
+    for n_points in lengths:
+        series = synthetic_price_series(n_points, seed=n_points)
+        full_bytes = payload_bytes(series)
+        for method in DECIMATION_METHODS:
+            start = time.perf_counter()
+            reduced = decimate_series(series, budget, method)
+            elapsed = time.perf_counter() - start
+            if method == 'minmax':
+                assert reduced.max() == series.max() and reduced.min() == series.min(), "extremes lost"
+            assert reduced.index[0] == series.index[0] and reduced.index[-1] == series.index[-1]
+            print(f"{n_points:>10,} {method:>7} {len(reduced):>6,} {elapsed * 1000:>10.2f} "
+                  f"{payload_bytes(reduced) / 1024:>10.1f}KB {full_bytes / 1024:>11.1f}KB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[284, 2_520, 100_000, 1_000_000])
+    parser.add_argument('--budget', type=int, default=2000, help="points kept per series")
+    args = parser.parse_args(argv)
+    run(args.lengths, args.budget)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Incremental Ingestion Benchmark
+Cost of a one-day incremental run, split into phases, as the stored history grows
+
+For each history length a synthetic YAML tree is ingested from scratch,
+then one more trading day is added and ingested incrementally. Parsing and
+storing the new day stay flat; reading the history back and rewriting the
+pickle, snapshot, CSVs and Power BI export (the read_back and export
+phases) still grow with the history, since the outputs are not yet
+incremental.
+
+Usage:
+    python benchmarks/bench_incremental.py
+    python benchmarks/bench_incremental.py --symbols 100 --days 250 1000 2500 --no-powerbi
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stock_analysis.incremental import run_incremental  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import SECTOR_FILE, generate_yaml_tree  # noqa: E402
+
+PHASES = ['parse', 'store', 'read_back', 'derive', 'export']
+
+
+def _quiet_run(root, powerbi):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_incremental(str(root / 'data'), str(root / 'processed_data'), str(root / SECTOR_FILE),
+                               powerbi_dir=str(root / 'powerbi') if powerbi else None)
+
+
+def bench_history(n_symbols, n_days, powerbi):
+    """(initial summary, one-day summary) for n_days of history plus one new day"""
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        generate_yaml_tree(root, n_symbols, n_days + 1)
+        last_day = sorted((root / 'data').glob('*/*.yaml'))[-1]
+        held = root / last_day.name
+        shutil.move(last_day, held)
+        initial = _quiet_run(root, powerbi)
+        shutil.move(held, last_day)
+        daily = _quiet_run(root, powerbi)
+    return initial, daily
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--days', type=int, nargs='+', default=[250, 1000, 2500])
+    parser.add_argument('--no-powerbi', action='store_true', help="skip the Power BI export")
+    args = parser.parse_args(argv)
+
+    print(f"One-day incremental run, {args.symbols} symbols (seconds)")
+    print(f"{'history days':>12} {'initial':>8} {'daily':>7} " + ' '.join(f"{p:>9}" for p in PHASES)
+          + f" {'full %':>9}")
+    for n_days in args.days:
+        initial, daily = bench_history(args.symbols, n_days, not args.no_powerbi)
+        phases = daily['phases']
+        share = (phases['read_back'] + phases['export']) / daily['seconds'] * 100
+        print(f"{n_days:>12,} {initial['seconds']:>8.2f} {daily['seconds']:>7.2f} "
+              + ' '.join(f"{phases[p]:>9.3f}" for p in PHASES) + f" {share:>8.0f}%")
+    print("full % = read_back + export (the full-history passes) as a share of the daily run")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Metrics Engine Benchmark
+Times the notebook's per-symbol / per-month loops against stock_analysis.metrics
+
+Usage:
+    python benchmarks/bench_metrics.py                  # 1x, 10x, 100x history
+    python benchmarks/bench_metrics.py --scales 1 10 --monthly-loop-max-scale 100
+
+The monthly loop is O(months x symbols x rows), so at 100x history it
+runs for minutes; by default it is only timed up to 10x.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_analysis import metrics  # noqa: E402
+
+BASE_SYMBOLS = 46
+BASE_DAYS = 284
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def synthetic_master_frame(n_symbols=BASE_SYMBOLS, n_days=BASE_DAYS, seed=0):
+    """Random-walk master_df with the same columns as the real one"""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('1990-01-01', periods=n_days) + pd.Timedelta(hours=5, minutes=30)
+    symbols = np.array([f"SYM{i:03d}" for i in range(n_symbols)], dtype=object)
+    sectors = np.array([f"SECTOR{i % 12}" for i in range(n_symbols)], dtype=object)
+
+    log_returns = rng.normal(0.0004, 0.018, size=(n_symbols, n_days))
+    close = 100 * rng.uniform(1, 50, size=(n_symbols, 1)) * np.exp(np.cumsum(log_returns, axis=1))
+    open_ = close * (1 + rng.normal(0, 0.005, size=close.shape))
+
+    df = pd.DataFrame({
+        'Date': np.tile(dates.values, n_symbols),
+        'Symbol': np.repeat(symbols, n_days),
+        'Open': open_.ravel(),
+        'High': np.maximum(open_, close).ravel() * 1.01,
+        'Low': np.minimum(open_, close).ravel() * 0.99,
+        'Close': close.ravel(),
+        'Volume': rng.integers(10_000, 10_000_000, size=n_symbols * n_days),
+        'Sector': np.repeat(sectors, n_days),
+    })
+    df['Daily_Return'] = df.groupby('Symbol', sort=False)['Close'].pct_change() * 100.0
+    df['Month_Year'] = df['Date'].dt.to_period('M')
+    return df
+
+# ============================================================================
+# NOTEBOOK LOOPS (reference implementation)
+# ============================================================================
+
+def legacy_yearly_metrics(master_df):
+    yearly_metrics = []
+    for symbol in master_df['Symbol'].unique():
+        symbol_data = master_df[master_df['Symbol'] == symbol].sort_values('Date')
+        first_close = symbol_data['Close'].iloc[0]
+        last_close = symbol_data['Close'].iloc[-1]
+        yearly_metrics.append({
+            'Symbol': symbol,
+            'Sector': symbol_data['Sector'].iloc[0],
+            'Yearly_Return': ((last_close - first_close) / first_close) * 100,
+            'Volatility': symbol_data['Daily_Return'].std(),
+            'Avg_Price': symbol_data['Close'].mean(),
+            'Max_Price': symbol_data['Close'].max(),
+            'Min_Price': symbol_data['Close'].min(),
+            'Avg_Volume': symbol_data['Volume'].mean(),
+            'Start_Price': first_close,
+            'End_Price': last_close,
+            'Price_Change': last_close - first_close
+        })
+    return pd.DataFrame(yearly_metrics).sort_values('Yearly_Return', ascending=False)
+
+
+def legacy_monthly_performance(master_df):
+    monthly_performance = []
+    for month in sorted(master_df['Month_Year'].unique()):
+        month_data = master_df[master_df['Month_Year'] == month]
+        for symbol in month_data['Symbol'].unique():
+            symbol_month_data = month_data[month_data['Symbol'] == symbol]
+            first_price = symbol_month_data['Close'].iloc[0]
+            last_price = symbol_month_data['Close'].iloc[-1]
+            monthly_performance.append({
+                'Month_Year': str(month),
+                'Symbol': symbol,
+                'Monthly_Return': ((last_price - first_price) / first_price) * 100,
+                'Avg_Price': symbol_month_data['Close'].mean(),
+                'Volume': symbol_month_data['Volume'].sum()
+            })
+    return pd.DataFrame(monthly_performance)
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def assert_same_table(expected, actual, rtol=1e-9):
+    """Same rows/order and non-float values; floats equal to rounding"""
+    expected = expected.reset_index(drop=True)
+    actual = actual.reset_index(drop=True)
+    assert list(expected.columns) == list(actual.columns), (list(expected.columns), list(actual.columns))
+    assert len(expected) == len(actual), (len(expected), len(actual))
+    for col in expected.columns:
+        if pd.api.types.is_float_dtype(expected[col]):
+            np.testing.assert_allclose(actual[col].to_numpy(), expected[col].to_numpy(), rtol=rtol, err_msg=col)
+        else:
+            assert (expected[col].astype(str).to_numpy() == actual[col].astype(str).to_numpy()).all(), col
+
+
+def check_against_processed_data(processed_dir='processed_data'):
+    """The engine must reproduce the committed CSV outputs"""
+    from stock_analysis.snapshot import load_snapshot
+
+    master_df = load_snapshot(f"{processed_dir}/snapshot")['master_data']
+    expected_metrics = pd.read_csv(f"{processed_dir}/yearly_metrics.csv")
+    expected_monthly = pd.read_csv(f"{processed_dir}/monthly_performance.csv", dtype={'Month_Year': str})
+    assert_same_table(expected_metrics, metrics.compute_yearly_metrics(master_df))
+    assert_same_table(expected_monthly, metrics.compute_monthly_performance(master_df))
+    print("✓ Matches yearly_metrics.csv and monthly_performance.csv")
+
+
+def run(scales, monthly_loop_max_scale):
+    print(f"{'scale':>6} {'rows':>11} {'stage':>8} {'loop (s)':>10} {'engine (s)':>11} {'speedup':>9}")
+    for scale in scales:
+        master_df = synthetic_master_frame(n_days=BASE_DAYS * scale, seed=scale)
+        for stage, legacy, engine, loop_max_scale in (
+            ('yearly', legacy_yearly_metrics, metrics.compute_yearly_metrics, None),
+            ('monthly', legacy_monthly_performance, metrics.compute_monthly_performance, monthly_loop_max_scale),
+        ):
+            result, engine_s = _timed(engine, master_df)
+            if loop_max_scale is None or scale <= loop_max_scale:
+                expected, legacy_s = _timed(legacy, master_df)
+                if stage == 'yearly':
+                    expected, result = expected.sort_values('Symbol'), result.sort_values('Symbol')
+                assert_same_table(expected, result)
+                speedup = f"{legacy_s / engine_s:,.1f}x"
+                legacy_col = f"{legacy_s:.3f}"
+            else:
+                legacy_col, speedup = 'skipped', '-'
+            print(f"{scale:>5}x {len(master_df):>11,} {stage:>8} {legacy_col:>10} {engine_s:>11.3f} {speedup:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--monthly-loop-max-scale', type=int, default=10,
+                        help="skip the quadratic monthly loop reference above this scale")
+    parser.add_argument('--skip-check', action='store_true', help="do not compare with processed_data/")
+    args = parser.parse_args(argv)
+
+    if not args.skip_check:
+        check_against_processed_data()
+    run(args.scales, args.monthly_loop_max_scale)
+
+
+if __name__ == '__main__':
+    main()
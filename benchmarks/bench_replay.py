@@ -0,0 +1,99 @@
+"""
+Market Replay Latency Benchmark
+Tick-to-screen latency of the replay feed at several speeds, with a poller standing in for the live fragment
+
+The poller does what the Market Overview fragment does on every run:
+long-poll the replay view, build the movers table and the breadth figure,
+serialize the figure to JSON and record the render. Latency is reported
+per part (queue, apply, wait for the fragment run, render) and end to end.
+
+Usage:
+    python benchmarks/bench_replay.py
+    python benchmarks/bench_replay.py --speeds 2 10 50 --source synthetic --seconds 10
+    python benchmarks/bench_replay.py --wait 0          # plain polling, no long-poll
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stock_analysis.figure_cache import figure_to_json  # noqa: E402
+from stock_analysis.replay import (DEFAULT_REPLAY_DAYS, REPLAY_REFRESH_S, REPLAY_WAIT_S, SOURCES,  # noqa: E402
+                                   MarketReplay, top_movers)
+from stock_analysis.snapshot import SNAPSHOT_DIR, load_table  # noqa: E402
+
+
+def render(view):
+    """The fragment's work for one view, minus Streamlit itself"""
+    import plotly.graph_objects as go
+    top_movers(view)
+    breadth = view['breadth']
+    if len(breadth):
+        fig = go.Figure(go.Bar(x=breadth['Date'], y=breadth['Advancers'] - breadth['Decliners']))
+        figure_to_json(fig)
+
+
+def run_speed(master_df, speed, source, seconds, refresh, wait, data_folder, replay_days):
+    replay = MarketReplay(master_df, data_folder=data_folder, source=source, speed=speed,
+                          replay_days=replay_days)
+    replay.start()
+    deadline = time.perf_counter() + seconds
+    while replay.running and time.perf_counter() < deadline:
+        started = time.perf_counter()
+        view = replay.view(wait=wait)
+        render(view)
+        replay.record_render(view, started)
+        time.sleep(max(refresh - (time.perf_counter() - started), 0.0))
+    # Draw the last day as the fragment would on its next run
+    started = time.perf_counter()
+    view = replay.view()
+    render(view)
+    replay.record_render(view, started)
+    replay.stop()
+    return replay, view
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure replay tick-to-screen latency")
+    parser.add_argument('--speeds', type=float, nargs='+', default=[2.0, 10.0, 50.0],
+                        help="trading days per second")
+    parser.add_argument('--source', choices=SOURCES, default='yaml')
+    parser.add_argument('--seconds', type=float, default=10.0, help="upper bound per speed")
+    parser.add_argument('--refresh', type=float, default=REPLAY_REFRESH_S, help="fragment poll interval")
+    parser.add_argument('--wait', type=float, default=REPLAY_WAIT_S,
+                        help="long-poll bound per fragment run (0 = plain polling)")
+    parser.add_argument('--data', default=os.path.join(ROOT, 'data'))
+    parser.add_argument('--snapshot', default=os.path.join(ROOT, SNAPSHOT_DIR))
+    parser.add_argument('--days', type=int, default=DEFAULT_REPLAY_DAYS, help="days replayed from the YAML feed")
+    args = parser.parse_args(argv)
+
+    master_df = load_table('master_data', args.snapshot)
+    print(f"Replay of {args.source} feed, fragment run every {args.refresh * 1000:.0f} ms, "
+          f"long-polling up to {args.wait * 1000:.0f} ms\n")
+    print(f"{'speed':>6} {'days':>5} {'drawn':>6} {'skipped':>8} {'queue':>8} {'apply':>8} "
+          f"{'wait':>8} {'render':>8} {'total p50':>10} {'total p95':>10}")
+    for speed in args.speeds:
+        replay, view = run_speed(master_df, speed, args.source, args.seconds, args.refresh, args.wait,
+                                 args.data, args.days)
+        if replay.error is not None:
+            print(f"{speed:>6g} failed: {replay.error}")
+            continue
+        latency = replay.latency_summary()
+        if latency.empty:
+            print(f"{speed:>6g} no days replayed")
+            continue
+        p50 = latency['p50']
+        print(f"{speed:>6g} {view['seq']:>5} {len(replay.latency):>6} {replay.skipped:>8} "
+              f"{p50['queue_ms']:>6.1f}ms {p50['apply_ms']:>6.1f}ms {p50['wait_ms']:>6.1f}ms "
+              f"{p50['render_ms']:>6.1f}ms {p50['total_ms']:>8.1f}ms {latency.loc['total_ms', 'p95']:>8.1f}ms")
+    print("\nParts are medians. 'skipped' days were replaced by a newer one before the next poll; "
+          "wait is the time from a day being applied to the fragment run that drew it.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
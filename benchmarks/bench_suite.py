@@ -0,0 +1,244 @@
+"""
+Synthetic-Scale Benchmark Suite
+Times every pipeline stage and dashboard page on generated data and checks them against stored baselines
+
+A scale is symbols x days. The suite writes a synthetic data/YYYY-MM/*.yaml
+tree at that scale (see synthetic_data.py), runs the notebook's stages on it
+(YAML extraction, cleaning, yearly metrics, correlation, monthly performance,
+market summary, export), then renders every app.py page headlessly with
+Streamlit's AppTest against the exported snapshot. Each stage and page
+records wall time and peak RSS. Results are compared with
+benchmarks/baselines.json; anything slower or larger than its baseline
+beyond the tolerance is reported and the exit code is 1.
+
+Usage:
+    python benchmarks/bench_suite.py                          # 'current' scale vs baseline
+    python benchmarks/bench_suite.py --scale nifty500
+    python benchmarks/bench_suite.py --symbols 200 --days 1000 --no-pages
+    python benchmarks/bench_suite.py --scale ten_years --update-baseline
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stock_analysis import ingest, metrics, pipeline  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_data import SECTOR_FILE, generate_yaml_tree  # noqa: E402
+
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baselines.json')
+
+# symbols x days
+SCALES = {
+    'current': (50, 284),
+    'nifty500': (500, 284),
+    'ten_years': (50, 2520),
+}
+
+PAGES = ["Market Overview", "Top Performers", "Worst Performers", "Volatility Analysis",
+         "Cumulative Returns", "Sector Analysis", "Correlation Matrix", "Monthly Trends",
+         "Stock Comparator"]
+
+# A result regresses when it exceeds baseline * (1 + tolerance) + slack
+TIME_TOLERANCE = 0.5
+TIME_SLACK_S = 0.05
+MEMORY_TOLERANCE = 0.25
+MEMORY_SLACK_MB = 16
+
+# ============================================================================
+# MEASUREMENT
+# ============================================================================
+
+def _reset_peak_rss():
+    """Restart the kernel's peak-RSS counter (Linux); elsewhere the peak is process-wide"""
+    with contextlib.suppress(OSError):
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+
+
+def _peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+@contextlib.contextmanager
+def measure(name, results):
+    """Record wall time and peak RSS of the with-block under results[name]"""
+    _reset_peak_rss()
+    start = time.perf_counter()
+    yield
+    results[name] = {'seconds': time.perf_counter() - start, 'peak_mb': _peak_rss_mb()}
+
+# ============================================================================
+# STAGES
+# ============================================================================
+
+def run_stages(root, workers=None):
+    """The notebook pipeline on root/data, exporting to root/processed_data"""
+    root = Path(root)
+    results = {}
+    with measure('extract_stock_data', results):
+        columns, _ = ingest.extract_stock_data(root / 'data', workers=workers)
+    with measure('create_and_clean_dataframe', results):
+        clean_df = pipeline.clean_batch(ingest.columns_to_frame(columns))
+        master_df = pipeline.build_master_frame(clean_df, pipeline.load_sector_mapping(root / SECTOR_FILE))
+    with measure('yearly_metrics', results):
+        metrics_df = metrics.compute_yearly_metrics(master_df)
+    with measure('correlation', results):
+        correlation_matrix = pipeline.compute_correlation_matrix(master_df)
+    with measure('monthly_performance', results):
+        monthly_df = metrics.compute_monthly_performance(master_df)
+    with measure('market_summary', results):
+        market_summary = metrics.compute_market_summary(metrics_df, master_df)
+    with measure('export', results):
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            pipeline.export_processed_data(master_df, metrics_df, correlation_matrix, monthly_df,
+                                           market_summary, output_dir=str(root / 'processed_data'))
+    return results
+
+# ============================================================================
+# PAGES
+# ============================================================================
+
+_PAGE_SCRIPT = r"""
+import json, sys, time
+from unittest import mock
+from streamlit.testing.v1 import AppTest
+
+sys.path.insert(0, sys.argv[3])
+from bench_suite import _peak_rss_mb as peak_rss_mb
+
+app_path, page = sys.argv[1], sys.argv[2]
+with mock.patch('streamlit_option_menu.option_menu', return_value=page):
+    at = AppTest.from_file(app_path, default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+errors = [str(e.value) for e in at.exception]
+print(json.dumps({'seconds': seconds, 'peak_mb': peak_rss_mb(), 'errors': errors}))
+"""
+
+
+def run_pages(root, pages=PAGES):
+    """First render of each page in a fresh interpreter, cwd = the synthetic project"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    results = {}
+    for page in pages:
+        completed = subprocess.run([sys.executable, '-c', _PAGE_SCRIPT, os.path.join(ROOT, 'app.py'), page,
+                                    os.path.dirname(os.path.abspath(__file__))],
+                                   cwd=root, env=env, capture_output=True, text=True, check=True)
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        if sample['errors']:
+            raise SystemExit(f"{page} raised: {sample['errors'][0]}")
+        results[page] = {'seconds': sample['seconds'], 'peak_mb': sample['peak_mb']}
+    return results
+
+# ============================================================================
+# BASELINES
+# ============================================================================
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baseline(label, results, path=BASELINE_FILE):
+    baselines = load_baselines(path)
+    baselines[label] = dict(results, python=platform.python_version(), cpus=os.cpu_count())
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def _regressed(value, base, tolerance, slack):
+    return base is not None and value > base * (1 + tolerance) + slack
+
+
+def compare(results, baseline):
+    """Print every measurement next to its baseline; returns the number of regressions"""
+    regressions = 0
+    print(f"{'':<30} {'seconds':>9} {'baseline':>9} {'peak MB':>9} {'baseline':>9}")
+    for group in ('stages', 'pages'):
+        for name, result in results.get(group, {}).items():
+            base = (baseline or {}).get(group, {}).get(name, {})
+            slow = _regressed(result['seconds'], base.get('seconds'), TIME_TOLERANCE, TIME_SLACK_S)
+            heavy = _regressed(result['peak_mb'], base.get('peak_mb'), MEMORY_TOLERANCE, MEMORY_SLACK_MB)
+            flags = ' '.join(flag for flag, hit in (('SLOWER', slow), ('MORE MEMORY', heavy)) if hit)
+            regressions += slow + heavy
+            base_s = f"{base['seconds']:.3f}" if 'seconds' in base else '-'
+            base_mb = f"{base['peak_mb']:.0f}" if 'peak_mb' in base else '-'
+            print(f"{name:<30} {result['seconds']:>9.3f} {base_s:>9} {result['peak_mb']:>9.0f} {base_mb:>9}  {flags}")
+    return regressions
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', choices=sorted(SCALES), default='current')
+    parser.add_argument('--symbols', type=int, help="override the scale's symbol count")
+    parser.add_argument('--days', type=int, help="override the scale's trading-day count")
+    parser.add_argument('--workers', type=int, default=None, help="YAML parsing processes")
+    parser.add_argument('--no-pages', action='store_true', help="skip the AppTest page renders")
+    parser.add_argument('--workdir', help="reuse / keep the synthetic project here instead of a temp folder")
+    parser.add_argument('--update-baseline', action='store_true', help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    n_symbols, n_days = SCALES[args.scale]
+    n_symbols, n_days = args.symbols or n_symbols, args.days or n_days
+    label = args.scale if (n_symbols, n_days) == SCALES[args.scale] else f"{n_symbols}x{n_days}"
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='stock-bench-')
+    try:
+        if not os.path.exists(os.path.join(workdir, 'data')):
+            print(f"Generating {n_symbols:,} symbols x {n_days:,} days in {workdir} ...")
+            generate_yaml_tree(workdir, n_symbols, n_days)
+        results = {'stages': run_stages(workdir, workers=args.workers)}
+        if not args.no_pages:
+            results['pages'] = run_pages(workdir)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\nScale: {label} ({n_symbols:,} symbols x {n_days:,} days)")
+    regressions = compare(results, load_baselines().get(label))
+    if args.update_baseline:
+        save_baseline(label, results)
+        print(f"✓ Baseline '{label}' saved to {os.path.relpath(BASELINE_FILE, ROOT)}")
+        return 0
+    if label not in load_baselines():
+        print(f"Warning: no baseline for '{label}'; run with --update-baseline to record one")
+        return 0
+    if regressions:
+        print(f"Warning: {regressions} regression(s) against baseline '{label}'")
+        return 1
+    print("✓ No regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
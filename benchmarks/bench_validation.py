@@ -0,0 +1,161 @@
+"""
+Validation Throughput Benchmark
+Times validate_batch on multi-million-row raw batches with injected faults, next to plain clean_batch
+
+Each batch is a random-walk raw frame shaped like columns_to_frame output
+(string dates, float prices, integer volume). A known number of rows is
+broken per check (High below Low, Close above High, zero volume, bad dates,
+non-positive prices, repeated Symbol / Date rows) and some rows are removed
+to leave missing trading days; the benchmark asserts validate_batch finds
+exactly those and reports rows/s and the per-check timings.
+
+Before timing, a small YAML file with unparsable records ('N/A', null and
+missing prices, a non-mapping entry) goes through parse_yaml_file and
+validate_batch to check those rows are quarantined as MISSING_OHLC
+instead of failing the parse.
+
+Usage:
+    python benchmarks/bench_validation.py                    # 1M, 5M rows
+    python benchmarks/bench_validation.py --rows 1 5 10 --fault-rate 0.001
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stock_analysis import pipeline  # noqa: E402
+from stock_analysis.ingest import columns_to_frame, parse_yaml_file  # noqa: E402
+from stock_analysis.validation import format_report, validate_batch  # noqa: E402
+
+N_SYMBOLS = 500
+
+# ============================================================================
+# SYNTHETIC DATA
+# ============================================================================
+
+def synthetic_raw_frame(n_rows, n_symbols=N_SYMBOLS, seed=0):
+    """Raw rows for n_symbols over n_rows / n_symbols days, in file (date) order"""
+    rng = np.random.default_rng(seed)
+    n_days = n_rows // n_symbols
+    dates = pd.bdate_range('1990-01-01', periods=n_days) + pd.Timedelta(hours=5, minutes=30)
+    date_strings = np.asarray(dates.strftime('%Y-%m-%d %H:%M:%S'), dtype=object)
+    symbols = np.array([f"SYM{i:04d}" for i in range(n_symbols)], dtype=object)
+
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0003, 0.018, size=(n_days, n_symbols)), axis=0))
+    open_ = close * (1 + rng.normal(0, 0.005, size=close.shape))
+    return pd.DataFrame({
+        'Date': np.repeat(date_strings, n_symbols),
+        'Symbol': np.tile(symbols, n_days),
+        'Open': open_.ravel(),
+        'High': np.maximum(open_, close).ravel() * 1.01,
+        'Low': np.minimum(open_, close).ravel() * 0.99,
+        'Close': close.ravel(),
+        'Volume': rng.integers(10_000, 10_000_000, size=n_days * n_symbols),
+        'Month': np.repeat(np.asarray(dates.strftime('%Y-%m'), dtype=object), n_symbols),
+    })
+
+
+def inject_faults(raw_df, rate, seed=0):
+    """Break rate x rows per check on disjoint rows after the first day; returns (faulty frame, expected counts)"""
+    rng = np.random.default_rng(seed)
+    per_check = max(int(len(raw_df) * rate), 1)
+    rows = N_SYMBOLS + rng.choice(len(raw_df) - N_SYMBOLS, size=per_check * 7, replace=False).reshape(7, per_check)
+    df = raw_df.copy()
+    high, low, close = (df.columns.get_loc(col) for col in ('High', 'Low', 'Close'))
+
+    # High below Low (Open and Close then also sit outside the range)
+    df.iloc[rows[0], high] = df.iloc[rows[0], low].to_numpy() * 0.98
+    df.iloc[rows[1], close] = df.iloc[rows[1], high].to_numpy() * 1.05
+    df.iloc[rows[2], df.columns.get_loc('Volume')] = 0
+    df.iloc[rows[3], df.columns.get_loc('Date')] = 'not a date'
+    df.iloc[rows[4], df.columns.get_loc('Open')] = 0.0
+    df = pd.concat([df.drop(index=rows[5]), df.iloc[rows[6]]], ignore_index=True)
+
+    expected = {
+        'BAD_DATE': per_check,
+        'NON_POSITIVE_OHLC': per_check,
+        'HIGH_BELOW_LOW': per_check,
+        # High below Low and zeroed Opens both leave Open outside [Low, High]
+        'OPEN_OUTSIDE_RANGE': per_check * 2,
+        'CLOSE_OUTSIDE_RANGE': per_check * 2,
+        'ZERO_VOLUME': per_check,
+        'DUPLICATE_DATE': per_check,
+        # Dropped and quarantined (other than duplicate) rows each leave a missing trading day
+        'missing_days': per_check * 6,
+    }
+    return df, expected
+
+PARSER_FAULTS_YAML = """\
+- {Ticker: GOOD, date: '2024-01-02 05:30:00', open: 10.0, high: 11.0, low: 9.5, close: 10.5, volume: 1000, month: 2024-01}
+- {Ticker: TEXT, date: '2024-01-02 05:30:00', open: 10.0, high: 11.0, low: 9.5, close: N/A, volume: 1000, month: 2024-01}
+- {Ticker: NOPX, date: '2024-01-02 05:30:00', open: null, high: 11.0, low: 9.5, close: 10.5, volume: 1000, month: 2024-01}
+- {Ticker: GONE, date: '2024-01-02 05:30:00', high: 11.0, low: 9.5, close: 10.5, volume: 1000, month: 2024-01}
+- not a record
+"""
+
+
+def check_parser_faults():
+    """Unparsable prices reach validation and are quarantined as MISSING_OHLC"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, '2024-01-02_05-30-00.yaml')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(PARSER_FAULTS_YAML)
+        raw_df = columns_to_frame(parse_yaml_file(path))
+
+    clean_df, quarantine_df, report = validate_batch(raw_df)
+    assert list(clean_df['Symbol']) == ['GOOD'], list(clean_df['Symbol'])
+    assert sorted(quarantine_df['Symbol']) == ['GONE', 'NOPX', 'TEXT'], list(quarantine_df['Symbol'])
+    assert (quarantine_df['Reason'] == 'MISSING_OHLC').all(), list(quarantine_df['Reason'])
+    assert report['reasons']['MISSING_OHLC'] == 3 and report['reasons']['NON_POSITIVE_OHLC'] == 0
+    print("✓ 'N/A', null and missing prices quarantined as MISSING_OHLC")
+
+# ============================================================================
+# BENCHMARK
+# ============================================================================
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(row_counts, fault_rate, verbose):
+    check_parser_faults()
+    print(f"{'rows':>12} {'clean_batch (s)':>16} {'validate (s)':>13} {'rows/s':>12} {'quarantined':>12}")
+    for millions in row_counts:
+        raw_df, expected = inject_faults(synthetic_raw_frame(int(millions * 1_000_000)), fault_rate)
+        _, clean_s = _timed(pipeline.clean_batch, raw_df)
+        (clean_df, quarantine_df, report), validate_s = _timed(validate_batch, raw_df)
+
+        reasons = report['reasons']
+        for reason, count in expected.items():
+            if reason in reasons:
+                assert reasons[reason] == count, (reason, reasons[reason], count)
+        missing_days = sum(report['missing_days'].values())
+        assert missing_days == expected['missing_days'], (missing_days, expected['missing_days'])
+        assert len(clean_df) + len(quarantine_df) == len(raw_df)
+
+        print(f"{len(raw_df):>12,} {clean_s:>16.3f} {validate_s:>13.3f} {len(raw_df) / validate_s:>12,.0f} "
+              f"{len(quarantine_df):>12,}")
+        if verbose:
+            print(format_report(report))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=float, nargs='+', default=[1, 5], help="batch sizes in millions of rows")
+    parser.add_argument('--fault-rate', type=float, default=0.0005, help="share of rows broken per check")
+    parser.add_argument('--verbose', action='store_true', help="print each validation report")
+    args = parser.parse_args(argv)
+    run(args.rows, args.fault_rate, args.verbose)
+
+
+if __name__ == '__main__':
+    main()
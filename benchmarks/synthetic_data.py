@@ -0,0 +1,106 @@
+"""
+Synthetic Market Data Generator
+Writes a data/YYYY-MM/*.yaml tree (and a matching sector CSV) at any symbols x days scale
+
+The files follow the real schema: one YAML list per trading day, one record
+per ticker with Ticker, close, date, high, low, month, open and volume. A few
+symbols list part-way through the history, like a new index constituent.
+
+Usage:
+    python benchmarks/synthetic_data.py /tmp/nifty500 --symbols 500 --days 284
+    python benchmarks/synthetic_data.py /tmp/ten_years --symbols 50 --days 2520
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SECTORS = ['BANKING', 'FINANCE', 'IT', 'PHARMA', 'AUTOMOBILES', 'ENERGY', 'FMCG',
+           'METALS', 'CEMENT', 'POWER', 'TELECOM', 'MISCELLANEOUS']
+SECTOR_FILE = 'Sector_data - Sheet1.csv'
+LATE_LISTING_SHARE = 0.05
+
+
+def synthetic_symbols(n_symbols):
+    return [f"SYN{i:04d}" for i in range(n_symbols)]
+
+
+def _price_paths(n_symbols, n_days, rng):
+    """(open, high, low, close, volume) arrays of shape (days, symbols)"""
+    log_returns = rng.normal(0.0004, 0.018, size=(n_days, n_symbols))
+    close = rng.uniform(50, 5000, size=(1, n_symbols)) * np.exp(np.cumsum(log_returns, axis=0))
+    open_ = close * (1 + rng.normal(0, 0.006, size=close.shape))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.015, size=close.shape))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.015, size=close.shape))
+    volume = rng.integers(50_000, 20_000_000, size=close.shape)
+    return open_.round(2), high.round(2), low.round(2), close.round(2), volume
+
+
+def write_sector_csv(path, symbols):
+    """Sector CSV in the same 'COMPANY: SYMBOL' shape as the real one"""
+    pd.DataFrame({
+        'COMPANY': [f"SYNTHETIC {symbol}" for symbol in symbols],
+        'sector': [SECTORS[i % len(SECTORS)] for i in range(len(symbols))],
+        'Symbol': [f"SYNTHETIC {symbol}: {symbol}" for symbol in symbols],
+    }).to_csv(path, index=False)
+
+
+def generate_yaml_tree(root, n_symbols, n_days, seed=0, start='2015-01-01'):
+    """
+    Write root/data/YYYY-MM/YYYY-MM-DD_05-30-00.yaml for n_days business days
+    and root/Sector_data - Sheet1.csv. Returns the list of symbols.
+    """
+    root = Path(root)
+    rng = np.random.default_rng(seed)
+    symbols = synthetic_symbols(n_symbols)
+    dates = pd.bdate_range(start, periods=n_days)
+    open_, high, low, close, volume = _price_paths(n_symbols, n_days, rng)
+
+    # A few late listings: no rows before their first trading day
+    first_day = np.zeros(n_symbols, dtype=np.int64)
+    late = rng.choice(n_symbols, size=int(n_symbols * LATE_LISTING_SHARE), replace=False)
+    first_day[late] = rng.integers(1, max(n_days // 2, 2), size=len(late))
+
+    for t, date in enumerate(dates):
+        month = date.strftime('%Y-%m')
+        stamp = date.strftime('%Y-%m-%d')
+        folder = root / 'data' / month
+        folder.mkdir(parents=True, exist_ok=True)
+        records = []
+        for j in np.flatnonzero(first_day <= t):
+            records.append(
+                f"- Ticker: {symbols[j]}\n"
+                f"  close: {close[t, j]}\n"
+                f"  date: '{stamp} 05:30:00'\n"
+                f"  high: {high[t, j]}\n"
+                f"  low: {low[t, j]}\n"
+                f"  month: {month}\n"
+                f"  open: {open_[t, j]}\n"
+                f"  volume: {volume[t, j]}\n"
+            )
+        with open(folder / f"{stamp}_05-30-00.yaml", 'w', encoding='utf-8') as f:
+            f.write(''.join(records))
+
+    write_sector_csv(root / SECTOR_FILE, symbols)
+    return symbols
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('root', help="output folder (data/ and the sector CSV are written inside)")
+    parser.add_argument('--symbols', type=int, default=50)
+    parser.add_argument('--days', type=int, default=284)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if os.path.exists(os.path.join(args.root, 'data')):
+        raise SystemExit(f"{args.root}/data already exists; pick an empty folder")
+    generate_yaml_tree(args.root, args.symbols, args.days, seed=args.seed)
+    print(f"✓ Wrote {args.days:,} daily files for {args.symbols:,} symbols to {args.root}/data")
+
+
+if __name__ == '__main__':
+    main()
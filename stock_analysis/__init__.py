@@ -0,0 +1,4 @@
+"""
+Stock Analysis Pipeline
+Importable building blocks shared by Data_Preprocessing.ipynb and app.py
+"""
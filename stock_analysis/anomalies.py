@@ -0,0 +1,227 @@
+"""
+Anomaly Alerts
+Streaming volume-spike, opening-gap and intraday-range alerts in constant memory per symbol
+
+AnomalyDetector keeps, per symbol, exponentially weighted means and
+variances (span EWM_SPAN) of log volume, daily return and log intraday range,
+the previous close and a count of days seen: a fixed handful of floats,
+however long the history. Each trading day is scored against the state as
+it stood before that day, then folded in:
+
+    VOLUME_SPIKE          log-volume z-score >= VOLUME_Z
+    GAP_UP / GAP_DOWN     Open vs previous Close beyond GAP_Z typical daily
+                          moves (EW return std) and at least MIN_GAP_PCT
+    RANGE_OUTLIER         log (High - Low) / Close z-score >= RANGE_Z
+
+A symbol raises nothing until it has WARMUP_DAYS of history. Alert rows
+(ALERT_COLUMNS) carry the day's value, the baseline it was judged against
+(EW geometric-mean volume, EW return std in %, EW geometric-mean range in %) and the
+z-score. The state saves to / loads from a .npz archive like
+IndicatorState, so a daily run scores only the appended days.
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.panel import build_panel
+
+EWM_SPAN = 20
+WARMUP_DAYS = 20
+VOLUME_Z = 3.0
+GAP_Z = 3.0
+MIN_GAP_PCT = 1.0
+RANGE_Z = 3.0
+STATE_FILE = 'anomaly_state.npz'
+
+ALERT_TYPES = ['VOLUME_SPIKE', 'GAP_UP', 'GAP_DOWN', 'RANGE_OUTLIER']
+ALERT_COLUMNS = ['Date', 'Symbol', 'Sector', 'Alert', 'Value', 'Baseline', 'Z_Score']
+
+_ALPHA = 2.0 / (EWM_SPAN + 1)
+# Per-symbol state vectors
+_VECTORS = ['days', 'prev_close', 'volume_mean', 'volume_var', 'return_mean', 'return_var',
+            'range_mean', 'range_var']
+
+
+def _ew_update(mean, var, value, has_value):
+    """One exponentially weighted mean / variance step where has_value (the first value seeds the mean)"""
+    first = has_value & np.isnan(mean)
+    diff = np.where(has_value & ~first, value - mean, 0.0)
+    increment = _ALPHA * diff
+    mean = np.where(first, value, np.where(has_value, mean + increment, mean))
+    var = np.where(first, 0.0, np.where(has_value, (1 - _ALPHA) * (var + diff * increment), var))
+    return mean, var
+
+
+def _z_score(value, mean, var):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(var > 0, (value - mean) / np.sqrt(var), np.nan)
+
+
+def empty_alerts():
+    return pd.DataFrame({column: pd.Series(dtype='datetime64[ns]' if column == 'Date' else
+                                           float if column in ('Value', 'Baseline', 'Z_Score') else object)
+                         for column in ALERT_COLUMNS})
+
+
+class AnomalyDetector:
+    """Bounded per-symbol state and the alert rules (one vector entry per symbol)"""
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self.symbol_index = {}
+        self.last_date = None
+        for name in _VECTORS:
+            setattr(self, name, np.zeros(0))
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols):
+        """Extend the universe; new symbols start with no history"""
+        new = [symbol for symbol in symbols if symbol not in self.symbol_index]
+        if not new:
+            return
+        for symbol in new:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        for name in _VECTORS:
+            # Counts and variances start at 0, values as "not seen yet"
+            fill = 0.0 if name == 'days' or name.endswith('_var') else np.nan
+            setattr(self, name, np.r_[getattr(self, name), np.full(len(new), fill)])
+
+    def step(self, open_, high, low, close, volume):
+        """
+        Score one day of OHLCV vectors (NaN = did not trade) against the
+        current state, then fold the day in. Returns {alert type: (mask,
+        value, baseline, z-score)} over all symbols.
+        """
+        traded = ~np.isnan(close)
+        warm = traded & (self.days >= WARMUP_DAYS)
+        has_previous = traded & ~np.isnan(self.prev_close)
+
+        log_volume = np.log1p(np.where(traded, np.fmax(volume, 0.0), 0.0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            daily_return = np.where(has_previous, (close / self.prev_close - 1.0) * 100.0, np.nan)
+            gap = np.where(has_previous, (open_ / self.prev_close - 1.0) * 100.0, np.nan)
+            day_range = np.where(traded, (high - low) / close * 100.0, np.nan)
+            return_std = np.sqrt(self.return_var)
+            gap_z = np.where(return_std > 0, gap / return_std, np.nan)
+
+        volume_z = _z_score(log_volume, self.volume_mean, self.volume_var)
+        log_range = np.log1p(day_range)
+        range_z = _z_score(log_range, self.range_mean, self.range_var)
+        big_gap = warm & has_previous & (np.abs(gap) >= MIN_GAP_PCT) & (np.abs(gap_z) >= GAP_Z)
+        alerts = {
+            'VOLUME_SPIKE': (warm & (volume_z >= VOLUME_Z), volume, np.expm1(self.volume_mean), volume_z),
+            'GAP_UP': (big_gap & (gap > 0), gap, return_std, gap_z),
+            'GAP_DOWN': (big_gap & (gap < 0), gap, return_std, gap_z),
+            'RANGE_OUTLIER': (warm & (range_z >= RANGE_Z), day_range, np.expm1(self.range_mean), range_z),
+        }
+
+        self.volume_mean, self.volume_var = _ew_update(self.volume_mean, self.volume_var, log_volume, traded)
+        self.return_mean, self.return_var = _ew_update(self.return_mean, self.return_var,
+                                                       daily_return, has_previous)
+        self.range_mean, self.range_var = _ew_update(self.range_mean, self.range_var, log_range, traded)
+        self.prev_close = np.where(traded, close, self.prev_close)
+        self.days = self.days + traded
+        return alerts
+
+    def _alert_rows(self, date, alerts, symbols, sectors):
+        frames = []
+        for alert in ALERT_TYPES:
+            mask, value, baseline, z_score = alerts[alert]
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                frames.append(pd.DataFrame({
+                    'Date': pd.Timestamp(date),
+                    'Symbol': symbols[rows],
+                    'Sector': [sectors.get(symbol, 'Unknown') for symbol in symbols[rows]],
+                    'Alert': alert,
+                    'Value': value[rows].astype(np.float64),
+                    'Baseline': baseline[rows],
+                    'Z_Score': z_score[rows],
+                }))
+        return frames
+
+    def update(self, date, bars):
+        """
+        Add one trading day. bars is a Symbol-indexed frame with Open, High,
+        Low, Close, Volume (and optionally Sector). Returns that day's alerts.
+        """
+        self.add_symbols(bars.index)
+        slots = [self.symbol_index[symbol] for symbol in bars.index]
+        vectors = {}
+        for field in ('Open', 'High', 'Low', 'Close', 'Volume'):
+            vector = np.full(len(self.symbols), np.nan)
+            vector[slots] = bars[field].to_numpy(dtype=np.float64)
+            vectors[field] = vector
+        alerts = self.step(vectors['Open'], vectors['High'], vectors['Low'], vectors['Close'], vectors['Volume'])
+        self.last_date = pd.Timestamp(date)
+        sectors = dict(zip(bars.index, bars['Sector'])) if 'Sector' in bars.columns else {}
+        frames = self._alert_rows(date, alerts, np.asarray(self.symbols, dtype=object), sectors)
+        return pd.concat(frames, ignore_index=True) if frames else empty_alerts()
+
+    def update_frame(self, master_df):
+        """Add every trading day of master-style rows, oldest first; returns all their alerts"""
+        if master_df.empty:
+            return empty_alerts()
+        panel = build_panel(master_df)
+        self.add_symbols(panel.symbols)
+        slots = np.array([self.symbol_index[symbol] for symbol in panel.symbols], dtype=np.int64)
+        sectors = (dict(zip(master_df['Symbol'], master_df['Sector'])) if 'Sector' in master_df.columns else {})
+        symbols = np.asarray(self.symbols, dtype=object)
+        fields = [panel.values[:, :, panel.field_index[field]] for field in ('Open', 'High', 'Low', 'Close', 'Volume')]
+
+        frames = []
+        for t, date in enumerate(panel.dates):
+            vectors = []
+            for values in fields:
+                vector = np.full(len(self.symbols), np.nan)
+                vector[slots] = values[t]
+                vectors.append(vector)
+            frames.extend(self._alert_rows(date, self.step(*vectors), symbols, sectors))
+        self.last_date = panel.dates[-1]
+        return pd.concat(frames, ignore_index=True) if frames else empty_alerts()
+
+    def save(self, path):
+        """Persist the state as a .npz archive"""
+        np.savez(path, symbols=np.array(self.symbols, dtype=str),
+                 last_date=np.array(str(self.last_date) if self.last_date is not None else ''),
+                 **{name: getattr(self, name) for name in _VECTORS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            detector = cls(archive['symbols'].tolist())
+            for name in _VECTORS:
+                setattr(detector, name, archive[name].copy())
+            last_date = str(archive['last_date'])
+            detector.last_date = pd.Timestamp(last_date) if last_date else None
+        return detector
+
+
+def detect_anomalies(master_df):
+    """(AnomalyDetector fed with every day of master_df, all their alerts newest first)"""
+    detector = AnomalyDetector()
+    alerts = detector.update_frame(master_df)
+    return detector, sort_alerts(alerts)
+
+
+def sort_alerts(alerts):
+    """Newest first, strongest first within a day"""
+    order = np.lexsort((-alerts['Z_Score'].abs().to_numpy(), -alerts['Date'].to_numpy().astype(np.int64)))
+    return alerts.iloc[order].reset_index(drop=True)
+
+
+def query_alerts(alerts, types=None, symbols=None, start=None, end=None, min_z=None):
+    """Rows of an alerts table matching every given filter (None = no filter on that column)"""
+    rows = np.ones(len(alerts), dtype=bool)
+    if types:
+        rows &= alerts['Alert'].isin(types).to_numpy()
+    if symbols:
+        rows &= alerts['Symbol'].isin(symbols).to_numpy()
+    if start is not None:
+        rows &= (alerts['Date'] >= pd.Timestamp(start)).to_numpy()
+    if end is not None:
+        rows &= (alerts['Date'] <= pd.Timestamp(end)).to_numpy()
+    if min_z is not None:
+        rows &= (alerts['Z_Score'].abs() >= min_z).to_numpy()
+    return alerts[rows]
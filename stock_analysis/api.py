@@ -0,0 +1,495 @@
+"""
+Read-Only Query API
+Local HTTP endpoints over the current snapshot, answered as compact JSON or Arrow
+
+Usage:
+    python -m stock_analysis.api --port 8600
+
+Endpoints (GET):
+    /api/summary                                   market summary of the snapshot
+    /api/metrics?symbols=TCS,INFY&sector=IT        yearly metrics per stock
+    /api/top?n=10&by=Yearly_Return                 best n stocks (/api/worst: worst n)
+    /api/sectors                                   Sector Analysis aggregates
+    /api/monthly?symbols=TCS&start=2024-01&end=2024-06
+    /api/prices/TCS?start=2024-01-01&end=2024-06-30&resolution=weekly
+    /api/correlation/pairs?symbols=TCS,INFY,WIPRO&k=5
+    /api/alerts?type=VOLUME_SPIKE,GAP_DOWN&symbols=TCS&start=2024-06-01&min_z=4
+
+Tables are returned as {"columns": [...], "data": [[...], ...]}, or as an
+Arrow IPC stream with ?format=arrow or Accept: application/vnd.apache.arrow.stream.
+Every response carries an ETag built from the snapshot version, so a client
+that sends it back in If-None-Match gets an empty 304 until a new snapshot
+is published. Bodies over GZIP_MIN_BYTES are gzip-compressed for clients
+that accept it. Each request runs on its own thread; the snapshot tables
+are memory-mapped once and shared by every thread, and encoded bodies are
+kept in a small LRU so repeated queries skip pandas entirely.
+"""
+
+import argparse
+import gzip
+import json
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from stock_analysis.anomalies import ALERT_TYPES, detect_anomalies, query_alerts
+from stock_analysis.correlation import PairIndex
+from stock_analysis.metrics import compute_sector_performance
+from stock_analysis.panel import build_panel
+from stock_analysis.pyramid import RESOLUTIONS, build_bars
+from stock_analysis.snapshot import SNAPSHOT_DIR, SnapshotError, load_table, read_manifest
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8600
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+RESPONSE_CACHE_ENTRIES = 256
+MANIFEST_CHECK_S = 2.0
+MAX_TOP_N = 500
+JSON_TYPE = 'application/json'
+ARROW_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+class ApiError(Exception):
+    """Request that cannot be answered; carries the HTTP status to reply with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# ============================================================================
+# SNAPSHOT ACCESS
+# ============================================================================
+
+class SnapshotSource:
+    """The current snapshot's tables and derived indexes, reloaded when the manifest moves to a new version"""
+
+    def __init__(self, root=SNAPSHOT_DIR, check_interval=MANIFEST_CHECK_S):
+        self.root = root
+        self.check_interval = check_interval
+        self.manifest = None
+        self._checked = 0.0
+        self._values = {}
+        self._manifest_lock = threading.Lock()
+        self._build_lock = threading.RLock()  # derived values load their tables through value() too
+
+    def current(self):
+        """Manifest of the current version (re-read at most every check_interval seconds)"""
+        with self._manifest_lock:
+            now = time.monotonic()
+            if self.manifest is None or now - self._checked >= self.check_interval:
+                self.manifest = read_manifest(self.root)
+                self._checked = now
+            return self.manifest
+
+    def value(self, manifest, name, build):
+        """build(manifest) once per snapshot version; values of older versions are dropped"""
+        key = (manifest['build_hash'], name)
+        with self._build_lock:
+            if key not in self._values:
+                self._values = {k: v for k, v in self._values.items() if k[0] == key[0]}
+                self._values[key] = build(manifest)
+            return self._values[key]
+
+    def table(self, manifest, name):
+        return self.value(manifest, name, lambda m: load_table(name, self.root, m))
+
+    def panel(self, manifest):
+        return self.value(manifest, 'price_panel', lambda m: build_panel(self.table(m, 'master_data')))
+
+    def pair_index(self, manifest):
+        return self.value(manifest, 'pair_index', lambda m: PairIndex(self.table(m, 'correlation_matrix')))
+
+    def sector_performance(self, manifest):
+        return self.value(manifest, 'sector_performance',
+                          lambda m: compute_sector_performance(self.table(m, 'metrics')))
+
+    def alerts(self, manifest):
+        if 'alerts' in manifest['tables']:
+            return self.table(manifest, 'alerts')
+        return self.value(manifest, 'alerts', lambda m: detect_anomalies(self.table(m, 'master_data'))[1])
+
+    def bars(self, manifest, resolution):
+        name = f"bars_{resolution}"
+        if name in manifest['tables']:
+            return self.table(manifest, name)
+        return self.value(manifest, name, lambda m: build_bars(self.table(m, 'master_data'), resolution))
+
+# ============================================================================
+# QUERY PARAMETERS
+# ============================================================================
+
+def _param(params, name, default=None):
+    values = params.get(name)
+    return values[-1] if values else default
+
+
+def _int_param(params, name, default, low, high):
+    raw = _param(params, name)
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be an integer, got {raw!r}")
+    if not low <= value <= high:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _date_param(params, name):
+    raw = _param(params, name)
+    if raw is None:
+        return None
+    try:
+        return pd.Timestamp(raw)
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} is not a date: {raw!r}")
+
+
+def _list_param(params, name):
+    """Comma-separated values (repeated parameters are merged), or None when absent"""
+    values = [item.strip() for raw in params.get(name, []) for item in raw.split(',') if item.strip()]
+    return values or None
+
+
+def _symbols_param(params, known):
+    symbols = _list_param(params, 'symbols')
+    if symbols is None:
+        return None
+    unknown = [symbol for symbol in symbols if symbol not in known]
+    if unknown:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown symbol(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(symbols))
+
+
+def _columns_param(params, df, always=()):
+    columns = _list_param(params, 'columns')
+    if columns is None:
+        return df
+    unknown = [column for column in columns if column not in df.columns]
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown column(s): {', '.join(unknown)}")
+    return df[list(dict.fromkeys([*always, *columns]))]
+
+# ============================================================================
+# ENDPOINTS
+# ============================================================================
+
+def get_summary(source, manifest, params, match):
+    return dict(manifest['market_summary'], snapshot_version=manifest['build_hash'],
+                created_at=manifest.get('created_at'))
+
+
+def get_metrics(source, manifest, params, match):
+    metrics_df = source.table(manifest, 'metrics')
+    symbols = _symbols_param(params, set(metrics_df['Symbol']))
+    sectors = _list_param(params, 'sector')
+    rows = np.ones(len(metrics_df), dtype=bool)
+    if symbols is not None:
+        rows &= metrics_df['Symbol'].isin(symbols).to_numpy()
+    if sectors is not None:
+        rows &= metrics_df['Sector'].isin(sectors).to_numpy()
+    return _columns_param(params, metrics_df[rows], always=['Symbol'])
+
+
+def _ranked(source, manifest, params, best):
+    metrics_df = source.table(manifest, 'metrics')
+    n = _int_param(params, 'n', 10, 1, MAX_TOP_N)
+    by = _param(params, 'by', 'Yearly_Return')
+    if by not in metrics_df.columns or not pd.api.types.is_numeric_dtype(metrics_df[by]):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Cannot rank by {by!r}")
+    ranked = metrics_df.nlargest(n, by) if best else metrics_df.nsmallest(n, by)
+    return _columns_param(params, ranked, always=['Symbol', by])
+
+
+def get_top(source, manifest, params, match):
+    return _ranked(source, manifest, params, best=True)
+
+
+def get_worst(source, manifest, params, match):
+    return _ranked(source, manifest, params, best=False)
+
+
+def get_sectors(source, manifest, params, match):
+    return source.sector_performance(manifest)
+
+
+def get_monthly(source, manifest, params, match):
+    monthly_df = source.table(manifest, 'monthly_performance')
+    symbols = _symbols_param(params, set(monthly_df['Symbol']))
+    rows = np.ones(len(monthly_df), dtype=bool)
+    if symbols is not None:
+        rows &= monthly_df['Symbol'].isin(symbols).to_numpy()
+    # Month_Year is 'YYYY-MM', so month bounds compare as strings
+    start, end = _param(params, 'start'), _param(params, 'end')
+    for bound in (start, end):
+        if bound is not None and not re.fullmatch(r'\d{4}-\d{2}', bound):
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"Months are YYYY-MM, got {bound!r}")
+    month = monthly_df['Month_Year'].astype(str)
+    if start is not None:
+        rows &= (month >= start).to_numpy()
+    if end is not None:
+        rows &= (month <= end).to_numpy()
+    return monthly_df[rows]
+
+
+def get_prices(source, manifest, params, match):
+    symbol = match.group('symbol')
+    panel = source.panel(manifest)
+    if symbol not in panel:
+        raise ApiError(HTTPStatus.NOT_FOUND, f"Unknown symbol: {symbol}")
+    start, end = _date_param(params, 'start'), _date_param(params, 'end')
+    resolution = _param(params, 'resolution', 'daily')
+    if resolution not in RESOLUTIONS:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    if resolution == 'daily':
+        history = panel.symbol_frame(symbol)
+    else:
+        bars = source.bars(manifest, resolution)
+        history = bars[bars['Symbol'] == symbol].drop(columns='Symbol')
+    if start is not None:
+        history = history[history['Date'] >= start]
+    if end is not None:
+        # A bare end date covers that whole day (rows are stamped 05:30)
+        if end == end.normalize():
+            end += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+        history = history[history['Date'] <= end]
+    return _columns_param(params, history, always=['Date'])
+
+
+def get_correlation_pairs(source, manifest, params, match):
+    pair_index = source.pair_index(manifest)
+    symbols = _symbols_param(params, pair_index.symbol_index)
+    k = _int_param(params, 'k', 5, 1, max(len(pair_index), 1))
+    highest, lowest = pair_index.extremes(symbols, k=k)
+    return pd.concat([highest.assign(Side='highest'), lowest.assign(Side='lowest')], ignore_index=True)
+
+
+def get_alerts(source, manifest, params, match):
+    alerts = source.alerts(manifest)
+    types = _list_param(params, 'type')
+    unknown = [alert for alert in types or [] if alert not in ALERT_TYPES]
+    if unknown:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"Unknown alert type(s): {', '.join(unknown)}; "
+                                               f"expected {', '.join(ALERT_TYPES)}")
+    raw_min_z = _param(params, 'min_z')
+    try:
+        min_z = float(raw_min_z) if raw_min_z is not None else None
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"min_z must be a number, got {raw_min_z!r}")
+    start, end = _date_param(params, 'start'), _date_param(params, 'end')
+    if end is not None and end == end.normalize():
+        end += pd.Timedelta(days=1) - pd.Timedelta(1, 'ns')
+    return query_alerts(alerts, types=types, symbols=_list_param(params, 'symbols'),
+                        start=start, end=end, min_z=min_z)
+
+
+# (pattern, handler); patterns match the path after API_PREFIX
+API_PREFIX = '/api'
+ROUTES = [
+    (re.compile(r'/summary'), get_summary),
+    (re.compile(r'/metrics'), get_metrics),
+    (re.compile(r'/top'), get_top),
+    (re.compile(r'/worst'), get_worst),
+    (re.compile(r'/sectors'), get_sectors),
+    (re.compile(r'/monthly'), get_monthly),
+    (re.compile(r'/prices/(?P<symbol>[^/]+)'), get_prices),
+    (re.compile(r'/correlation/pairs'), get_correlation_pairs),
+    (re.compile(r'/alerts'), get_alerts),
+]
+
+
+def route(path):
+    """(handler, match) for a request path; raises ApiError(404) when nothing matches"""
+    if path.startswith(API_PREFIX):
+        for pattern, handler in ROUTES:
+            match = pattern.fullmatch(path[len(API_PREFIX):].rstrip('/') or '/')
+            if match:
+                return handler, match
+    raise ApiError(HTTPStatus.NOT_FOUND, f"No endpoint at {path}")
+
+# ============================================================================
+# ENCODING
+# ============================================================================
+
+def encode_json(result):
+    """DataFrame -> {"columns", "data"} (dates as ISO strings, NaN as null); dicts as plain JSON"""
+    if isinstance(result, pd.DataFrame):
+        return result.to_json(orient='split', index=False, date_format='iso').encode('utf-8')
+    return json.dumps(result, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def encode_arrow(result):
+    """DataFrame (or a dict, as one row) -> Arrow IPC stream bytes"""
+    if not isinstance(result, pd.DataFrame):
+        result = pd.DataFrame([result])
+    table = pa.Table.from_pandas(result, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+ENCODERS = {'json': (JSON_TYPE, encode_json), 'arrow': (ARROW_TYPE, encode_arrow)}
+
+
+def negotiate_format(params, accept):
+    fmt = _param(params, 'format')
+    if fmt is None:
+        fmt = 'arrow' if ARROW_TYPE in (accept or '') else 'json'
+    if fmt not in ENCODERS:
+        raise ApiError(HTTPStatus.NOT_ACCEPTABLE, f"format must be one of {', '.join(ENCODERS)}")
+    return fmt
+
+
+def accepts_gzip(accept_encoding):
+    for coding in (accept_encoding or '').split(','):
+        name, _, qvalue = coding.strip().partition(';')
+        if name.strip().lower() in ('gzip', '*'):
+            return qvalue.strip().replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check with weak comparison, as RFC 9110 asks for GET"""
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in tags or etag.removeprefix('W/') in [tag.removeprefix('W/') for tag in tags]
+
+
+class ResponseCache:
+    """LRU of encoded response bodies, keyed by snapshot version and the normalized request"""
+
+    def __init__(self, max_entries=RESPONSE_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class ApiRequestHandler(BaseHTTPRequestHandler):
+    """GET-only handler; the server supplies .source (SnapshotSource) and .responses (ResponseCache)"""
+
+    server_version = 'StockAnalysisAPI/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = parse_qs(url.query)
+        try:
+            handler, match = route(url.path)
+            try:
+                manifest = self.server.source.current()
+            except SnapshotError as e:
+                raise ApiError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+            fmt = negotiate_format(params, self.headers.get('Accept'))
+            gzipped = accepts_gzip(self.headers.get('Accept-Encoding'))
+            version = manifest['build_hash']
+            # One tag per snapshot version and representation
+            etag = f'"{version}-{fmt}{"-gz" if gzipped else ""}"'
+            if etag_matches(self.headers.get('If-None-Match'), etag):
+                self._send(HTTPStatus.NOT_MODIFIED, etag=etag, version=version)
+                return
+
+            key = (version, url.path, tuple(sorted((k, tuple(v)) for k, v in params.items())), fmt, gzipped)
+            cached = self.server.responses.get(key)
+            if cached is None:
+                body = ENCODERS[fmt][1](handler(self.server.source, manifest, params, match))
+                encoding = None
+                if gzipped and len(body) >= GZIP_MIN_BYTES:
+                    body, encoding = gzip.compress(body, compresslevel=GZIP_LEVEL), 'gzip'
+                cached = (body, encoding)
+                self.server.responses.put(key, cached)
+            body, encoding = cached
+            self._send(HTTPStatus.OK, body, ENCODERS[fmt][0], etag=etag, version=version, encoding=encoding)
+        except ApiError as e:
+            self._send_error(e.status, str(e))
+        except Exception as e:  # never let one bad request take the thread down silently
+            self.log_error("Unhandled error for %s: %r", self.path, e)
+            self._send_error(HTTPStatus.INTERNAL_SERVER_ERROR, 'Internal error')
+
+    def _send(self, status, body=b'', content_type=None, etag=None, version=None, encoding=None):
+        self.send_response(status)
+        if content_type:
+            self.send_header('Content-Type', content_type)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if etag:
+            self.send_header('ETag', etag)
+            # Clients may store the body but must revalidate: a new snapshot can land at any time
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept, Accept-Encoding')
+        if version:
+            self.send_header('X-Snapshot-Version', version)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def _send_error(self, status, message):
+        self._send(status, encode_json({'error': message, 'status': int(status)}), JSON_TYPE)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    """One thread per connection, sharing the snapshot source and response cache"""
+
+    daemon_threads = True
+
+    def __init__(self, address, source=None, quiet=False):
+        super().__init__(address, ApiRequestHandler)
+        self.source = source or SnapshotSource()
+        self.responses = ResponseCache()
+        self.quiet = quiet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only HTTP query API over the processed snapshot")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--snapshot', default=SNAPSHOT_DIR)
+    parser.add_argument('--quiet', action='store_true', help="no per-request access log")
+    args = parser.parse_args(argv)
+
+    server = ApiServer((args.host, args.port), SnapshotSource(args.snapshot), quiet=args.quiet)
+    print(f"✓ Serving snapshot API on http://{args.host}:{server.server_port}{API_PREFIX}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,286 @@
+"""
+Correlation Engine
+Streaming return correlations plus top/bottom-k pair extraction
+
+CorrelationState keeps pairwise Welford co-moments of daily returns (count,
+means, M2 and co-moment for every symbol pair), so one new trading day is an
+O(symbols^2) update instead of a rescan of the whole history. Pairs only
+accumulate on days when both symbols have a return, which matches pandas'
+pairwise-complete DataFrame.corr(). With a halflife the co-moments decay
+every day (exponentially weighted correlation). correlation_matrix() and the
+long Power BI table both come from the same state.
+
+top_k_pairs() takes the strict upper triangle (np.triu_indices) and picks the
+extremes with np.argpartition, so only 2k of the n(n-1)/2 pairs are ever
+sorted. PairIndex sorts every pair once per snapshot; a query for any symbol
+subset then walks the sorted pairs from either end and stops at the first k
+pairs whose two symbols are both in the subset.
+"""
+
+import numpy as np
+import pandas as pd
+
+PAIR_COLUMNS = ['Stock 1', 'Stock 2', 'Correlation']
+LONG_COLUMNS = ['Stock1', 'Stock2', 'Correlation']
+STATE_FILE = 'correlation_state.npz'
+MOMENTS = ['count', 'mean_x', 'mean_y', 'm2_x', 'm2_y', 'comoment']
+
+# ============================================================================
+# STREAMING ENGINE
+# ============================================================================
+
+class CorrelationState:
+    """
+    Pairwise running co-moments of daily returns.
+
+    Every moment is a symbols x symbols array where entry [i, j] covers the
+    days on which both i and j traded: mean_x is i's mean over those days,
+    mean_y is j's, m2_x/m2_y their sums of squared deviations and comoment
+    the sum of cross deviations. count is the (decayed) weight of those days.
+    """
+
+    def __init__(self, symbols=(), halflife=None):
+        self.symbols = []
+        self.symbol_index = {}
+        self.halflife = halflife
+        self.decay = 0.5 ** (1.0 / halflife) if halflife else 1.0
+        self.last_date = None
+        self.days = 0
+        for name in MOMENTS:
+            setattr(self, name, np.zeros((0, 0)))
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols):
+        """Extend the universe; new symbols start with no history"""
+        new = [symbol for symbol in symbols if symbol not in self.symbol_index]
+        if not new:
+            return
+        for symbol in new:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        n = len(self.symbols)
+        for name in MOMENTS:
+            grown = np.zeros((n, n))
+            old = getattr(self, name)
+            grown[:len(old), :len(old)] = old
+            setattr(self, name, grown)
+
+    def update(self, date, returns):
+        """
+        Add one trading day. returns maps symbol -> daily return (a dict or
+        Series); NaN or absent symbols did not trade that day.
+        """
+        returns = pd.Series(returns, dtype=np.float64)
+        self.add_symbols(returns.index)
+        x = np.full(len(self.symbols), np.nan)
+        x[[self.symbol_index[symbol] for symbol in returns.index]] = returns.to_numpy()
+        self._update_vector(x)
+        self.last_date = pd.Timestamp(date)
+        self.days += 1
+
+    def _update_vector(self, x):
+        """Welford / West update of every pair in one vectorized pass"""
+        if self.decay != 1.0:
+            for name in ('count', 'm2_x', 'm2_y', 'comoment'):
+                getattr(self, name)[...] *= self.decay
+
+        traded = ~np.isnan(x)
+        rows = np.flatnonzero(traded)
+        if len(rows) == 0:
+            return
+        pair = np.ix_(rows, rows)
+        xs = x[rows]
+        xi, xj = xs[:, None], xs[None, :]
+
+        count = self.count[pair] + 1.0
+        dx = xi - self.mean_x[pair]
+        dy = xj - self.mean_y[pair]
+        mean_x = self.mean_x[pair] + dx / count
+        mean_y = self.mean_y[pair] + dy / count
+
+        self.count[pair] = count
+        self.mean_x[pair] = mean_x
+        self.mean_y[pair] = mean_y
+        self.m2_x[pair] += dx * (xi - mean_x)
+        self.m2_y[pair] += dy * (xj - mean_y)
+        self.comoment[pair] += dx * (xj - mean_y)
+
+    def update_frame(self, returns_wide):
+        """Add every row of a Date x Symbol returns frame, oldest first"""
+        returns_wide = returns_wide.sort_index()
+        self.add_symbols(returns_wide.columns)
+        columns = [self.symbol_index[symbol] for symbol in returns_wide.columns]
+        for date, row in zip(returns_wide.index, returns_wide.to_numpy(dtype=np.float64)):
+            x = np.full(len(self.symbols), np.nan)
+            x[columns] = row
+            self._update_vector(x)
+            self.last_date = pd.Timestamp(date)
+            self.days += 1
+
+    def _symbol_frame(self, values, decimals=None):
+        """Symbol x Symbol frame with rows/columns sorted by symbol"""
+        order = np.argsort(self.symbols, kind='stable')
+        symbols = pd.Index([self.symbols[i] for i in order], name='Symbol')
+        matrix = pd.DataFrame(values[np.ix_(order, order)], index=symbols, columns=symbols.copy())
+        return matrix.round(decimals) if decimals is not None else matrix
+
+    def covariance_matrix(self, decimals=None):
+        """Sample covariance (ddof=1 on the full-history state); NaN below 2 shared days"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = np.where(self.count > 1, self.comoment / (self.count - 1), np.nan)
+        return self._symbol_frame(cov, decimals)
+
+    def correlation_matrix(self, decimals=None):
+        """Symbol x Symbol correlation, optionally rounded"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = self.comoment / np.sqrt(self.m2_x * self.m2_y)
+        corr = np.where(self.count > 1, np.clip(corr, -1.0, 1.0), np.nan)
+        np.fill_diagonal(corr, np.where(np.diag(self.m2_x) > 0, 1.0, np.nan))
+        return self._symbol_frame(corr, decimals)
+
+    def to_long(self, decimals=None):
+        """Long Stock1 / Stock2 / Correlation table (Power BI 05_correlations.csv)"""
+        return correlation_long(self.correlation_matrix(decimals))
+
+    def save(self, path):
+        """Persist the state as a .npz archive"""
+        np.savez(path, symbols=np.array(self.symbols, dtype=str),
+                 halflife=np.array(self.halflife or 0.0), days=np.array(self.days),
+                 last_date=np.array(str(self.last_date) if self.last_date is not None else ''),
+                 **{name: getattr(self, name) for name in MOMENTS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            state = cls(halflife=float(archive['halflife']) or None)
+            state.add_symbols(archive['symbols'].tolist())
+            for name in MOMENTS:
+                setattr(state, name, archive[name].copy())
+            state.days = int(archive['days'])
+            last_date = str(archive['last_date'])
+            state.last_date = pd.Timestamp(last_date) if last_date else None
+        return state
+
+
+def returns_matrix(master_df, after=None):
+    """Date x Symbol daily returns, optionally only for dates after a timestamp"""
+    if after is not None:
+        master_df = master_df[master_df['Date'] > after]
+    return master_df.pivot_table(index='Date', columns='Symbol', values='Daily_Return', dropna=False)
+
+
+def build_correlation_state(master_df, halflife=None):
+    """Fresh CorrelationState fed with every trading day in master_df"""
+    state = CorrelationState(sorted(master_df['Symbol'].unique()), halflife=halflife)
+    state.update_frame(returns_matrix(master_df))
+    return state
+
+
+def correlation_long(correlation_matrix):
+    """Symbol x Symbol matrix -> Stock1 / Stock2 / Correlation rows, self-pairs dropped"""
+    symbols = np.asarray(correlation_matrix.columns, dtype=object)
+    values = correlation_matrix.to_numpy()
+    first, second = np.nonzero(~np.eye(len(symbols), dtype=bool))
+    return pd.DataFrame({'Stock1': symbols[first], 'Stock2': symbols[second],
+                         'Correlation': values[first, second]}, columns=LONG_COLUMNS)
+
+# ============================================================================
+# PAIR ENGINE
+# ============================================================================
+
+
+def upper_pairs(correlation_matrix):
+    """(first, second, values) for every i < j pair, NaN correlations dropped"""
+    values = correlation_matrix.to_numpy(dtype=np.float64)
+    first, second = np.triu_indices(len(values), k=1)
+    pair_values = values[first, second]
+    keep = ~np.isnan(pair_values)
+    return first[keep], second[keep], pair_values[keep]
+
+
+def _pairs_frame(symbols, first, second, values):
+    symbols = np.asarray(symbols, dtype=object)
+    return pd.DataFrame({'Stock 1': symbols[first], 'Stock 2': symbols[second], 'Correlation': values},
+                        columns=PAIR_COLUMNS)
+
+
+def top_k_pairs(correlation_matrix, k=5):
+    """
+    (highest, lowest) k pairs as 'Stock 1' / 'Stock 2' / 'Correlation' frames.
+
+    highest is sorted descending; lowest is the bottom k in the same
+    descending order the page shows (last row = most negative).
+    """
+    first, second, values = upper_pairs(correlation_matrix)
+    k = min(k, len(values))
+    if k == 0:
+        empty = _pairs_frame([], [], [], [])
+        return empty, empty.copy()
+
+    top = np.argpartition(-values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind='stable')]
+    bottom = np.argpartition(values, k - 1)[:k]
+    bottom = bottom[np.argsort(-values[bottom], kind='stable')]
+
+    symbols = correlation_matrix.columns
+    return (_pairs_frame(symbols, first[top], second[top], values[top]),
+            _pairs_frame(symbols, first[bottom], second[bottom], values[bottom]))
+
+
+class PairIndex:
+    """Every upper-triangle pair of a correlation matrix, sorted by correlation (descending)"""
+
+    SCAN_CHUNK = 4096
+
+    def __init__(self, correlation_matrix):
+        self.symbols = list(correlation_matrix.columns)
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        first, second, values = upper_pairs(correlation_matrix)
+        order = np.argsort(-values, kind='stable')
+        self.first = first[order]
+        self.second = second[order]
+        self.values = values[order]
+
+    def __len__(self):
+        return len(self.values)
+
+    def _scan(self, member, k, from_end):
+        """Positions of the first k sorted pairs (from the top or bottom) with both symbols in member"""
+        n = len(self.values)
+        found = []
+        for offset in range(0, n, self.SCAN_CHUNK):
+            if from_end:
+                lo, hi = max(n - offset - self.SCAN_CHUNK, 0), n - offset
+            else:
+                lo, hi = offset, min(offset + self.SCAN_CHUNK, n)
+            hits = np.flatnonzero(member[self.first[lo:hi]] & member[self.second[lo:hi]]) + lo
+            found.extend((hits[::-1] if from_end else hits)[:k - len(found)])
+            if len(found) >= k:
+                break
+        return np.sort(np.asarray(found, dtype=np.int64))
+
+    def extremes(self, symbols=None, k=5):
+        """
+        (highest, lowest) k pairs among symbols (default: all), shaped like
+        top_k_pairs(). Within a pair, 'Stock 1' is the symbol listed first in
+        symbols.
+        """
+        if symbols is None:
+            position = np.arange(len(self.symbols))
+            k = min(k, len(self.values))
+            top = np.arange(k)
+            bottom = np.arange(len(self.values) - k, len(self.values))
+        else:
+            position = np.full(len(self.symbols), -1)
+            columns = [self.symbol_index[symbol] for symbol in symbols]
+            position[columns] = np.arange(len(columns))
+            member = position >= 0
+            top = self._scan(member, k, from_end=False)
+            bottom = self._scan(member, k, from_end=True)
+        return self._frame(top, position), self._frame(bottom, position)
+
+    def _frame(self, rows, position):
+        first, second = self.first[rows], self.second[rows]
+        swap = position[first] > position[second]
+        first, second = np.where(swap, second, first), np.where(swap, first, second)
+        return _pairs_frame(self.symbols, first, second, self.values[rows])
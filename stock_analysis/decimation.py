@@ -0,0 +1,92 @@
+"""
+Chart Decimation
+Reduce long price / return series to a fixed point budget before plotting
+
+A line chart cannot show more than a couple of points per horizontal pixel,
+so sending every observation of a multi-year (or intraday) series only makes
+the Plotly payload larger and the browser slower. Two reducers are offered:
+
+- 'minmax' splits the series into (budget - 2) // 2 equal buckets and keeps
+  the lowest and highest point of each, so every peak and trough survives.
+- 'lttb' (Largest-Triangle-Three-Buckets) keeps one point per bucket, the
+  one forming the largest triangle with its neighbours' picks; it follows
+  the visual shape closely with fewer points.
+
+Both always keep the first and last point. Missing values are skipped, but
+the first NaN after each run is kept so Plotly still draws the gap. Series
+at or under the budget are returned unchanged.
+"""
+
+import numpy as np
+
+DECIMATION_METHODS = ('minmax', 'lttb')
+
+
+def _as_float(x):
+    """Datetime or numeric x values as float64 (ns since epoch for dates)"""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+def minmax_indices(y, budget):
+    """Positions of the min and max of each of (budget - 2) // 2 equal buckets, plus both ends"""
+    n = len(y)
+    size = -(-n // max((budget - 2) // 2, 1))
+    rows = -(-n // size)
+    # Pad the tail bucket so every bucket is a row of the same length
+    padded = np.full(rows * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(rows, size)
+    offsets = np.arange(rows) * size
+    lows = offsets + np.argmin(np.where(np.isnan(padded), np.inf, padded), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(padded), -np.inf, padded), axis=1)
+    return np.unique(np.r_[0, lows, highs, n - 1])
+
+
+def lttb_indices(x, y, budget):
+    """Largest-Triangle-Three-Buckets: budget positions including both ends"""
+    n = len(y)
+    budget = max(budget, 3)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    selected = np.empty(budget, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for b in range(budget - 2):
+        lo, hi = edges[b], edges[b + 1]
+        # Average of the next bucket (the last point for the final bucket)
+        next_lo, next_hi = hi, edges[b + 2] if b + 2 < len(edges) else n
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        px, py = x[previous], y[previous]
+        area = np.abs((px - avg_x) * (y[lo:hi] - py) - (px - x[lo:hi]) * (avg_y - py))
+        previous = lo + int(np.argmax(area))
+        selected[b + 1] = previous
+    return selected
+
+
+def decimate_indices(x, y, budget, method='minmax'):
+    """Sorted positions of the points to keep from (x, y); all of them when under budget"""
+    if method not in DECIMATION_METHODS:
+        raise ValueError(f"Unknown decimation method {method!r}; expected one of {DECIMATION_METHODS}")
+    y = np.asarray(y, dtype=np.float64)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= budget:
+        return np.arange(len(y))
+
+    if method == 'minmax':
+        keep = valid[minmax_indices(y[valid], budget)]
+    else:
+        keep = valid[lttb_indices(_as_float(x)[valid], y[valid], budget)]
+
+    # Keep the NaN that ends each run so the line still breaks at gaps
+    missing = np.isnan(y)
+    gap_starts = np.flatnonzero(missing[1:] & ~missing[:-1]) + 1
+    return np.union1d(keep, gap_starts)
+
+
+def decimate_series(series, budget, method='minmax'):
+    """Index-preserving subset of a Series (e.g. Date-indexed prices) within budget points"""
+    positions = decimate_indices(series.index.to_numpy(), series.to_numpy(dtype=np.float64), budget, method)
+    return series.iloc[positions]
+
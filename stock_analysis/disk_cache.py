@@ -0,0 +1,247 @@
+"""
+Shared Disk Cache
+SQLite index + memory-mapped array files for derived results, shared by every dashboard process on a host
+
+st.cache_resource only lives inside one Streamlit process and is lost on
+restart, so each replica behind a load balancer rebuilds the price panel,
+pair ranking and sector tables on its own. DiskCache stores those results
+once per host, keyed by (key, snapshot version), in a SQLite file (WAL mode,
+so readers never block each other). Values are pickled with protocol 5:
+small objects sit in the SQLite row, while every large array buffer
+(>= MMAP_MIN_BYTES) goes to its own file and is memory-mapped back on a
+hit. A cached price panel therefore loads without copying, and all workers
+share the same page-cache pages.
+
+Entries expire after a TTL and the least recently used ones are evicted
+past a size limit. The host-wide current snapshot version is the one first
+seen most recently (recorded in the versions table); every write drops
+expired entries and entries of any other version, and a worker still on
+an older manifest never stores its results, so old-version entries cannot
+come back after a purge. While one process computes a missing entry, the
+others wait on a per-key file lock and then read its result instead of
+computing it again.
+
+Values are pickled, so the cache file must only be shared between trusted
+processes of this app.
+"""
+
+import contextlib
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process compute lock, workers may compute twice
+    fcntl = None
+
+CACHE_PATH = os.environ.get('STOCK_DASHBOARD_CACHE', './processed_data/cache/shared_cache.sqlite')
+DEFAULT_TTL_S = 24 * 60 * 60
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+MMAP_MIN_BYTES = 256 * 1024
+# Snapshot versions remembered host-wide (a worker this many snapshots behind would re-register its own)
+VERSION_HISTORY = 32
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key      TEXT NOT NULL,
+    version  TEXT NOT NULL,
+    value    BLOB NOT NULL,
+    files    TEXT NOT NULL,
+    size     INTEGER NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (key, version)
+);
+CREATE TABLE IF NOT EXISTS versions (
+    version    TEXT PRIMARY KEY,
+    first_seen REAL NOT NULL
+);
+"""
+
+
+class DiskCache:
+    """Process-shared key/value cache with TTL, LRU size eviction and snapshot versioning"""
+
+    def __init__(self, path=CACHE_PATH, ttl=DEFAULT_TTL_S, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock_dir = self.path.parent / f"{self.path.stem}.locks"
+        self.blob_dir = self.path.parent / f"{self.path.stem}.blobs"
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._version = None
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.executescript(_SCHEMA)
+
+    def _connection(self):
+        """One autocommit connection per thread (sqlite3 connections are not shareable across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def use_version(self, version):
+        """Register version host-wide and purge other versions' entries (once per new version in this process)"""
+        if version == self._version:
+            return
+        self._version = version
+        now = time.time()
+        with self._transaction() as conn:
+            self._purge(conn, self._register(conn, version, now), now)
+
+    def _register(self, conn, version, now):
+        """Record version's first sighting; returns the host-wide current (most recently first-seen) version"""
+        conn.execute('INSERT OR IGNORE INTO versions VALUES (?, ?)', (str(version), now))
+        conn.execute('DELETE FROM versions WHERE version NOT IN '
+                     '(SELECT version FROM versions ORDER BY first_seen DESC LIMIT ?)', (VERSION_HISTORY,))
+        return conn.execute('SELECT version FROM versions ORDER BY first_seen DESC LIMIT 1').fetchone()[0]
+
+    def _purge(self, conn, current, now):
+        """Drop entries of every version but current, and entries older than the TTL"""
+        self._delete(conn, 'version != ? OR created < ?', (current, now - self.ttl))
+
+    def _delete(self, conn, where, params):
+        """Delete matching rows and their array files"""
+        for (files,) in conn.execute(f'SELECT files FROM entries WHERE {where}', params).fetchall():
+            self._unlink(json.loads(files))
+        conn.execute(f'DELETE FROM entries WHERE {where}', params)
+
+    def _unlink(self, files):
+        for name in files:
+            # Readers that still map the file keep their pages (POSIX); Windows may refuse
+            with contextlib.suppress(OSError):
+                os.remove(self.blob_dir / name)
+
+    def get(self, key, version):
+        """Cached value, or None when missing or older than the TTL"""
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute('SELECT value, files, created FROM entries WHERE key = ? AND version = ?',
+                           (key, str(version))).fetchone()
+        if row is None or now - row[2] > self.ttl:
+            self.misses += 1
+            if row is not None:
+                with self._transaction() as conn:
+                    self._delete(conn, 'key = ? AND version = ? AND created < ?', (key, str(version), now - self.ttl))
+            return None
+        try:
+            buffers = [self._map(name) for name in json.loads(row[1])]
+        except OSError:
+            # Array file evicted by another process between the SELECT and here
+            self.misses += 1
+            return None
+        conn.execute('UPDATE entries SET accessed = ? WHERE key = ? AND version = ?', (now, key, str(version)))
+        self.hits += 1
+        return pickle.loads(row[0], buffers=buffers)
+
+    def _map(self, name):
+        with open(self.blob_dir / name, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def put(self, key, version, value):
+        out_of_band = []
+
+        def in_band(buffer):
+            if buffer.raw().nbytes < MMAP_MIN_BYTES:
+                return True
+            out_of_band.append(buffer)
+            return False
+
+        blob = pickle.dumps(value, protocol=5, buffer_callback=in_band)
+        size = len(blob) + sum(buffer.raw().nbytes for buffer in out_of_band)
+        if size > self.max_bytes:
+            return
+
+        # Unique names: a replaced entry's old files may still be mapped by readers
+        stem = f"{hashlib.sha1(key.encode()).hexdigest()[:12]}-{uuid.uuid4().hex[:12]}"
+        files = []
+        for i, buffer in enumerate(out_of_band):
+            name = f"{stem}-{i}.bin"
+            with open(self.blob_dir / name, 'wb') as f:
+                f.write(buffer.raw())
+            files.append(name)
+
+        now = time.time()
+        with self._transaction() as conn:
+            current = self._register(conn, version, now)
+            if current != str(version):
+                # A newer snapshot is live: this worker's result would only resurrect a purged version
+                self._unlink(files)
+                return
+            self._delete(conn, 'key = ? AND version = ?', (key, str(version)))
+            conn.execute('INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)',
+                         (key, str(version), sqlite3.Binary(blob), json.dumps(files), size, now, now))
+            self._evict(conn, current, now)
+
+    def _evict(self, conn, current, now):
+        """Purge other versions and expired entries, then the least recently used past max_bytes"""
+        self._purge(conn, current, now)
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, version, size in conn.execute(
+                'SELECT key, version, size FROM entries ORDER BY accessed').fetchall():
+            self._delete(conn, 'key = ? AND version = ?', (key, version))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    @contextmanager
+    def _compute_lock(self, key, version):
+        """Exclusive per-(key, version) lock across processes (no-op without fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        digest = hashlib.sha1(f"{key}\0{version}".encode()).hexdigest()[:20]
+        with open(self.lock_dir / f"{digest}.lock", 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_or_compute(self, key, version, compute):
+        """Cached value for (key, version), computing and storing it once per host on a miss"""
+        value = self.get(key, version)
+        if value is not None:
+            return value
+        with self._compute_lock(key, version):
+            # Another worker may have finished it while we waited for the lock
+            value = self.get(key, version)
+            if value is None:
+                value = compute()
+                self.put(key, version, value)
+        return value
+
+    def stats(self):
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
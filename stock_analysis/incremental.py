@@ -0,0 +1,488 @@
+"""
+Incremental Ingestion
+Parses only new or changed YAML files and refreshes the derived outputs
+
+A manifest (processed_data/ingest_manifest.json) records every ingested file
+with its size, mtime and SHA-256, plus a watermark (latest ingested Date).
+Cleaned rows live only in the partitioned history store
+(stock_analysis.store, processed_data/history_store/), tagged with their
+source file. A daily run parses only the new files, validates them as one
+batch (stock_analysis.validation) against the stored months from the
+watermark's on, continues each symbol's returns from its last stored close
+and rewrites only the months that received rows; the metrics, correlation,
+indicator and anomaly states fold in just the new days. Changed files or
+back-dated rows instead merge with the whole stored history and recompute
+every return (a changed file's old rows are replaced). Failing rows go to
+processed_data/quarantine/ with their reason codes and each run writes
+processed_data/quality_report.json.
+
+Limitation: the outputs are not incremental. Every run, however small,
+reads the whole history back from the store as master_df (sectors
+re-attached from the current mapping) and rewrites the pickle, every
+snapshot table, the summary CSVs and the Power BI export (fingerprints
+included) from it, so a daily run still costs O(history) in reading and
+exporting. The summary's 'phases' timings show the split and
+benchmarks/bench_incremental.py measures it.
+
+Usage:
+    python -m stock_analysis.incremental --data data --output processed_data
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis import anomalies, correlation, indicators, metrics, pipeline, powerbi, store, validation
+from stock_analysis.snapshot import SnapshotError, load_table, read_manifest
+from stock_analysis.ingest import columns_to_frame, concat_columns, list_yaml_files, parse_files
+
+MANIFEST_VERSION = 1
+MANIFEST_FILE = 'ingest_manifest.json'
+# Stored history columns, in master_df order (Sector is re-attached from the current mapping)
+HISTORY_COLUMNS = ['Date', 'Symbol', 'Open', 'High', 'Low', 'Close', 'Volume', 'Month',
+                   'Daily_Return', 'Price_Change']
+
+# ============================================================================
+# MANIFEST
+# ============================================================================
+
+def empty_manifest():
+    return {'version': MANIFEST_VERSION, 'watermark': None, 'files': {}}
+
+
+def load_manifest(path):
+    """Load the ingest manifest, or an empty one if missing / from an older version"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return empty_manifest()
+    if manifest.get('version') != MANIFEST_VERSION:
+        print(f"Manifest version {manifest.get('version')} is outdated; rebuilding from scratch")
+        return empty_manifest()
+    return manifest
+
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically so a crash never leaves it half-written"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_changes(data_folder_path, manifest):
+    """
+    Compare the data tree with the manifest.
+
+    Files whose size and mtime match the manifest are skipped without being
+    read; otherwise the content hash decides whether they really changed.
+    Returns dict with 'new', 'changed', 'touched' (mtime only), 'removed'
+    and 'unchanged' lists of manifest keys, plus 'entries' holding fresh
+    fingerprints for every new/changed/touched file.
+    """
+    data_path = Path(data_folder_path)
+    known = manifest['files']
+    changes = {'new': [], 'changed': [], 'touched': [], 'removed': [], 'unchanged': [], 'entries': {}}
+    seen = set()
+
+    for yaml_file in list_yaml_files(data_path):
+        key = yaml_file.relative_to(data_path).as_posix()
+        seen.add(key)
+        stat = yaml_file.stat()
+        entry = known.get(key)
+
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            changes['unchanged'].append(key)
+            continue
+
+        fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_sha256(yaml_file)}
+        if entry is None:
+            changes['new'].append(key)
+        elif entry['sha256'] != fingerprint['sha256']:
+            changes['changed'].append(key)
+        else:
+            changes['touched'].append(key)
+            fingerprint['rows'] = entry.get('rows', 0)
+        changes['entries'][key] = fingerprint
+
+    changes['removed'] = sorted(set(known) - seen)
+    return changes
+
+# ============================================================================
+# HISTORY (the partitioned store under processed_data/history_store/)
+# ============================================================================
+
+def history_root(output_dir):
+    return Path(output_dir) / Path(store.STORE_DIR).name
+
+
+def read_history(output_dir, exclude_keys=(), columns=None, symbols=None, start=None, end=None):
+    """Stored history rows sorted by Symbol and Date, minus those ingested from exclude_keys"""
+    df = store.read_store(history_root(output_dir), symbols=symbols, start=start, end=end, columns=columns,
+                          exclude_sources=exclude_keys)
+    return df.drop(columns='Month_Year', errors='ignore')
+
+
+def continue_returns(new_rows, recent, output_dir):
+    """
+    Daily_Return / Price_Change of rows dated after every stored row: each
+    symbol's first new row continues from its last stored close (looked up in
+    recent, the stored rows of the latest months, else in the store).
+    """
+    rows = new_rows.sort_values(['Symbol', 'Date'], kind='stable').reset_index(drop=True)
+    last_close = recent.groupby('Symbol', sort=False)['Close'].last()
+    older = rows['Symbol'][~rows['Symbol'].isin(last_close.index)].unique()
+    if len(older):
+        earlier = read_history(output_dir, columns=['Symbol', 'Date', 'Close'], symbols=older)
+        last_close = pd.concat([last_close, earlier.groupby('Symbol', sort=False)['Close'].last()])
+
+    previous = rows.groupby('Symbol', sort=False)['Close'].shift(1)
+    first = ~rows['Symbol'].duplicated()
+    previous[first] = rows.loc[first, 'Symbol'].map(last_close)
+    # Same arithmetic as pipeline.add_returns' pct_change, so appended rows match a full rebuild
+    rows['Daily_Return'] = (rows['Close'] / previous - 1) * 100.0
+    rows['Price_Change'] = rows['Close'] - rows['Open']
+    return rows
+
+
+def master_frame(history, symbol_mapping):
+    """Stored history rows -> master_df: sectors from the current mapping, unmapped symbols dropped"""
+    master_df = pipeline.attach_sectors(history[HISTORY_COLUMNS].copy(), symbol_mapping)
+    master_df['Month_Year'] = master_df['Date'].dt.to_period('M')
+    return master_df.reset_index(drop=True)
+
+# ============================================================================
+# INCREMENTAL RUN
+# ============================================================================
+
+def _parse_files(data_folder_path, keys, workers=None):
+    """Parse the given files into one raw batch, each row tagged with its Source_File"""
+    data_path = Path(data_folder_path)
+    parts = parse_files([data_path / key for key in keys], workers=workers)
+    raw_df = columns_to_frame(concat_columns(parts))
+    raw_df['Source_File'] = np.repeat(np.array(keys, dtype=object), [len(part['Symbol']) for part in parts])
+    return raw_df
+
+
+def _window_start(raw_df, watermark):
+    """
+    First day of the month of the batch's earliest date (or of the
+    watermark, if earlier): duplicates can only fall on or after the
+    batch's first date, and the watermark's month holds every symbol
+    still trading, for missing-day checks and previous closes.
+    """
+    dates = pd.to_datetime(pd.unique(raw_df['Date']), errors='coerce')
+    candidates = [pd.Timestamp(watermark)] if watermark else []
+    if dates.notna().any():
+        candidates.append(dates.min())
+    return min(candidates).to_period('M').to_timestamp() if candidates else None
+
+
+def _validate_files(raw_df, keys, output_dir, symbol_mapping=None, known=None):
+    """
+    Validate a parsed batch against the known Symbol / Date rows and write
+    each file's rejected rows to its quarantine part. Returns (new rows
+    tagged with their Source_File, rows kept per file, validation report).
+    """
+    new_rows, quarantine_df, report = validation.validate_batch(raw_df, symbol_mapping=symbol_mapping, known=known)
+
+    kept = new_rows['Source_File'].value_counts()
+    row_counts = {key: int(kept.get(key, 0)) for key in keys}
+    validation.write_quarantine(quarantine_df, output_dir, keys)
+    report['files'] = len(keys)
+    return new_rows, row_counts, report
+
+
+def _load_previous_monthly(output_dir):
+    path = Path(output_dir) / 'monthly_performance.csv'
+    if not path.exists():
+        return None
+    return pd.read_csv(path, dtype={'Month_Year': str})
+
+
+def _update_correlation_state(master_df, new_rows, output_dir, full_refresh):
+    """
+    Bring the persisted CorrelationState up to date with master_df.
+
+    Appended days are folded in one at a time (O(symbols^2) each); a full
+    refresh, or new rows dated on/before the state's last day, rebuilds it.
+    """
+    state_path = Path(output_dir) / correlation.STATE_FILE
+    state = None
+    if not full_refresh and state_path.exists():
+        state = correlation.CorrelationState.load(state_path)
+        if state.last_date is None or new_rows['Date'].min() <= state.last_date:
+            state = None
+    if state is None:
+        state = correlation.build_correlation_state(master_df)
+    else:
+        state.update_frame(correlation.returns_matrix(master_df, after=state.last_date))
+    state.save(state_path)
+    return state
+
+
+def _update_indicator_state(master_df, new_rows, output_dir, full_refresh):
+    """Same as _update_correlation_state for the technical-indicator state (O(symbols) per appended day)"""
+    state_path = Path(output_dir) / indicators.STATE_FILE
+    state = None
+    if not full_refresh and state_path.exists():
+        state = indicators.IndicatorState.load(state_path)
+        if state.last_date is None or new_rows['Date'].min() <= state.last_date:
+            state = None
+    if state is None:
+        state = indicators.build_indicator_state(master_df)
+    else:
+        state.update_frame(master_df[master_df['Date'] > state.last_date])
+    state.save(state_path)
+    return state
+
+
+def _load_snapshot_table(output_dir, name):
+    """One table of output_dir's current snapshot, or None"""
+    root = Path(output_dir) / 'snapshot'
+    try:
+        manifest = read_manifest(root)
+    except SnapshotError:
+        return None
+    if name not in manifest['tables']:
+        return None
+    return load_table(name, root, manifest)
+
+
+def _update_anomaly_state(master_df, new_rows, output_dir, full_refresh):
+    """
+    Score the appended days with the persisted AnomalyDetector (O(symbols)
+    per day) and add their alerts to the previous snapshot's; rebuilt like
+    _update_correlation_state. Returns (all alerts, number of new ones),
+    the count is None when the alerts were rebuilt.
+    """
+    state_path = Path(output_dir) / anomalies.STATE_FILE
+    detector = previous = None
+    if not full_refresh and state_path.exists():
+        detector = anomalies.AnomalyDetector.load(state_path)
+        previous = _load_snapshot_table(output_dir, 'alerts')
+        if detector.last_date is None or previous is None or new_rows['Date'].min() <= detector.last_date:
+            detector = None
+    if detector is None:
+        detector, alerts = anomalies.detect_anomalies(master_df)
+        new_count = None
+    else:
+        new_alerts = detector.update_frame(master_df[master_df['Date'] > detector.last_date])
+        alerts = anomalies.sort_alerts(pd.concat([previous, new_alerts], ignore_index=True))
+        new_count = len(new_alerts)
+    detector.save(state_path)
+    return alerts, new_count
+
+
+def _load_metrics_state(output_dir):
+    """MetricsState stored in output_dir's current snapshot, or None"""
+    frame = _load_snapshot_table(output_dir, 'metrics_state')
+    return None if frame is None else metrics.MetricsState.from_frame(frame)
+
+
+def _metrics_universe_changed(state, symbol_mapping, output_dir):
+    """
+    Whether the sector mapping no longer matches the state's symbols: a
+    symbol re-mapped or unmapped, or a newly mapped one with stored rows up
+    to the state's last day. Mapped symbols first seen in the new rows are
+    new listings the update adds.
+    """
+    if any(symbol_mapping.get(symbol) != sector for symbol, sector in zip(state.symbols, state.sectors)):
+        return True
+    unseen = set(symbol_mapping) - set(state.symbols)
+    return bool(unseen) and len(read_history(output_dir, columns=['Symbol'], symbols=unseen, end=state.last_date)) > 0
+
+
+def _update_metrics_state(master_df, new_rows, output_dir, full_refresh, symbol_mapping):
+    """
+    Resume the yearly-metrics accumulators from the previous snapshot and
+    merge the appended days (O(new rows)). A full refresh, back-dated rows,
+    or a changed symbol / sector universe (e.g. a new sector mapping)
+    rebuilds them from master_df.
+    """
+    state = None if full_refresh else _load_metrics_state(output_dir)
+    if state is not None:
+        last_date = state.last_date
+        if last_date is None or new_rows['Date'].min() <= last_date \
+                or _metrics_universe_changed(state, symbol_mapping, output_dir):
+            state = None
+    if state is None:
+        return metrics.build_metrics_state(master_df)
+    return state.update_frame(master_df[master_df['Date'] > last_date])
+
+
+def run_incremental(data_folder_path='data', output_dir=pipeline.OUTPUT_DIR,
+                    sector_csv=pipeline.SECTOR_CSV, extra_sectors=None, workers=None,
+                    powerbi_dir=None, powerbi_format='csv'):
+    """
+    Ingest new/changed YAML files and refresh the processed outputs (and the
+    Power BI export in powerbi_dir, when given).
+
+    Returns a summary dict (counts, affected months, watermark, timings;
+    'phases' splits the seconds into parse (with validation), store,
+    read_back, derive and export).
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = Path(output_dir) / MANIFEST_FILE
+    manifest = load_manifest(manifest_path)
+    if manifest['files'] and not history_root(output_dir).exists():
+        print("Warning: history store is missing; re-ingesting every file")
+        manifest = empty_manifest()
+    # A store without a manifest (e.g. written by the notebook) is replaced, not appended to
+    rebuild = not manifest['files']
+
+    changes = scan_changes(data_folder_path, manifest)
+    to_ingest = changes['new'] + changes['changed']
+    summary = {
+        'new_files': len(changes['new']),
+        'changed_files': len(changes['changed']),
+        'removed_files': len(changes['removed']),
+        'new_rows': 0,
+        'affected_months': [],
+        'watermark': manifest['watermark'],
+    }
+
+    for key in changes['touched']:
+        manifest['files'][key] = changes['entries'][key]
+    for key in changes['removed']:
+        print(f"Warning: {key} was removed from the data folder; its rows stay in history")
+
+    if not to_ingest:
+        save_manifest(manifest, manifest_path)
+        summary['seconds'] = time.perf_counter() - start
+        print("✓ Already up to date - no new or changed YAML files")
+        return summary
+
+    symbol_mapping = pipeline.load_sector_mapping(sector_csv, extra=extra_sectors)
+    raw_df = _parse_files(data_folder_path, to_ingest, workers=workers)
+    previous_watermark = manifest['watermark']
+    # The batch is checked against the stored months from its window start on, not the whole history
+    recent = None if rebuild else read_history(output_dir, exclude_keys=changes['changed'],
+                                               start=_window_start(raw_df, previous_watermark))
+    new_rows, row_counts, quality = _validate_files(raw_df, to_ingest, output_dir, symbol_mapping=symbol_mapping,
+                                                    known=None if recent is None else recent[['Symbol', 'Date']])
+    validation.save_report(quality, Path(output_dir) / validation.REPORT_FILE)
+    print(validation.format_report(quality))
+    for key in to_ingest:
+        manifest['files'][key] = dict(changes['entries'][key], rows=row_counts[key])
+    phases = {'parse': time.perf_counter() - start}
+
+    affected_months = sorted(new_rows['Date'].dt.to_period('M').astype(str).unique()) if len(new_rows) else []
+    if len(new_rows):
+        latest = str(new_rows['Date'].max())
+        if manifest['watermark'] is None or latest > manifest['watermark']:
+            manifest['watermark'] = latest
+
+    previous_monthly = _load_previous_monthly(output_dir)
+    full_refresh = rebuild or previous_monthly is None or bool(changes['changed'])
+    if not full_refresh and previous_watermark \
+            and (new_rows.empty or new_rows['Date'].min() > pd.Timestamp(previous_watermark)):
+        # Appended days: returns continue from each symbol's last close and only the months that
+        # received data are rewritten (they all lie in recent, which starts at the watermark's month)
+        appended = continue_returns(new_rows, recent, output_dir)
+        appended['Sector'] = appended['Symbol'].map(symbol_mapping)
+        if affected_months:
+            kept_rows = recent[recent['Date'] >= pd.Timestamp(affected_months[0])]
+            store.write_store(pd.concat([kept_rows, appended], ignore_index=True), history_root(output_dir),
+                              replace_all=False)
+    else:
+        # Changed files or back-dated rows: merge with the stored history (minus the changed files'
+        # old rows) and recompute every return; still no YAML is re-parsed
+        stored = None if rebuild else read_history(output_dir, exclude_keys=changes['changed'])
+        history = pd.concat([stored, new_rows], ignore_index=True) if stored is not None else new_rows
+        history = pipeline.add_returns(history.sort_values(['Symbol', 'Date'], kind='stable').reset_index(drop=True))
+        history['Sector'] = history['Symbol'].map(symbol_mapping)
+        if full_refresh:
+            store.write_store(history, history_root(output_dir))
+        elif affected_months:
+            # Later months' returns may move too
+            store.write_store(history[history['Date'] >= pd.Timestamp(affected_months[0])],
+                              history_root(output_dir), replace_all=False)
+
+    phases['store'] = time.perf_counter() - start - sum(phases.values())
+
+    # The exported tables need the whole master_df: read back from the store, not recomputed
+    master_df = master_frame(read_history(output_dir), symbol_mapping)
+    phases['read_back'] = time.perf_counter() - start - sum(phases.values())
+
+    # Monthly rows only change for the months that received data
+    if full_refresh:
+        monthly_df = metrics.compute_monthly_performance(master_df)
+    else:
+        refreshed = metrics.compute_monthly_performance(master_df, months=affected_months)
+        kept = previous_monthly[~previous_monthly['Month_Year'].isin(affected_months)]
+        monthly_df = (pd.concat([kept, refreshed], ignore_index=True)
+                      .sort_values(['Month_Year', 'Symbol'], kind='stable')
+                      .reset_index(drop=True))
+
+    # Whole-history statistics: every new trading day moves them, but only through the accumulators
+    metrics_state = _update_metrics_state(master_df, new_rows, output_dir, full_refresh, symbol_mapping)
+    metrics_df = metrics_state.metrics_frame()
+    market_summary = metrics_state.market_summary(metrics_df)
+    correlation_state = _update_correlation_state(master_df, new_rows, output_dir, full_refresh)
+    correlation_matrix = pipeline.compute_correlation_matrix(master_df, state=correlation_state)
+    _update_indicator_state(master_df, new_rows, output_dir, full_refresh)
+    alerts, new_alerts = _update_anomaly_state(master_df, new_rows, output_dir, full_refresh)
+    phases['derive'] = time.perf_counter() - start - sum(phases.values())
+
+    pipeline.export_processed_data(master_df, metrics_df, correlation_matrix, monthly_df,
+                                   market_summary, output_dir=output_dir, metrics_state=metrics_state,
+                                   alerts=alerts)
+    if powerbi_dir:
+        powerbi.export_powerbi(master_df, metrics_df, correlation_matrix, monthly_df, market_summary,
+                               export_path=powerbi_dir, fmt=powerbi_format)
+    save_manifest(manifest, manifest_path)
+    phases['export'] = time.perf_counter() - start - sum(phases.values())
+
+    summary.update({
+        'new_rows': int(len(new_rows)),
+        'quarantined_rows': quality['rows_quarantined'],
+        'affected_months': affected_months,
+        'watermark': manifest['watermark'],
+        'new_alerts': new_alerts,
+        'seconds': time.perf_counter() - start,
+        'phases': phases,
+    })
+    alerts_note = f"alerts rebuilt ({len(alerts):,})" if new_alerts is None else f"{new_alerts} new alerts"
+    print(f"✓ Ingested {len(to_ingest)} files ({summary['new_rows']:,} rows, "
+          f"{summary['quarantined_rows']:,} quarantined) in {summary['seconds']:.2f}s; "
+          f"months refreshed: {', '.join(affected_months) or '-'}; watermark: {manifest['watermark']}; "
+          f"{alerts_note}")
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Incrementally ingest new YAML files")
+    parser.add_argument('--data', default='data')
+    parser.add_argument('--output', default=pipeline.OUTPUT_DIR)
+    parser.add_argument('--sectors', default=pipeline.SECTOR_CSV)
+    parser.add_argument('--fill-missing-sectors', action='store_true',
+                        help="map symbols absent from the sector CSV using MISSING_SECTOR_MAPPING")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--powerbi', metavar='DIR', help="also refresh the Power BI export in DIR")
+    parser.add_argument('--powerbi-format', choices=powerbi.FORMATS, default='csv')
+    args = parser.parse_args(argv)
+
+    extra = pipeline.MISSING_SECTOR_MAPPING if args.fill_missing_sectors else None
+    run_incremental(args.data, args.output, args.sectors, extra_sectors=extra, workers=args.workers,
+                    powerbi_dir=args.powerbi, powerbi_format=args.powerbi_format)
+
+
+if __name__ == '__main__':
+    main()
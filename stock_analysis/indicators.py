@@ -0,0 +1,289 @@
+"""
+Technical Indicators
+SMA, EMA, MACD, RSI, Bollinger Bands and ATR for every symbol at once
+
+IndicatorEngine works on the Date x Symbol arrays of a PricePanel. Windowed
+indicators (SMA, Bollinger) come from cumulative sums like the
+RollingEngine and, like pandas rolling(window), need a full window of
+closes on consecutive panel dates. Recursive ones (EMA, MACD, RSI, ATR)
+walk the dates once with every symbol updated in the same vector
+operation; a symbol's state carries over days it did not trade. EMAs are
+seeded with the first close (pandas ewm(adjust=False)); RSI and ATR use
+Wilder's smoothing, seeded with the mean of the first period values.
+
+IndicatorState is everything needed to continue from the last day: EMA
+values, Wilder averages, the previous close and the last window of
+closes. update() adds one trading day in O(symbols) and returns that
+day's values; the state saves to / loads from a .npz archive like
+CorrelationState, so a daily run resumes instead of replaying history.
+"""
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.panel import build_panel
+from stock_analysis.rolling import _centered, _window_sum
+
+SMA_WINDOWS = (20, 50)
+EMA_SPANS = (12, 26)
+MACD_SPANS = (12, 26, 9)  # fast, slow, signal
+RSI_PERIOD = 14
+ATR_PERIOD = 14
+BOLLINGER_WINDOW = 20
+BOLLINGER_WIDTH = 2.0
+STATE_FILE = 'indicator_state.npz'
+
+SMA_NAMES = [f"SMA_{window}" for window in SMA_WINDOWS]
+EMA_NAMES = [f"EMA_{span}" for span in EMA_SPANS]
+RECURSIVE_INDICATORS = EMA_NAMES + ['MACD', 'MACD_Signal', 'MACD_Hist', f"RSI_{RSI_PERIOD}", f"ATR_{ATR_PERIOD}"]
+WINDOWED_INDICATORS = SMA_NAMES + ['BB_Upper', 'BB_Middle', 'BB_Lower']
+INDICATORS = WINDOWED_INDICATORS + RECURSIVE_INDICATORS
+
+_EMA_STATE_SPANS = sorted(set(EMA_SPANS) | set(MACD_SPANS[:2]))
+_BUFFER_ROWS = max(*SMA_WINDOWS, BOLLINGER_WINDOW)
+# Per-symbol state vectors (the close buffer is stored separately)
+_VECTORS = ([f"ema_{span}" for span in _EMA_STATE_SPANS] +
+            ['macd_signal', 'prev_close', 'avg_gain', 'avg_loss', 'rsi_count', 'atr', 'atr_count'])
+
+
+def _wilder(average, count, value, has_value, period):
+    """
+    One Wilder smoothing step where has_value: the running sum during the
+    first period values, their mean at the period-th, then
+    (average * (period - 1) + value) / period. Returns (average, count, output).
+    """
+    count = count + has_value
+    warming = has_value & (count <= period)
+    average = np.where(warming, average + np.where(warming, value, 0.0), average)
+    average = np.where(has_value & (count == period), average / period, average)
+    smoothing = has_value & (count > period)
+    average = np.where(smoothing, (average * (period - 1) + np.where(smoothing, value, 0.0)) / period, average)
+    return average, count, np.where(has_value & (count >= period), average, np.nan)
+
+
+def _bollinger(mean, std):
+    return mean + BOLLINGER_WIDTH * std, mean, mean - BOLLINGER_WIDTH * std
+
+# ============================================================================
+# STREAMING STATE
+# ============================================================================
+
+class IndicatorState:
+    """Resumable indicator state for a universe of symbols (one vector entry per symbol)"""
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self.symbol_index = {}
+        self.last_date = None
+        self.days = 0
+        for name in _VECTORS:
+            setattr(self, name, np.zeros(0))
+        self.closes = np.zeros((_BUFFER_ROWS, 0))
+        self.add_symbols(symbols)
+
+    def add_symbols(self, symbols):
+        """Extend the universe; new symbols start with no history"""
+        new = [symbol for symbol in symbols if symbol not in self.symbol_index]
+        if not new:
+            return
+        for symbol in new:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        for name in _VECTORS:
+            # Counters start at 0, values as "not seen yet"
+            fill = 0.0 if name.endswith('_count') or name.startswith('avg_') or name == 'atr' else np.nan
+            setattr(self, name, np.r_[getattr(self, name), np.full(len(new), fill)])
+        self.closes = np.hstack([self.closes, np.full((_BUFFER_ROWS, len(new)), np.nan)])
+
+    def _recursive_step(self, close, high, low):
+        """EMA / MACD / RSI / ATR for one day (NaN inputs = did not trade); returns {name: vector}"""
+        traded = ~np.isnan(close)
+        out = {}
+        for span in _EMA_STATE_SPANS:
+            previous = getattr(self, f"ema_{span}")
+            alpha = 2.0 / (span + 1)
+            ema = np.where(np.isnan(previous), close, previous + alpha * (close - previous))
+            setattr(self, f"ema_{span}", np.where(traded, ema, previous))
+
+        fast, slow, signal_span = MACD_SPANS
+        macd = getattr(self, f"ema_{fast}") - getattr(self, f"ema_{slow}")
+        alpha = 2.0 / (signal_span + 1)
+        signal = np.where(np.isnan(self.macd_signal), macd, self.macd_signal + alpha * (macd - self.macd_signal))
+        self.macd_signal = np.where(traded, signal, self.macd_signal)
+
+        has_change = traded & ~np.isnan(self.prev_close)
+        change = np.where(has_change, close - self.prev_close, 0.0)
+        self.avg_gain, _, gain = _wilder(self.avg_gain, self.rsi_count, np.maximum(change, 0.0), has_change, RSI_PERIOD)
+        self.avg_loss, self.rsi_count, loss = _wilder(self.avg_loss, self.rsi_count, np.maximum(-change, 0.0),
+                                                      has_change, RSI_PERIOD)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = np.where(loss == 0, np.where(gain > 0, 100.0, 50.0), 100.0 - 100.0 / (1.0 + gain / loss))
+
+        true_range = np.where(has_change,
+                              np.fmax(high - low, np.fmax(np.abs(high - self.prev_close), np.abs(low - self.prev_close))),
+                              high - low)
+        self.atr, self.atr_count, atr = _wilder(self.atr, self.atr_count, np.nan_to_num(true_range), traded,
+                                                ATR_PERIOD)
+        self.prev_close = np.where(traded, close, self.prev_close)
+
+        for span in EMA_SPANS:
+            out[f"EMA_{span}"] = np.where(traded, getattr(self, f"ema_{span}"), np.nan)
+        out['MACD'] = np.where(traded, macd, np.nan)
+        out['MACD_Signal'] = np.where(traded, self.macd_signal, np.nan)
+        out['MACD_Hist'] = out['MACD'] - out['MACD_Signal']
+        out[f"RSI_{RSI_PERIOD}"] = np.where(np.isnan(gain), np.nan, rsi)
+        out[f"ATR_{ATR_PERIOD}"] = atr
+        return out
+
+    def _windowed_step(self, close):
+        """SMA / Bollinger for one day from the buffer of the last closes"""
+        self.closes = np.roll(self.closes, -1, axis=0)
+        self.closes[-1] = close
+        out = {}
+        for window in SMA_WINDOWS:
+            out[f"SMA_{window}"] = self._window_mean(window)
+        last = self.closes[-BOLLINGER_WINDOW:]
+        full = ~np.isnan(last).any(axis=0)
+        mean = np.where(full, self._window_mean(BOLLINGER_WINDOW), np.nan)
+        std = np.where(full, np.where(full, last, 0.0).std(axis=0), np.nan)
+        out['BB_Upper'], out['BB_Middle'], out['BB_Lower'] = _bollinger(mean, std)
+        return out
+
+    def _window_mean(self, window):
+        last = self.closes[-window:]
+        full = ~np.isnan(last).any(axis=0)
+        return np.where(full, np.where(full, last, 0.0).mean(axis=0), np.nan)
+
+    def step(self, close, high, low):
+        """Advance every symbol by one day of close / high / low vectors; returns {indicator: vector}"""
+        out = self._windowed_step(close)
+        out.update(self._recursive_step(close, high, low))
+        self.days += 1
+        return out
+
+    def update(self, date, bars):
+        """
+        Add one trading day. bars is a Symbol-indexed frame with Close, High
+        and Low (absent symbols did not trade). Returns a Symbol x indicator
+        frame of that day's values for every known symbol.
+        """
+        self.add_symbols(bars.index)
+        vectors = {}
+        for field in ('Close', 'High', 'Low'):
+            vector = np.full(len(self.symbols), np.nan)
+            vector[[self.symbol_index[symbol] for symbol in bars.index]] = bars[field].to_numpy(dtype=np.float64)
+            vectors[field] = vector
+        out = self.step(vectors['Close'], vectors['High'], vectors['Low'])
+        self.last_date = pd.Timestamp(date)
+        return pd.DataFrame(out, index=pd.Index(self.symbols, name='Symbol'))[INDICATORS]
+
+    def update_frame(self, master_df):
+        """Add every trading day of master-style rows (Date, Symbol, Close, High, Low), oldest first"""
+        for date, rows in master_df.sort_values('Date').groupby('Date', sort=True):
+            self.update(date, rows.set_index('Symbol'))
+
+    def save(self, path):
+        """Persist the state as a .npz archive"""
+        np.savez(path, symbols=np.array(self.symbols, dtype=str), days=np.array(self.days),
+                 last_date=np.array(str(self.last_date) if self.last_date is not None else ''),
+                 closes=self.closes, **{name: getattr(self, name) for name in _VECTORS})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as archive:
+            state = cls(archive['symbols'].tolist())
+            for name in _VECTORS + ['closes']:
+                setattr(state, name, archive[name].copy())
+            state.days = int(archive['days'])
+            last_date = str(archive['last_date'])
+            state.last_date = pd.Timestamp(last_date) if last_date else None
+        return state
+
+# ============================================================================
+# WHOLE-PANEL ENGINE
+# ============================================================================
+
+class IndicatorEngine:
+    """
+    Every indicator over a PricePanel as Date x Symbol frames.
+
+    Windowed indicators are memoized one by one; the recursive ones share a
+    single pass over the dates, whose final IndicatorState is kept so
+    streaming can continue from the panel's last day.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.dates = panel.dates
+        self.symbols = panel.symbols
+        self.close = panel.values[:, :, panel.field_index['Close']]
+        self.high = panel.values[:, :, panel.field_index['High']]
+        self.low = panel.values[:, :, panel.field_index['Low']]
+        self._cache = {}
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=pd.Index(self.dates, name='Date'), columns=list(self.symbols))
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _moments(self, window):
+        """(full-window mask, rolling mean, rolling population std) of closes"""
+        def compute():
+            centered, present, column_mean = _centered(self.close)
+            count = _window_sum(present, window)
+            total = _window_sum(centered, window)
+            squares = _window_sum(centered ** 2, window)
+            full = count == window
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = total / count
+                variance = squares / count - mean ** 2
+            return full, np.where(full, mean + column_mean, np.nan), np.where(full, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+        return self._memo(('moments', window), compute)
+
+    def _recursive(self):
+        """One pass over the dates for EMA / MACD / RSI / ATR; returns ({name: array}, final state)"""
+        def compute():
+            state = IndicatorState(self.symbols)
+            arrays = {name: np.empty(self.close.shape) for name in RECURSIVE_INDICATORS}
+            for t in range(len(self.dates)):
+                for name, vector in state._recursive_step(self.close[t], self.high[t], self.low[t]).items():
+                    arrays[name][t] = vector
+            # The close buffer is the last rows of the panel
+            tail = self.close[-_BUFFER_ROWS:]
+            state.closes[-len(tail):] = tail
+            state.days = len(self.dates)
+            state.last_date = self.dates[-1] if len(self.dates) else None
+            return arrays, state
+        return self._memo(('recursive',), compute)
+
+    def frame(self, name):
+        """Date x Symbol frame of one indicator (NaN where it is not defined yet or the symbol did not trade)"""
+        if name not in INDICATORS:
+            raise KeyError(f"Unknown indicator {name!r}; expected one of {INDICATORS}")
+
+        def compute():
+            if name in RECURSIVE_INDICATORS:
+                return self._frame(self._recursive()[0][name])
+            if name.startswith('SMA_'):
+                return self._frame(self._moments(int(name.split('_')[1]))[1])
+            _, mean, std = self._moments(BOLLINGER_WINDOW)
+            upper, middle, lower = _bollinger(mean, std)
+            return self._frame({'BB_Upper': upper, 'BB_Middle': middle, 'BB_Lower': lower}[name])
+        return self._memo(('frame', name), compute)
+
+    def series(self, symbol, name):
+        """One symbol's indicator over its trading days"""
+        column = self.frame(name)[symbol]
+        return column[self.panel.present[:, self.panel.symbol_index[symbol]]]
+
+    def state(self):
+        """IndicatorState after the panel's last day, ready for IndicatorState.update()"""
+        return self._recursive()[1]
+
+
+def build_indicator_state(master_df):
+    """Fresh IndicatorState fed with every trading day in master_df"""
+    return IndicatorEngine(build_panel(master_df)).state()
@@ -0,0 +1,250 @@
+"""
+YAML Ingestion Engine
+Parses the data/YYYY-MM/*.yaml tree across a process pool into columnar arrays
+
+Usage:
+    python -m stock_analysis.ingest data --workers 4 --compare
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+# libyaml's C loader is several times faster than the pure-Python SafeLoader
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+COLUMNS = ['Date', 'Symbol', 'Open', 'High', 'Low', 'Close', 'Volume', 'Month']
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+# YAML record key for each price column
+_PRICE_KEYS = {'Open': 'open', 'High': 'high', 'Low': 'low', 'Close': 'close'}
+
+
+def list_yaml_files(data_folder_path):
+    """List daily YAML files in month/date order"""
+    data_path = Path(data_folder_path)
+    if not data_path.exists():
+        print(f"Data folder not found at {data_folder_path}")
+        return []
+
+    files = []
+    for month_folder in sorted(data_path.iterdir()):
+        if month_folder.is_dir():
+            files.extend(sorted(month_folder.glob('*.yaml')))
+    return files
+
+
+def load_yaml_data(file_path):
+    """Load YAML file safely"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            return yaml.load(file, Loader=YamlLoader)
+    except Exception as e:
+        print(f"Error loading {file_path}: {e}")
+        return None
+
+
+def empty_columns():
+    """Zero-length column arrays with the engine's dtypes"""
+    columns = {
+        'Date': np.empty(0, dtype=object),
+        'Symbol': np.empty(0, dtype=object),
+        'Volume': np.empty(0, dtype=np.int64),
+        'Month': np.empty(0, dtype=object),
+    }
+    for col in PRICE_COLUMNS:
+        columns[col] = np.empty(0, dtype=np.float64)
+    return {col: columns[col] for col in COLUMNS}
+
+
+def _float_column(values):
+    """Prices as float64; missing (None) and non-numeric values become NaN for validation to quarantine"""
+    try:
+        return np.array(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([_to_float(value) for value in values], dtype=np.float64)
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _volume_column(values):
+    """Volumes as int64; missing or non-numeric ones become 0 (validation's ZERO_VOLUME)"""
+    try:
+        return np.array([value or 0 for value in values], dtype=np.int64)
+    except (TypeError, ValueError, OverflowError):
+        volumes = np.nan_to_num(_float_column(values), nan=0.0)
+        return volumes.astype(np.int64)
+
+
+def parse_yaml_file(file_path):
+    """
+    Parse one daily YAML file into a dict of column arrays.
+
+    Each file holds a list of records with keys: Ticker, date, open, high,
+    low, close, volume, month. Records that are not mappings or have no
+    Ticker/Symbol are skipped; bad prices and volumes are left for
+    validation rather than failing the file.
+    """
+    yaml_data = load_yaml_data(file_path)
+    if not yaml_data or not isinstance(yaml_data, list):
+        return empty_columns()
+
+    # handle both 'Ticker' and 'Symbol' just in case
+    records = [r for r in yaml_data if isinstance(r, dict) and (r.get('Ticker') or r.get('Symbol')) is not None]
+    if not records:
+        return empty_columns()
+
+    fallback_date = Path(file_path).stem
+    columns = {
+        'Date': np.array([r.get('date') or fallback_date for r in records], dtype=object),
+        'Symbol': np.array([r.get('Ticker') or r.get('Symbol') for r in records], dtype=object),
+        'Volume': _volume_column([r.get('volume') for r in records]),
+        'Month': np.array([r.get('month') for r in records], dtype=object),
+    }
+    for col, key in _PRICE_KEYS.items():
+        # Missing keys, None and non-numeric values become NaN (MISSING_OHLC in validation)
+        columns[col] = _float_column([r.get(key) for r in records])
+
+    return {col: columns[col] for col in COLUMNS}
+
+
+def concat_columns(parts):
+    """Concatenate per-file column dicts into one columnar batch"""
+    parts = [p for p in parts if len(p['Symbol'])]
+    if not parts:
+        return empty_columns()
+    return {col: np.concatenate([p[col] for p in parts]) for col in COLUMNS}
+
+
+def effective_workers(workers, n_files):
+    """Pool size actually used for n_files (never more processes than files)"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, n_files))
+
+
+def parse_files(files, workers=None, chunksize=8):
+    """
+    Parse a list of YAML files, fanning out across a process pool.
+
+    Returns one column dict per input file, in input order.
+    """
+    files = [str(f) for f in files]
+    workers = effective_workers(workers, len(files))
+
+    if workers == 1:
+        return [parse_yaml_file(f) for f in files]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(parse_yaml_file, files, chunksize=chunksize))
+
+
+def extract_stock_data(data_folder_path, workers=None, chunksize=8):
+    """
+    Extract every daily YAML file under data_folder_path.
+
+    Returns (columns, report) where columns is a dict of NumPy arrays keyed by
+    COLUMNS and report holds throughput figures (see format_report) plus
+    'file_rows': {data-relative file path: rows}, in row order.
+    """
+    start = time.perf_counter()
+    files = list_yaml_files(data_folder_path)
+    parts = parse_files(files, workers=workers, chunksize=chunksize) if files else []
+    columns = concat_columns(parts)
+    elapsed = time.perf_counter() - start
+
+    report = build_report(len(files), len(columns['Symbol']), elapsed,
+                          effective_workers(workers, len(files)))
+    data_path = Path(data_folder_path)
+    report['file_rows'] = {f.relative_to(data_path).as_posix(): len(part['Symbol']) for f, part in zip(files, parts)}
+    return columns, report
+
+
+def build_report(n_files, n_rows, seconds, workers=1):
+    """Throughput summary for one ingestion run"""
+    return {
+        'files': n_files,
+        'rows': n_rows,
+        'seconds': seconds,
+        'files_per_s': n_files / seconds if seconds > 0 else 0.0,
+        'rows_per_s': n_rows / seconds if seconds > 0 else 0.0,
+        'workers': workers,
+        'loader': YamlLoader.__name__,
+    }
+
+
+def format_report(report):
+    """Render an ingestion report as a one-line summary"""
+    return (
+        f"✓ Parsed {report['files']:,} files / {report['rows']:,} rows in {report['seconds']:.2f}s "
+        f"({report['files_per_s']:,.0f} files/s, {report['rows_per_s']:,.0f} rows/s) "
+        f"[{report['loader']}, {report['workers']} workers]"
+    )
+
+
+def columns_to_frame(columns):
+    """Wrap a column dict in a DataFrame (pandas imported lazily for pool workers)"""
+    import pandas as pd
+
+    return pd.DataFrame(columns, columns=COLUMNS)
+
+
+def _legacy_extract(data_folder_path):
+    """The notebook's original per-record loop, kept only for --compare timings"""
+    all_stock_data = {}
+    for yaml_file in list_yaml_files(data_folder_path):
+        with open(yaml_file, 'r', encoding='utf-8') as file:
+            yaml_data = yaml.safe_load(file)
+        for record in yaml_data or []:
+            symbol = record.get('Ticker') or record.get('Symbol')
+            if symbol is None:
+                continue
+            all_stock_data.setdefault(symbol, []).append({
+                "Date": record.get("date") or yaml_file.stem,
+                "Symbol": symbol,
+                "Open": float(record.get("open", 0)),
+                "High": float(record.get("high", 0)),
+                "Low": float(record.get("low", 0)),
+                "Close": float(record.get("close", 0)),
+                "Volume": int(record.get("volume", 0)),
+                "Month": record.get("month"),
+            })
+    return all_stock_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parse the YAML data tree and report throughput")
+    parser.add_argument('data_folder', nargs='?', default='data')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--compare', action='store_true', help="also time the original notebook loop")
+    args = parser.parse_args(argv)
+
+    columns, report = extract_stock_data(args.data_folder, workers=args.workers)
+    print(format_report(report))
+
+    if args.compare:
+        start = time.perf_counter()
+        legacy = _legacy_extract(args.data_folder)
+        elapsed = time.perf_counter() - start
+        legacy_report = build_report(report['files'], sum(len(v) for v in legacy.values()), elapsed, 1)
+        legacy_report['loader'] = 'SafeLoader (legacy loop)'
+        print(format_report(legacy_report))
+        if report['seconds'] > 0:
+            print(f"Speedup: {elapsed / report['seconds']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
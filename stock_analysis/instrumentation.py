@@ -0,0 +1,155 @@
+"""
+Render Instrumentation
+Timed spans for each dashboard rerun, a JSON-lines span log and on-demand profiling
+
+app.py opens a RunTrace at the top of every rerun and wraps data loading,
+the selected page branch, each figure build and each chart hand-off to
+Streamlit in spans. When the rerun ends, every span is appended to the span
+log as one JSON object per line (rotated by size), so "the dashboard is
+slow" can be traced to loading, pandas work, figure building or
+serialization after the fact. Profiler runs cProfile or tracemalloc over a
+single rerun when asked for with ?profile=cpu or ?profile=memory.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+SPAN_LOG = os.environ.get('STOCK_DASHBOARD_SPAN_LOG', './logs/render_spans.jsonl')
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 3
+PROFILE_MODES = ('cpu', 'memory')
+PROFILE_TOP = 25
+
+_logger_lock = threading.Lock()
+
+
+def span_logger(path=SPAN_LOG):
+    """Process-wide logger writing raw JSON lines to a size-rotated file"""
+    logger = logging.getLogger('stock_analysis.spans')
+    with _logger_lock:
+        if not logger.handlers:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                                          encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+class RunTrace:
+    """
+    Nested timed spans for one script run.
+
+    start()/end() suit code that cannot be indented into a with-block (the
+    page if/elif chain); span() is the context-manager form.
+    """
+
+    def __init__(self, session_id, run, logger=None):
+        self.session_id = session_id
+        self.run = run
+        self.page = None
+        self.logger = logger
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    def start(self, name, **attrs):
+        span = {'name': name, 'depth': len(self._stack), 'start': time.perf_counter(),
+                'parent': self._stack[-1]['name'] if self._stack else None, 'attrs': attrs}
+        self._stack.append(span)
+        self.spans.append(span)
+        return span
+
+    def end(self, span, **attrs):
+        span['duration'] = time.perf_counter() - span['start']
+        span['attrs'].update(attrs)
+        # Close any child left open (e.g. by st.stop() inside it) along with its parent
+        while self._stack and self._stack.pop() is not span:
+            pass
+        return span
+
+    @contextmanager
+    def span(self, name, **attrs):
+        span = self.start(name, **attrs)
+        try:
+            yield span
+        finally:
+            self.end(span)
+
+    def total(self):
+        return time.perf_counter() - self._origin
+
+    def records(self):
+        """Finished spans as JSON-ready dicts (times in ms from the start of the run)"""
+        return [{
+            'session': self.session_id,
+            'run': self.run,
+            'page': self.page,
+            'name': span['name'],
+            'parent': span['parent'],
+            'depth': span['depth'],
+            'start_ms': round((span['start'] - self._origin) * 1000, 3),
+            'duration_ms': round(span['duration'] * 1000, 3),
+            'attrs': span['attrs'],
+        } for span in self.spans if 'duration' in span]
+
+    def finish(self):
+        """Write every finished span plus a whole-run record to the span log"""
+        records = self.records()
+        if self.logger is not None:
+            timestamp = datetime.now().isoformat(timespec='milliseconds')
+            for record in records:
+                self.logger.info(json.dumps(dict(record, ts=timestamp), default=str))
+            self.logger.info(json.dumps({
+                'ts': timestamp, 'session': self.session_id, 'run': self.run, 'page': self.page,
+                'name': 'rerun', 'parent': None, 'depth': -1, 'start_ms': 0.0,
+                'duration_ms': round(self.total() * 1000, 3), 'attrs': {'spans': len(records)},
+            }))
+        return records
+
+
+class Profiler:
+    """cProfile ('cpu') or tracemalloc ('memory') over one rerun, reported as text"""
+
+    def __init__(self, mode, top=PROFILE_TOP):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode {mode!r}; expected one of {PROFILE_MODES}")
+        self.mode = mode
+        self.top = top
+        self._profile = None
+
+    def start(self):
+        if self.mode == 'cpu':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            tracemalloc.start(10)
+
+    def stop(self):
+        """Stop profiling; returns the top entries as a printable report"""
+        if self.mode == 'cpu':
+            self._profile.disable()
+            out = io.StringIO()
+            pstats.Stats(self._profile, stream=out).sort_stats('cumulative').print_stats(self.top)
+            return out.getvalue()
+
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        lines = [f"Traced memory: current {current / 2**20:.1f} MB, peak {peak / 2**20:.1f} MB", ""]
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size / 1024:>10.1f} KB {stat.count:>8} blocks  {frame.filename}:{frame.lineno}")
+        return '\n'.join(lines)
@@ -0,0 +1,341 @@
+"""
+Metrics Engine
+Yearly metrics, monthly performance, market summary and sector table in single grouped passes
+
+Drop-in replacements for the notebook's per-symbol and per-month loops. Rows,
+ordering and integer columns match processed_data/yearly_metrics.csv and
+monthly_performance.csv exactly; float columns agree to rounding (grouped
+mean/std accumulate in a different order than Series.mean/std).
+
+MetricsState keeps per-symbol accumulators (row count, close sum / min /
+max, first and last close, volume sum, and count / mean / M2 of daily
+returns for Welford's variance). A batch of new days is merged in
+O(new rows), after which the yearly metrics and market summary are read
+straight off the accumulators; they agree with a full recompute to
+floating-point tolerance. The state is stored in the snapshot as the
+metrics_state table, one row per symbol.
+"""
+
+import numpy as np
+import pandas as pd
+
+METRIC_COLUMNS = ['Symbol', 'Sector', 'Yearly_Return', 'Volatility', 'Avg_Price', 'Max_Price',
+                  'Min_Price', 'Avg_Volume', 'Start_Price', 'End_Price', 'Price_Change']
+MONTHLY_COLUMNS = ['Month_Year', 'Symbol', 'Monthly_Return', 'Avg_Price', 'Volume']
+# metrics_state table column -> MetricsState vector
+STATE_VECTORS = {
+    'Rows': 'rows',
+    'Close_Sum': 'close_sum',
+    'Close_Min': 'close_min',
+    'Close_Max': 'close_max',
+    'Volume_Sum': 'volume_sum',
+    'First_Date': 'first_date',
+    'First_Close': 'first_close',
+    'Last_Date': 'symbol_last_date',
+    'Last_Close': 'last_close',
+    'Return_Count': 'return_count',
+    'Return_Mean': 'return_mean',
+    'Return_M2': 'return_m2',
+}
+STATE_COLUMNS = ['Symbol', 'Sector'] + list(STATE_VECTORS)
+
+
+def _symbol_date_order(master_df):
+    """
+    Factorize symbols (sorted) and return (codes, symbols, order) where order
+    sorts rows by symbol code then Date. Integer codes group much faster than
+    the object Symbol column, and one lexsort replaces a two-key sort_values.
+    """
+    codes, symbols = pd.factorize(master_df['Symbol'], sort=True)
+    order = np.lexsort((master_df['Date'].to_numpy(), codes))
+    return codes[order], np.asarray(symbols, dtype=object), order
+
+
+def _column(master_df, name, order):
+    return master_df[name].to_numpy()[order]
+
+
+def compute_yearly_metrics(master_df):
+    """Per-symbol return, volatility and price/volume statistics, best performers first"""
+    codes, symbols, order = _symbol_date_order(master_df)
+    close = _column(master_df, 'Close', order)
+
+    # Rows are contiguous per symbol and date-ordered within it
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    ends = np.r_[starts[1:], len(codes)] - 1
+
+    frame = pd.DataFrame({
+        'Close': close,
+        'Daily_Return': _column(master_df, 'Daily_Return', order),
+        'Volume': _column(master_df, 'Volume', order),
+    })
+    stats = frame.groupby(codes, sort=True).agg(
+        Volatility=('Daily_Return', 'std'),
+        Avg_Price=('Close', 'mean'),
+        Max_Price=('Close', 'max'),
+        Min_Price=('Close', 'min'),
+        Avg_Volume=('Volume', 'mean'),
+    )
+
+    if 'Sector' in master_df.columns:
+        sector = master_df['Sector'].take(order[starts]).to_numpy(dtype=object)
+    else:
+        sector = np.full(len(starts), 'Unknown', dtype=object)
+
+    start_price = close[starts]
+    end_price = close[ends]
+    metrics_df = pd.DataFrame({
+        'Symbol': symbols[codes[starts]],
+        'Sector': sector,
+        'Yearly_Return': (end_price - start_price) / start_price * 100,
+        'Volatility': stats['Volatility'].to_numpy(),
+        'Avg_Price': stats['Avg_Price'].to_numpy(),
+        'Max_Price': stats['Max_Price'].to_numpy(),
+        'Min_Price': stats['Min_Price'].to_numpy(),
+        'Avg_Volume': stats['Avg_Volume'].to_numpy(),
+        'Start_Price': start_price,
+        'End_Price': end_price,
+        'Price_Change': end_price - start_price,
+    }, columns=METRIC_COLUMNS)
+    return metrics_df.sort_values('Yearly_Return', ascending=False)
+
+
+def _month_keys(dates):
+    """Integer YYYYMM keys - far cheaper to group on than Period or string months"""
+    dates = pd.DatetimeIndex(dates)
+    return dates.year.to_numpy() * 100 + dates.month.to_numpy()
+
+
+def _format_month_keys(keys):
+    return [f"{k // 100:04d}-{k % 100:02d}" for k in np.asarray(keys)]
+
+
+def compute_monthly_performance(master_df, months=None):
+    """
+    Month_Year x Symbol table: first-to-last close return, mean close, summed volume.
+
+    When months ('YYYY-MM' strings) is given, only those months are computed.
+    """
+    if months is not None:
+        wanted = [int(m.replace('-', '')) for m in months]
+        master_df = master_df[np.isin(_month_keys(master_df['Date']), wanted)]
+
+    codes, symbols, order = _symbol_date_order(master_df)
+    month_key = _month_keys(_column(master_df, 'Date', order))
+
+    # One integer key per (month, symbol), ordered month-major like the notebook table
+    group_key = month_key.astype(np.int64) * max(len(symbols), 1) + codes
+    frame = pd.DataFrame({
+        'Close': _column(master_df, 'Close', order),
+        'Volume': _column(master_df, 'Volume', order),
+    })
+    monthly = frame.groupby(group_key, sort=True).agg(
+        First_Close=('Close', 'first'),
+        Last_Close=('Close', 'last'),
+        Avg_Price=('Close', 'mean'),
+        Volume=('Volume', 'sum'),
+    )
+
+    keys = monthly.index.to_numpy()
+    first_close = monthly['First_Close'].to_numpy()
+    return pd.DataFrame({
+        'Month_Year': _format_month_keys(keys // max(len(symbols), 1)),
+        'Symbol': symbols[keys % max(len(symbols), 1)],
+        'Monthly_Return': (monthly['Last_Close'].to_numpy() - first_close) / first_close * 100,
+        'Avg_Price': monthly['Avg_Price'].to_numpy(),
+        'Volume': monthly['Volume'].to_numpy(),
+    }, columns=MONTHLY_COLUMNS)
+
+
+def compute_market_summary(metrics_df, master_df):
+    """Market-wide counts and averages, cast to native Python types for JSON"""
+    return _market_summary(metrics_df, master_df['Close'].mean(), master_df['Volume'].mean())
+
+
+def _market_summary(metrics_df, avg_price, avg_volume):
+    green_stocks = int((metrics_df['Yearly_Return'] > 0).sum())
+    red_stocks = int((metrics_df['Yearly_Return'] < 0).sum())
+    total_stocks = int(len(metrics_df))
+
+    return {
+        'Total_Stocks': total_stocks,
+        'Green_Stocks': green_stocks,
+        'Red_Stocks': red_stocks,
+        'Green_Percentage': float((green_stocks / total_stocks) * 100) if total_stocks else 0.0,
+        'Red_Percentage': float((red_stocks / total_stocks) * 100) if total_stocks else 0.0,
+        'Avg_Return': float(metrics_df['Yearly_Return'].mean()),
+        'Avg_Price': float(avg_price),
+        'Avg_Volume': float(avg_volume),
+        'Market_Return': float(metrics_df['Yearly_Return'].sum()),
+    }
+
+
+def compute_sector_performance(metrics_df):
+    """Sector Analysis table: mean / count / sum of yearly return and mean volatility per sector, best first"""
+    sector_performance = metrics_df.groupby('Sector').agg({
+        'Yearly_Return': ['mean', 'count', 'sum'],
+        'Volatility': 'mean'
+    }).round(2)
+
+    sector_performance.columns = ['Avg_Return', 'Stock_Count', 'Total_Return', 'Avg_Volatility']
+    return sector_performance.reset_index().sort_values('Avg_Return', ascending=False)
+
+# ============================================================================
+# STREAMING STATE
+# ============================================================================
+
+def _empty_vector(name, length):
+    """Initial values for new symbols: counts and sums at 0, prices and dates as not seen yet"""
+    if name in ('rows', 'return_count'):
+        return np.zeros(length, dtype=np.int64)
+    if name in ('first_date', 'symbol_last_date'):
+        return np.full(length, np.datetime64('NaT'), dtype='datetime64[ns]')
+    if name in ('close_sum', 'volume_sum', 'return_mean', 'return_m2'):
+        return np.zeros(length)
+    return np.full(length, np.nan)
+
+
+class MetricsState:
+    """Per-symbol accumulators behind the yearly metrics and market summary"""
+
+    def __init__(self, symbols=()):
+        self.symbols = []
+        self.symbol_index = {}
+        self.sectors = np.zeros(0, dtype=object)
+        for name in STATE_VECTORS.values():
+            setattr(self, name, _empty_vector(name, 0))
+        self.add_symbols(symbols)
+
+    @property
+    def last_date(self):
+        """Latest trading day accumulated for any symbol (None when empty)"""
+        seen = self.symbol_last_date[~np.isnat(self.symbol_last_date)]
+        return pd.Timestamp(seen.max()) if len(seen) else None
+
+    def add_symbols(self, symbols):
+        """Extend the universe; new symbols start with no rows"""
+        new = [symbol for symbol in symbols if symbol not in self.symbol_index]
+        if not new:
+            return
+        for symbol in new:
+            self.symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        self.sectors = np.r_[self.sectors, np.full(len(new), 'Unknown', dtype=object)]
+        for name in STATE_VECTORS.values():
+            setattr(self, name, np.r_[getattr(self, name), _empty_vector(name, len(new))])
+
+    def update_frame(self, master_df):
+        """
+        Merge master-style rows (Date, Symbol, Close, Volume, optional Sector)
+        in O(len(master_df)). Every row must be dated after its symbol's last
+        accumulated day; back-dated rows need a rebuild (ValueError).
+        """
+        if master_df.empty:
+            return self
+        codes, symbols, order = _symbol_date_order(master_df)
+        self.add_symbols(symbols)
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)] - 1
+        slot = np.array([self.symbol_index[symbol] for symbol in symbols], dtype=np.int64)[codes[starts]]
+
+        dates = _column(master_df, 'Date', order).astype('datetime64[ns]')
+        previous_date = self.symbol_last_date[slot]
+        if (~np.isnat(previous_date) & (dates[starts] <= previous_date)).any():
+            raise ValueError("Rows dated on or before a symbol's last accumulated day; rebuild the MetricsState")
+
+        close = _column(master_df, 'Close', order).astype(np.float64)
+        volume = _column(master_df, 'Volume', order).astype(np.float64)
+        # Each row's previous close: the row before it, or the state's last close for a symbol's first new row
+        previous_close = np.r_[np.nan, close[:-1]]
+        previous_close[starts] = self.last_close[slot]
+        with np.errstate(invalid='ignore'):
+            daily_return = (close / previous_close - 1.0) * 100.0
+
+        # Rows are contiguous per symbol: segment reductions instead of a groupby (per-day batches are tiny)
+        has_return = ~np.isnan(daily_return)
+        count_b = np.add.reduceat(has_return.astype(np.int64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_b = np.where(count_b > 0, np.add.reduceat(np.where(has_return, daily_return, 0.0), starts) / count_b, 0.0)
+        deviation = np.where(has_return, daily_return - np.repeat(mean_b, ends - starts + 1), 0.0)
+        m2_b = np.add.reduceat(deviation ** 2, starts)
+
+        # Chan et al. pairwise merge of (count, mean, M2)
+        count_a = self.return_count[slot]
+        count = count_a + count_b
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = mean_b - self.return_mean[slot]
+            weight = np.where(count > 0, count_b / count, 0.0)
+        self.return_m2[slot] = self.return_m2[slot] + m2_b + delta ** 2 * count_a * weight
+        self.return_mean[slot] = self.return_mean[slot] + delta * weight
+        self.return_count[slot] = count
+
+        self.rows[slot] += ends - starts + 1
+        self.close_sum[slot] += np.add.reduceat(close, starts)
+        self.volume_sum[slot] += np.add.reduceat(volume, starts)
+        self.close_min[slot] = np.fmin(self.close_min[slot], np.minimum.reduceat(close, starts))
+        self.close_max[slot] = np.fmax(self.close_max[slot], np.maximum.reduceat(close, starts))
+        new_symbol = np.isnat(self.first_date[slot])
+        self.first_date[slot] = np.where(new_symbol, dates[starts], self.first_date[slot])
+        self.first_close[slot] = np.where(new_symbol, close[starts], self.first_close[slot])
+        self.symbol_last_date[slot] = dates[ends]
+        self.last_close[slot] = close[ends]
+        if 'Sector' in master_df.columns:
+            self.sectors[slot] = master_df['Sector'].take(order[ends]).to_numpy(dtype=object)
+        return self
+
+    def update(self, date, bars):
+        """Add one trading day; bars is a Symbol-indexed frame with Close and Volume (and optionally Sector)"""
+        return self.update_frame(bars.rename_axis('Symbol').reset_index().assign(Date=pd.Timestamp(date)))
+
+    def metrics_frame(self):
+        """compute_yearly_metrics output, read off the accumulators"""
+        symbols = np.asarray(self.symbols, dtype=object)
+        order = np.argsort(symbols, kind='stable') if len(symbols) else np.zeros(0, dtype=np.int64)
+        order = order[self.rows[order] > 0]
+        start_price = self.first_close[order]
+        end_price = self.last_close[order]
+        count = self.return_count[order]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            volatility = np.where(count > 1, np.sqrt(self.return_m2[order] / (count - 1)), np.nan)
+        metrics_df = pd.DataFrame({
+            'Symbol': symbols[order],
+            'Sector': self.sectors[order],
+            'Yearly_Return': (end_price - start_price) / start_price * 100,
+            'Volatility': volatility,
+            'Avg_Price': self.close_sum[order] / self.rows[order],
+            'Max_Price': self.close_max[order],
+            'Min_Price': self.close_min[order],
+            'Avg_Volume': self.volume_sum[order] / self.rows[order],
+            'Start_Price': start_price,
+            'End_Price': end_price,
+            'Price_Change': end_price - start_price,
+        }, columns=METRIC_COLUMNS)
+        return metrics_df.sort_values('Yearly_Return', ascending=False)
+
+    def market_summary(self, metrics_df=None):
+        """compute_market_summary output; the price / volume averages come from the summed accumulators"""
+        metrics_df = self.metrics_frame() if metrics_df is None else metrics_df
+        rows = int(self.rows.sum())
+        if not rows:
+            return _market_summary(metrics_df, np.nan, np.nan)
+        return _market_summary(metrics_df, self.close_sum.sum() / rows, self.volume_sum.sum() / rows)
+
+    def to_frame(self):
+        """One row per symbol with STATE_COLUMNS (the snapshot's metrics_state table)"""
+        frame = pd.DataFrame({'Symbol': list(self.symbols), 'Sector': list(self.sectors)})
+        for column, name in STATE_VECTORS.items():
+            frame[column] = getattr(self, name)
+        return frame
+
+    @classmethod
+    def from_frame(cls, frame):
+        state = cls(frame['Symbol'].tolist())
+        state.sectors = frame['Sector'].to_numpy(dtype=object).copy()
+        for column, name in STATE_VECTORS.items():
+            setattr(state, name, frame[column].to_numpy(dtype=getattr(state, name).dtype).copy())
+        return state
+
+
+def build_metrics_state(master_df):
+    """Fresh MetricsState fed with every row of master_df"""
+    return MetricsState().update_frame(master_df)
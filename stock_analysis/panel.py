@@ -0,0 +1,101 @@
+"""
+Dense Price Panel
+Shared date axis x symbols x fields array with a symbol -> column index
+
+Built once per snapshot from master_df. The array is Fortran-ordered, so every
+(symbol, field) series is one contiguous, date-sorted block: a per-symbol
+lookup is a dict hit plus a slice, independent of how many symbols are loaded.
+Days a symbol did not trade are NaN and are dropped by symbol_frame().
+
+Cumulative growth of 1 unit, prod(1 + Daily_Return / 100), is precomputed for
+every symbol. A return curve for any window is then two binary searches on the
+date axis plus one rebasing division over the window's rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+PANEL_FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Daily_Return']
+
+
+class PricePanel:
+    """values[date, symbol, field] with dates sorted ascending"""
+
+    def __init__(self, dates, symbols, fields, values, present=None, growth=None):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = list(symbols)
+        self.fields = list(fields)
+        self.values = values
+        self.symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.field_index = {field: k for k, field in enumerate(self.fields)}
+        # present / growth can be passed in precomputed (e.g. attached from shared memory)
+        if present is None:
+            # A symbol traded on a date iff it has a Close there
+            present = ~np.isnan(values[:, :, self.field_index['Close']])
+        if growth is None:
+            # Missing returns (first day, non-trading days) count as flat
+            daily_return = values[:, :, self.field_index['Daily_Return']]
+            growth = np.cumprod(1 + np.nan_to_num(daily_return) / 100, axis=0)
+        self.present = present
+        self.growth = growth
+
+    def __contains__(self, symbol):
+        return symbol in self.symbol_index
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def column(self, symbol, field='Close'):
+        """Full-length (NaN-padded) series for one symbol as a NumPy view"""
+        return self.values[:, self.symbol_index[symbol], self.field_index[field]]
+
+    def symbol_frame(self, symbol, fields=None):
+        """Date-sorted rows for one symbol, like master_df[master_df['Symbol'] == symbol].sort_values('Date')"""
+        j = self.symbol_index[symbol]
+        fields = fields or self.fields
+        rows = self.present[:, j]
+        columns = {'Date': self.dates[rows]}
+        for field in fields:
+            series = self.values[rows, j, self.field_index[field]]
+            columns[field] = series.astype(np.int64) if field == 'Volume' else series
+        return pd.DataFrame(columns)
+
+    def aligned(self, symbols, field='Close'):
+        """Date x symbols frame on the shared axis (NaN where a symbol did not trade)"""
+        columns = [self.symbol_index[symbol] for symbol in symbols]
+        return pd.DataFrame(self.values[:, columns, self.field_index[field]],
+                            index=pd.Index(self.dates, name='Date'), columns=list(symbols))
+
+    def window(self, start=None, end=None):
+        """Row slice of the date axis covering [start, end] (binary search, inclusive)"""
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side='right')
+        return slice(lo, hi)
+
+    def cumulative_returns(self, symbols, start=None, end=None):
+        """
+        Date x symbols cumulative return (fraction) over [start, end], rebased
+        to 0 on the window's first date. NaN where a symbol did not trade.
+        """
+        rows = self.window(start, end)
+        columns = [self.symbol_index[symbol] for symbol in symbols]
+        growth = self.growth[rows][:, columns]
+        cumulative = growth / growth[:1] - 1
+        cumulative = np.where(self.present[rows][:, columns], cumulative, np.nan)
+        return pd.DataFrame(cumulative, index=pd.Index(self.dates[rows], name='Date'), columns=list(symbols))
+
+
+def build_panel(master_df, fields=PANEL_FIELDS):
+    """Scatter master_df rows into a dense PricePanel (one pass, no per-symbol filtering)"""
+    fields = [field for field in fields if field in master_df.columns]
+    if 'Daily_Return' not in fields:
+        master_df = master_df.assign(
+            Daily_Return=master_df.sort_values('Date').groupby('Symbol')['Close'].pct_change() * 100)
+        fields.append('Daily_Return')
+    date_codes, dates = pd.factorize(master_df['Date'], sort=True)
+    symbol_codes, symbols = pd.factorize(master_df['Symbol'], sort=True)
+
+    values = np.full((len(dates), len(symbols), len(fields)), np.nan, order='F')
+    for k, field in enumerate(fields):
+        values[date_codes, symbol_codes, k] = master_df[field].to_numpy(dtype=np.float64)
+    return PricePanel(dates, symbols, fields, values)
@@ -0,0 +1,140 @@
+"""
+Processing Pipeline
+Cleaning, sector mapping and derived-table steps from Data_Preprocessing.ipynb
+"""
+
+import json
+import os
+import pickle
+
+import pandas as pd
+
+from stock_analysis import anomalies, correlation, metrics
+from stock_analysis.pyramid import build_pyramid
+from stock_analysis.snapshot import write_snapshot
+
+SECTOR_CSV = 'Sector_data - Sheet1.csv'
+OUTPUT_DIR = './processed_data'
+
+# Symbols present in the YAML data but absent from the sector CSV
+MISSING_SECTOR_MAPPING = {
+    'ADANIENT': 'MISCELLANEOUS',      # Adani Enterprises (parent company)
+    'BHARTIARTL': 'TELECOM',           # Bharti Airtel
+    'BRITANNIA': 'FOOD & TOBACCO',     # Britannia Industries
+    'TATACONSUM': 'FOOD & TOBACCO'     # Tata Consumer Products
+}
+
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+NUMERIC_COLUMNS = OHLC_COLUMNS + ['Volume']
+
+# ============================================================================
+# CLEANING & SECTORS
+# ============================================================================
+
+def clean_batch(raw_df):
+    """
+    Clean a raw columnar batch (all symbols at once).
+
+    Same rules as the notebook's create_and_clean_dataframe: parse dates,
+    drop unparsable dates and missing / non-positive OHLC, sort by Symbol
+    and Date. Returns are added separately by add_returns.
+    """
+    df = raw_df.copy()
+    if df.empty:
+        return df
+
+    df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
+    df = df.dropna(subset=['Date'])
+
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    mask = (df[OHLC_COLUMNS] > 0).all(axis=1)
+    df = df[mask].dropna(subset=OHLC_COLUMNS)
+
+    return df.sort_values(['Symbol', 'Date'], kind='stable').reset_index(drop=True)
+
+
+def add_returns(df):
+    """Add Daily_Return (percent) and Price_Change; df must be sorted by Symbol, Date"""
+    df['Daily_Return'] = df.groupby('Symbol', sort=False)['Close'].pct_change() * 100.0
+    df['Price_Change'] = df['Close'] - df['Open']
+    return df
+
+
+def load_sector_mapping(csv_path=SECTOR_CSV, extra=None):
+    """Map bare symbols to sectors from 'COMPANY: SYMBOL' entries in the sector CSV"""
+    sector_df = pd.read_csv(csv_path)
+    symbols = sector_df['Symbol'].str.split(':').str[-1].str.strip()
+    symbol_mapping = dict(zip(symbols, sector_df['sector']))
+    if extra:
+        symbol_mapping.update(extra)
+    return symbol_mapping
+
+
+def attach_sectors(df, symbol_mapping):
+    """Add the Sector column and drop symbols without a sector"""
+    df['Sector'] = df['Symbol'].map(symbol_mapping)
+    missing = df['Sector'].isna().sum()
+    if missing > 0:
+        print(f"Warning: {missing} rows have missing sector information")
+        df = df.dropna(subset=['Sector'])
+    return df
+
+
+def build_master_frame(clean_df, symbol_mapping):
+    """Cleaned OHLCV rows -> master_df as consumed by app.py"""
+    master_df = add_returns(clean_df.sort_values(['Symbol', 'Date'], kind='stable').reset_index(drop=True))
+    master_df = attach_sectors(master_df, symbol_mapping)
+    master_df['Month_Year'] = master_df['Date'].dt.to_period('M')
+    return master_df
+
+# ============================================================================
+# DERIVED TABLES
+# ============================================================================
+
+def compute_correlation_matrix(master_df, state=None):
+    """
+    Symbol x Symbol correlation of daily returns (rounded to 3 places).
+
+    Pass a CorrelationState already fed with master_df's days to skip the
+    full-history pass.
+    """
+    state = state or correlation.build_correlation_state(master_df)
+    return state.correlation_matrix(decimals=3)
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_processed_data(master_df, metrics_df, correlation_matrix, monthly_df, market_summary,
+                          output_dir=OUTPUT_DIR, metrics_state=None, alerts=None):
+    """
+    Write the snapshot bundle and pickle consumed by app.py plus the CSV/JSON side outputs.
+
+    The snapshot also stores metrics_state and the anomaly alerts (both
+    built from master_df when not given) so the next incremental run can
+    resume them.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    metrics_df.to_csv(f"{output_dir}/yearly_metrics.csv", index=False)
+    monthly_df.to_csv(f"{output_dir}/monthly_performance.csv", index=False)
+    correlation_matrix.to_csv(f"{output_dir}/correlation_matrix.csv")
+    with open(f"{output_dir}/market_summary.json", 'w') as f:
+        json.dump(market_summary, f, indent=4)
+
+    export_data = {
+        'master_data': master_df,
+        'metrics': metrics_df,
+        'correlation_matrix': correlation_matrix,
+        'monthly_performance': monthly_df,
+        'market_summary': market_summary
+    }
+    with open(f"{output_dir}/processed_data.pkl", 'wb') as f:
+        pickle.dump(export_data, f)
+    # The OHLCV pyramid, metrics state and alerts only live in the snapshot; the pickle keeps its original keys
+    metrics_state = metrics_state or metrics.build_metrics_state(master_df)
+    alerts = anomalies.detect_anomalies(master_df)[1] if alerts is None else alerts
+    snapshot_data = dict(export_data, metrics_state=metrics_state.to_frame(), alerts=alerts, **build_pyramid(master_df))
+    return write_snapshot(snapshot_data, f"{output_dir}/snapshot")
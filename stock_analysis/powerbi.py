@@ -0,0 +1,284 @@
+"""
+Power BI Export
+Incremental CSV / Parquet export of the processed tables into powerbi_data/
+
+Files (.csv, or .parquet with fmt='parquet'):
+    01_master_prices         daily OHLCV rows (Parquet: one file per month in 01_master_prices/)
+    02_stock_metrics         one row per stock
+    03_monthly_performance   one row per stock and month
+    04_market_summary        single row
+    05_correlations          Stock1 / Stock2 / Correlation, upper triangle only (each pair once)
+    06_sector_summary        one row per sector
+    07_date_table            one row per trading day
+
+An export manifest (powerbi_data/export_manifest.json) keeps a content
+fingerprint of every file written. The next run only touches what changed:
+the master price CSV gets the dates after its watermark appended (after
+checking, month by month, that the rows already in the file are unchanged;
+otherwise it is rewritten), Parquet month files are rewritten only for
+months whose rows changed, and every other table is skipped when its
+fingerprint matches. The writes are independent and run on a thread pool.
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.correlation import upper_pairs
+
+EXPORT_DIR = 'powerbi_data'
+EXPORT_MANIFEST = 'export_manifest.json'
+EXPORT_VERSION = 1
+FORMATS = ('csv', 'parquet')
+# Compression every Power BI Parquet connector version reads
+PARQUET_COMPRESSION = 'snappy'
+MASTER_TABLE = '01_master_prices'
+MAX_WORKERS = 8
+
+# ============================================================================
+# TABLES
+# ============================================================================
+
+def correlation_upper(correlation_matrix):
+    """Stock1 / Stock2 / Correlation for each i < j pair (half the rows of a full melt, no self-pairs)"""
+    symbols = np.asarray(correlation_matrix.columns, dtype=object)
+    first, second, values = upper_pairs(correlation_matrix)
+    return pd.DataFrame({'Stock1': symbols[first], 'Stock2': symbols[second], 'Correlation': values})
+
+
+def sector_summary(metrics_df):
+    """Per-sector aggregates plus the comma-separated member list"""
+    summary = metrics_df.groupby('Sector').agg({
+        'Yearly_Return': ['mean', 'count', 'sum'],
+        'Volatility': 'mean',
+        'Symbol': lambda x: ','.join(x)
+    }).round(2)
+    summary.columns = ['Avg_Return', 'Stock_Count', 'Total_Return', 'Avg_Volatility', 'Stocks']
+    return summary.reset_index()
+
+
+def date_table(master_df):
+    """Calendar table over the trading days of master_df"""
+    dates = pd.Series(np.sort(master_df['Date'].unique()), name='Date')
+    return pd.DataFrame({
+        'Date': dates,
+        'Year': dates.dt.year,
+        'Month': dates.dt.month,
+        'Month_Name': dates.dt.month_name(),
+        'Quarter': dates.dt.quarter,
+        'Month_Year': dates.dt.to_period('M').astype(str),
+    })
+
+
+def _export_frame(df):
+    """Period columns as 'YYYY-MM' strings, as they appear in the CSVs (Parquet has no period type)"""
+    periods = {column: df[column].astype(str) for column in df.columns
+               if isinstance(df[column].dtype, pd.PeriodDtype)}
+    return df.assign(**periods) if periods else df
+
+# ============================================================================
+# FINGERPRINTS & MANIFEST
+# ============================================================================
+
+def _row_hashes(df):
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def fingerprint(df):
+    """Content hash of a frame, independent of row order (row hashes summed mod 2^64)"""
+    return f"{int(_row_hashes(df).sum(dtype=np.uint64)):016x}"
+
+
+def month_fingerprints(df):
+    """{'YYYY-MM': fingerprint} of the rows of each month of df['Date']"""
+    if df.empty:
+        return {}
+    sums = pd.Series(_row_hashes(df)).groupby(df['Date'].dt.strftime('%Y-%m').to_numpy()).sum()
+    return {month: f"{int(value):016x}" for month, value in sums.items()}
+
+
+def empty_export_manifest(fmt):
+    return {'version': EXPORT_VERSION, 'format': fmt, 'tables': {}}
+
+
+def load_export_manifest(path):
+    """Previous export manifest, or None if missing / from an older version"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    return manifest if manifest.get('version') == EXPORT_VERSION else None
+
+
+def save_export_manifest(manifest, path):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+# ============================================================================
+# WRITERS
+# ============================================================================
+
+def _write_frame(df, path, fmt):
+    """Write to a temp file and swap it in, so a Power BI refresh never reads half a file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    if fmt == 'csv':
+        df.to_csv(tmp_path, index=False)
+    else:
+        df.to_parquet(tmp_path, index=False, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+
+
+def _write_master_csv(df, path):
+    _write_frame(df, path, 'csv')
+    # The next run only appends if the file is still exactly this size
+    return {'bytes': Path(path).stat().st_size}
+
+
+def _append_csv(df, path):
+    with open(path, 'a', encoding='utf-8', newline='') as f:
+        df.to_csv(f, index=False, header=False)
+    return {'bytes': Path(path).stat().st_size}
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+# ============================================================================
+# PLANNING
+# ============================================================================
+
+def _plan_master_csv(master, previous, export_path):
+    """(entry, jobs) for 01_master_prices.csv: append after the watermark when the exported rows are unchanged"""
+    entry = {'file': f"{MASTER_TABLE}.csv", 'columns': list(master.columns), 'rows': len(master),
+             'watermark': str(master['Date'].max()) if len(master) else None,
+             'partitions': month_fingerprints(master)}
+    path = Path(export_path) / entry['file']
+
+    if previous and previous.get('watermark') and previous['columns'] == entry['columns'] \
+            and path.exists() and path.stat().st_size == previous.get('bytes'):
+        watermark = pd.Timestamp(previous['watermark'])
+        exported = master['Date'] <= watermark
+        if month_fingerprints(master[exported]) == previous['partitions']:
+            new_rows = master[~exported]
+            if new_rows.empty:
+                entry['bytes'] = previous['bytes']
+                return entry, []
+            return entry, [('appended', len(new_rows), partial(_append_csv, new_rows, path))]
+    return entry, [('written', len(master), partial(_write_master_csv, master, path))]
+
+
+def _plan_master_parquet(master, previous, export_path):
+    """(entry, jobs) for 01_master_prices/<YYYY-MM>.parquet: rewrite only months whose rows changed"""
+    entry = {'file': MASTER_TABLE, 'columns': list(master.columns), 'rows': len(master),
+             'watermark': str(master['Date'].max()) if len(master) else None,
+             'partitions': month_fingerprints(master)}
+    folder = Path(export_path) / MASTER_TABLE
+    old_partitions = previous['partitions'] if previous and previous['columns'] == entry['columns'] else {}
+
+    months = master['Date'].dt.strftime('%Y-%m')
+    jobs = []
+    for month, rows in master.groupby(months.to_numpy(), sort=True):
+        path = folder / f"{month}.parquet"
+        if old_partitions.get(month) != entry['partitions'][month] or not path.exists():
+            jobs.append(('written', len(rows), partial(_write_frame, rows, path, 'parquet')))
+    for month in set(old_partitions) - set(entry['partitions']):
+        jobs.append(('removed', 0, partial(_remove, folder / f"{month}.parquet")))
+    return entry, jobs
+
+
+def _plan_table(name, df, previous, export_path, fmt):
+    """(entry, jobs) for a small table: rewritten whole, skipped when its fingerprint is unchanged"""
+    entry = {'file': f"{name}.{fmt}", 'columns': list(df.columns), 'rows': len(df), 'fingerprint': fingerprint(df)}
+    path = Path(export_path) / entry['file']
+    if previous and previous.get('fingerprint') == entry['fingerprint'] \
+            and previous['columns'] == entry['columns'] and path.exists():
+        return entry, []
+    return entry, [('written', len(df), partial(_write_frame, df, path, fmt))]
+
+# ============================================================================
+# EXPORT
+# ============================================================================
+
+def export_powerbi(master_df, metrics_df, correlation_matrix, monthly_df, market_summary,
+                   export_path=EXPORT_DIR, fmt='csv', workers=None, full_refresh=False):
+    """
+    Bring export_path up to date with the processed tables.
+
+    Returns a summary dict: files written / appended / unchanged, rows
+    written and seconds taken.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {FORMATS}")
+    start = time.perf_counter()
+    os.makedirs(export_path, exist_ok=True)
+    manifest_path = Path(export_path) / EXPORT_MANIFEST
+    old_manifest = load_export_manifest(manifest_path)
+    same_format = old_manifest is not None and old_manifest['format'] == fmt and not full_refresh
+    previous = old_manifest['tables'] if same_format else {}
+
+    tables = {
+        '02_stock_metrics': metrics_df,
+        '03_monthly_performance': monthly_df,
+        '04_market_summary': pd.DataFrame([market_summary]),
+        '05_correlations': correlation_upper(correlation_matrix),
+        '06_sector_summary': sector_summary(metrics_df),
+        '07_date_table': date_table(master_df),
+    }
+
+    manifest = empty_export_manifest(fmt)
+    plan_master = _plan_master_csv if fmt == 'csv' else _plan_master_parquet
+    entry, jobs = plan_master(_export_frame(master_df), previous.get(MASTER_TABLE), export_path)
+    manifest['tables'][MASTER_TABLE] = entry
+    planned = [(MASTER_TABLE, *job) for job in jobs]
+    for name, df in tables.items():
+        entry, jobs = _plan_table(name, _export_frame(df), previous.get(name), export_path, fmt)
+        manifest['tables'][name] = entry
+        planned.extend((name, *job) for job in jobs)
+
+    # Files of the other format written by a previous export
+    if old_manifest is not None and not same_format:
+        for name, old_entry in old_manifest['tables'].items():
+            if old_entry['file'] != manifest['tables'].get(name, {}).get('file'):
+                path = Path(export_path) / old_entry['file']
+                if path.is_dir():
+                    for month in old_entry.get('partitions', {}):
+                        planned.append((name, 'removed', 0, partial(_remove, path / f"{month}.parquet")))
+                else:
+                    planned.append((name, 'removed', 0, partial(_remove, path)))
+
+    workers = workers or min(MAX_WORKERS, max(len(planned), 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [(name, pool.submit(job)) for name, _, _, job in planned]
+        for name, future in futures:
+            result = future.result()
+            if result:
+                manifest['tables'][name].update(result)
+    save_export_manifest(manifest, manifest_path)
+
+    touched = {name for name, *_ in planned}
+    summary = {
+        'format': fmt,
+        'written': sorted({name for name, action, *_ in planned if action == 'written'}),
+        'appended': sorted({name for name, action, *_ in planned if action == 'appended'}),
+        'unchanged': sorted(set(manifest['tables']) - touched),
+        'rows_written': int(sum(rows for _, action, rows, _ in planned if action != 'removed')),
+        'seconds': time.perf_counter() - start,
+    }
+    print(f"✓ Power BI export ({fmt}) to {export_path}: {len(summary['written'])} rewritten, "
+          f"{len(summary['appended'])} appended, {len(summary['unchanged'])} unchanged; "
+          f"{summary['rows_written']:,} rows in {summary['seconds']:.2f}s")
+    return summary
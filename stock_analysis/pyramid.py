@@ -0,0 +1,95 @@
+"""
+OHLCV Pyramid
+Weekly, monthly, quarterly and yearly OHLCV bars for every symbol
+
+Each level aggregates the daily rows of master_df into proper bars: first
+Open, max High, min Low, last Close, summed Volume, plus the first and last
+trading date the bar covers. The levels are written into the snapshot next
+to master_data, so a view over years of history reads a few hundred bars
+per symbol instead of every trading day. select_resolution() picks the
+coarsest level that still gives a requested range enough bars.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Finest to coarsest; the period code is what Series.dt.to_period() takes
+RESOLUTIONS = {
+    'daily': None,
+    'weekly': 'W-SUN',
+    'monthly': 'M',
+    'quarterly': 'Q',
+    'yearly': 'Y',
+}
+# Approximate bars per calendar day at each level, used to size a range
+BARS_PER_DAY = {
+    'daily': 252 / 365.25,
+    'weekly': 52 / 365.25,
+    'monthly': 12 / 365.25,
+    'quarterly': 4 / 365.25,
+    'yearly': 1 / 365.25,
+}
+BAR_RESOLUTIONS = [resolution for resolution in RESOLUTIONS if resolution != 'daily']
+PYRAMID_TABLES = [f"bars_{resolution}" for resolution in BAR_RESOLUTIONS]
+BAR_COLUMNS = ['Symbol', 'Period', 'Start_Date', 'Date', 'Open', 'High', 'Low', 'Close',
+               'Volume', 'Return', 'Trading_Days']
+
+# A line chart stays continuous down to a few hundred points
+MIN_BARS = 250
+
+
+def build_bars(master_df, resolution):
+    """
+    OHLCV bars for one pyramid level, sorted by Symbol and Period.
+
+    Date is the last trading day in the bar (where the bar is plotted) and
+    Return is the close-to-close change from the previous bar in percent
+    (open-to-close for a symbol's first bar).
+    """
+    if RESOLUTIONS.get(resolution) is None:
+        raise ValueError(f"Unknown resolution {resolution!r}; expected one of {BAR_RESOLUTIONS}")
+    df = master_df[['Symbol', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+    df = df.sort_values(['Symbol', 'Date'], kind='stable')
+    period = df['Date'].dt.to_period(RESOLUTIONS[resolution]).rename('Period')
+
+    bars = df.groupby([df['Symbol'], period], sort=True).agg(
+        Start_Date=('Date', 'first'),
+        Date=('Date', 'last'),
+        Open=('Open', 'first'),
+        High=('High', 'max'),
+        Low=('Low', 'min'),
+        Close=('Close', 'last'),
+        Volume=('Volume', 'sum'),
+        Trading_Days=('Date', 'size'),
+    ).reset_index()
+    bars['Period'] = bars['Period'].astype(str)
+    bars['Volume'] = bars['Volume'].astype(np.int64)
+    bars['Return'] = bars.groupby('Symbol', sort=False)['Close'].pct_change() * 100.0
+    first_bar = bars['Return'].isna()
+    bars.loc[first_bar, 'Return'] = (bars.loc[first_bar, 'Close'] / bars.loc[first_bar, 'Open'] - 1) * 100.0
+    bars['Trading_Days'] = bars['Trading_Days'].astype(np.int64)
+    return bars[BAR_COLUMNS]
+
+
+def build_pyramid(master_df):
+    """{'bars_weekly': ..., 'bars_monthly': ..., ...} for write_snapshot"""
+    return {f"bars_{resolution}": build_bars(master_df, resolution) for resolution in BAR_RESOLUTIONS}
+
+
+def select_resolution(start, end, min_bars=MIN_BARS):
+    """
+    Coarsest resolution that still gives about min_bars bars over [start, end];
+    'daily' when even weekly bars would be too sparse.
+    """
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    chosen = 'daily'
+    for resolution, rate in BARS_PER_DAY.items():
+        if days * rate >= min_bars:
+            chosen = resolution
+    return chosen
+
+
+def bars_in_range(bars, symbol, start=None, end=None):
+    """One symbol's bars whose last trading day falls in [start, end], indexed by Date"""
+    rows = bars[bars['Symbol'] == symbol].set_index('Date')
+    return rows.loc[start:end]
@@ -0,0 +1,359 @@
+"""
+Market Replay
+Streams trading days through an asyncio producer into incrementally updated in-memory state
+
+MarketReplay seeds a MetricsState, an IndicatorState and an AnomalyDetector
+with the snapshot's rows up to a start date, then replays the
+data/YYYY-MM/*.yaml days after it (or, with source='synthetic', a
+random-walk stand-in feed continuing from the last close) at a configurable
+number of trading days per second. A
+producer coroutine parses and paces the days into a bounded asyncio.Queue;
+a consumer coroutine folds each one into the states in O(symbols) and
+publishes an immutable view. Both run on an event loop in a background
+thread, so the Streamlit script never blocks on the feed: a fragment reruns
+every REPLAY_REFRESH_S seconds and long-polls view(wait=...), which returns
+as soon as a newer day is applied; only that fragment reruns.
+
+Every tick is stamped when the producer emits it, when the consumer has
+applied it and when a fragment has finished drawing it (record_render).
+latency_summary() reports percentiles of emit -> screen and its parts.
+"Screen" is the end of the fragment run on the server, i.e. the moment the
+deltas are queued to the browser; browser paint time is not included.
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# The dashboard imports this module for its sidebar defaults on every start, so the state
+# modules and the YAML engine (libyaml, process pool) are imported where a replay first needs them
+
+SOURCES = ('yaml', 'synthetic')
+DEFAULT_SPEED = 2.0  # trading days per second
+DEFAULT_REPLAY_DAYS = 60
+REPLAY_REFRESH_S = 0.5
+# How long a fragment run may block for a tick newer than the one it last drew
+REPLAY_WAIT_S = 0.4
+QUEUE_SIZE = 8
+LATENCY_SAMPLES = 1000
+BREADTH_DAYS = 250
+RECENT_ALERTS = 50
+# A replay nobody has looked at for this long stops itself (closed browser tab)
+IDLE_TIMEOUT_S = 120.0
+LATENCY_PARTS = ['queue_ms', 'apply_ms', 'wait_ms', 'render_ms', 'total_ms']
+
+# ============================================================================
+# FEEDS
+# ============================================================================
+
+def _file_date(path):
+    """Trading day of a daily file from its 'YYYY-MM-DD_HH-MM-SS.yaml' name (None if unparsable)"""
+    try:
+        return pd.Timestamp(Path(path).stem.split('_')[0])
+    except ValueError:
+        return None
+
+
+async def yaml_days(data_folder, start=None):
+    """(date, bars) for every daily YAML file dated after start, oldest first (parsed off the event loop)"""
+    from stock_analysis.ingest import columns_to_frame, list_yaml_files, parse_yaml_file
+    from stock_analysis.pipeline import clean_batch
+
+    loop = asyncio.get_running_loop()
+    for path in list_yaml_files(data_folder):
+        file_date = _file_date(path)
+        if start is not None and file_date is not None and file_date <= start.normalize():
+            continue
+        columns = await loop.run_in_executor(None, parse_yaml_file, path)
+        bars = clean_batch(columns_to_frame(columns))
+        if bars.empty or (start is not None and bars['Date'].max() <= start):
+            continue
+        yield bars['Date'].max(), bars
+
+
+async def synthetic_days(metrics_state, start, seed=0):
+    """
+    Endless random-walk OHLCV days after start: each symbol's close moves by
+    its own historical daily volatility, volume scatters around its average.
+    """
+    rng = np.random.default_rng(seed)
+    traded = metrics_state.rows > 0
+    symbols = np.asarray(metrics_state.symbols, dtype=object)[traded]
+    close = metrics_state.last_close[traded].copy()
+    count = metrics_state.return_count[traded]
+    volatility = np.where(count > 1, np.sqrt(metrics_state.return_m2[traded] / np.maximum(count - 1, 1)), 1.0) / 100
+    avg_volume = metrics_state.volume_sum[traded] / metrics_state.rows[traded]
+    date = pd.Timestamp(start)
+    while True:
+        date = date + pd.offsets.BDay(1)
+        open_ = close * np.exp(rng.normal(0.0, volatility / 4))
+        close = close * np.exp(rng.normal(0.0, volatility))
+        spread = np.abs(rng.normal(0.0, volatility / 4, size=(2, len(symbols))))
+        bars = pd.DataFrame({
+            'Date': date,
+            'Symbol': symbols,
+            'Open': open_,
+            'High': np.maximum(open_, close) * (1 + spread[0]),
+            'Low': np.minimum(open_, close) * (1 - spread[1]),
+            'Close': close,
+            'Volume': (avg_volume * rng.lognormal(0.0, 0.3, len(symbols))).astype(np.int64),
+            'Month': date.strftime('%Y-%m'),
+        })
+        yield date, bars
+        await asyncio.sleep(0)
+
+# ============================================================================
+# REPLAY
+# ============================================================================
+
+class MarketReplay:
+    """One replay session: feed, incrementally updated state and latency samples"""
+
+    def __init__(self, master_df, data_folder='data', source='yaml', start=None,
+                 speed=DEFAULT_SPEED, replay_days=DEFAULT_REPLAY_DAYS, seed=0):
+        from stock_analysis.anomalies import AnomalyDetector, empty_alerts
+        from stock_analysis.indicators import IndicatorState, build_indicator_state
+        from stock_analysis.metrics import build_metrics_state
+
+        if source not in SOURCES:
+            raise ValueError(f"Unknown replay source {source!r}; expected one of {SOURCES}")
+        dates = np.sort(master_df['Date'].unique())
+        if start is None:
+            start = dates[-1] if source == 'synthetic' else dates[max(len(dates) - replay_days - 1, 0)]
+        self.start_date = pd.Timestamp(start)
+        self.source = source
+        self.data_folder = data_folder
+        self.speed = float(speed)
+        self.seed = seed
+        self.total_days = None if source == 'synthetic' else int((dates > np.datetime64(self.start_date)).sum())
+
+        seed_rows = master_df[master_df['Date'] <= self.start_date]
+        self.sectors = dict(zip(master_df['Symbol'], master_df['Sector'])) if 'Sector' in master_df.columns else {}
+        self.metrics_state = build_metrics_state(seed_rows)
+        self.indicator_state = build_indicator_state(seed_rows) if len(seed_rows) else IndicatorState()
+        self.anomaly_detector = AnomalyDetector()
+        self.anomaly_detector.update_frame(seed_rows)
+        self.alerts = empty_alerts()
+        self.latency = deque(maxlen=LATENCY_SAMPLES)
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        self._applied = threading.Condition(self._lock)
+        self._view = self._make_view(seq=0, date=self.start_date, bars=None, indicators=None,
+                                     breadth=deque(maxlen=BREADTH_DAYS), emitted=None, applied=None)
+        self._rendered_seq = 0
+        self._last_read = time.monotonic()
+        self._loop = None
+        self._resume = None
+        self._stop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self.status = 'ready'
+        self.error = None
+
+    # ------------------------------------------------------------------------
+    # lifecycle (called from the Streamlit script thread)
+    # ------------------------------------------------------------------------
+
+    def start(self):
+        """Start the event-loop thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._ready.clear()
+        self._thread = threading.Thread(target=self._run_loop, name='market-replay', daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _call(self, event, method):
+        """Run event.<method>() on the replay's loop (asyncio events are not thread-safe)"""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(lambda: getattr(getattr(self, event), method)())
+
+    def pause(self):
+        self._call('_resume', 'clear')
+        self.status = 'paused'
+
+    def resume(self):
+        self._call('_resume', 'set')
+        self.status = 'running'
+
+    def stop(self):
+        self._call('_stop', 'set')
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def set_speed(self, speed):
+        """Trading days per second; takes effect from the next day"""
+        self.speed = max(float(speed), 1e-3)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    # ------------------------------------------------------------------------
+    # event loop
+    # ------------------------------------------------------------------------
+
+    def _run_loop(self):
+        try:
+            asyncio.run(self._main())
+        except Exception as e:
+            self.error = e
+            self.status = 'failed'
+        finally:
+            self._ready.set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._resume = asyncio.Event()
+        self._resume.set()
+        self._stop = asyncio.Event()
+        self.status = 'running'
+        self._ready.set()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        producer = asyncio.create_task(self._produce(queue))
+        consumer = asyncio.create_task(self._consume(queue))
+        stopper = asyncio.create_task(self._stop.wait())
+        await asyncio.wait([consumer, stopper], return_when=asyncio.FIRST_COMPLETED)
+        for task in (producer, consumer, stopper):
+            task.cancel()
+        await asyncio.gather(producer, consumer, stopper, return_exceptions=True)
+        if producer.done() and not producer.cancelled() and producer.exception() is not None:
+            raise producer.exception()
+        if self.status != 'failed':
+            self.status = 'finished' if not self._stop.is_set() else 'stopped'
+
+    def _feed(self):
+        if self.source == 'synthetic':
+            return synthetic_days(self.metrics_state, self.start_date, self.seed)
+        return yaml_days(self.data_folder, self.start_date)
+
+    async def _produce(self, queue):
+        """Pace the feed at self.speed days per second; a full queue blocks (backpressure)"""
+        seq = 0
+        due = time.monotonic()
+        try:
+            async for date, bars in self._feed():
+                await self._resume.wait()
+                now = time.monotonic()
+                if now - self._last_read > IDLE_TIMEOUT_S:
+                    break
+                if due > now:
+                    await asyncio.sleep(due - now)
+                due = max(due, time.monotonic() - 1.0 / self.speed) + 1.0 / self.speed
+                seq += 1
+                await queue.put({'seq': seq, 'date': date, 'bars': bars, 'emitted': time.perf_counter()})
+        finally:
+            await queue.put(None)
+
+    async def _consume(self, queue):
+        while True:
+            tick = await queue.get()
+            if tick is None:
+                return
+            dequeued = time.perf_counter()
+            self._apply(tick, dequeued)
+
+    def _apply(self, tick, dequeued):
+        """Fold one day into the states and publish a new view (O(symbols))"""
+        bars = tick['bars']
+        if self.sectors:
+            bars = bars[bars['Symbol'].isin(self.sectors.keys())].assign(Sector=lambda df: df['Symbol'].map(self.sectors))
+        bars = bars.drop_duplicates('Symbol', keep='last').set_index('Symbol')
+
+        state = self.metrics_state
+        state.add_symbols(bars.index)
+        slots = np.array([state.symbol_index[symbol] for symbol in bars.index], dtype=np.int64)
+        previous_close = state.last_close[slots]
+        state.update(tick['date'], bars)
+        indicators = self.indicator_state.update(tick['date'], bars)
+        new_alerts = self.anomaly_detector.update(tick['date'], bars)
+        if len(new_alerts):
+            from stock_analysis.anomalies import sort_alerts
+            self.alerts = sort_alerts(pd.concat([new_alerts, self.alerts], ignore_index=True)).head(RECENT_ALERTS)
+
+        day = pd.DataFrame({
+            'Close': bars['Close'].to_numpy(),
+            'Change_%': (bars['Close'].to_numpy() / previous_close - 1.0) * 100.0,
+            'Volume': bars['Volume'].to_numpy(),
+        }, index=bars.index)
+        with self._lock:
+            breadth = self._view['breadth']
+            breadth.append({'Date': tick['date'], 'Advancers': int((day['Change_%'] > 0).sum()),
+                            'Decliners': int((day['Change_%'] < 0).sum()),
+                            'Avg_Change': float(day['Change_%'].mean())})
+            self._view = self._make_view(tick['seq'], tick['date'], day, indicators.loc[day.index], breadth,
+                                         tick['emitted'], time.perf_counter(), dequeued=dequeued)
+            self._applied.notify_all()
+
+    def _make_view(self, seq, date, bars, indicators, breadth, emitted, applied, dequeued=None):
+        metrics_df = self.metrics_state.metrics_frame()
+        return {
+            'seq': seq,
+            'date': pd.Timestamp(date),
+            'bars': bars,
+            'indicators': indicators,
+            'breadth': breadth,
+            'metrics': metrics_df,
+            'market_summary': self.metrics_state.market_summary(metrics_df),
+            'alerts': self.alerts,
+            'emitted': emitted,
+            'dequeued': dequeued,
+            'applied': applied,
+        }
+
+    # ------------------------------------------------------------------------
+    # readers (Streamlit fragment)
+    # ------------------------------------------------------------------------
+
+    def view(self, wait=0.0):
+        """
+        Latest published state; breadth is copied, everything else is
+        replaced (never mutated) per tick. With wait > 0, block up to that
+        many seconds for a day newer than the last one rendered.
+        """
+        self._last_read = time.monotonic()
+        with self._lock:
+            if wait > 0 and self.running:
+                self._applied.wait_for(lambda: self._view['seq'] > self._rendered_seq, timeout=wait)
+            return dict(self._view, breadth=pd.DataFrame(list(self._view['breadth'])))
+
+    def record_render(self, view, started, finished=None):
+        """A fragment run that started at `started` (perf_counter) has drawn view; keeps one sample per tick"""
+        finished = finished or time.perf_counter()
+        if view['emitted'] is None or view['seq'] <= self._rendered_seq:
+            return
+        self.skipped += view['seq'] - self._rendered_seq - 1
+        self._rendered_seq = view['seq']
+        self.latency.append({
+            'seq': view['seq'],
+            'queue_ms': (view['dequeued'] - view['emitted']) * 1000,
+            'apply_ms': (view['applied'] - view['dequeued']) * 1000,
+            'wait_ms': max(started - view['applied'], 0.0) * 1000,
+            'render_ms': (finished - max(started, view['applied'])) * 1000,
+            'total_ms': (finished - view['emitted']) * 1000,
+        })
+
+    def latency_summary(self):
+        """p50 / p95 / max of every latency part over the kept samples (empty frame before the first render)"""
+        if not self.latency:
+            return pd.DataFrame(columns=['p50', 'p95', 'max'])
+        samples = pd.DataFrame(list(self.latency))[LATENCY_PARTS]
+        return pd.DataFrame({'p50': samples.median(), 'p95': samples.quantile(0.95), 'max': samples.max()}).round(1)
+
+
+def top_movers(view, n=5):
+    """Biggest gainers and losers of the latest replayed day with their indicator readings"""
+    from stock_analysis.indicators import RSI_PERIOD
+
+    if view['bars'] is None:
+        return pd.DataFrame()
+    day = view['bars'].join(view['indicators'][[f"RSI_{RSI_PERIOD}", 'MACD_Hist']])
+    day = day.dropna(subset=['Change_%']).sort_values('Change_%', ascending=False)
+    movers = pd.concat([day.head(n), day.tail(n)]) if len(day) > 2 * n else day
+    return movers.round(2).reset_index()
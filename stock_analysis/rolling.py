@@ -0,0 +1,144 @@
+"""
+Rolling-Window Engine
+Rolling volatility, mean return, correlation and beta for every symbol at once
+
+Works on the Date x Symbol return matrix of a PricePanel. Window sums come
+from one cumulative sum per statistic (S[t] - S[t - window]) instead of a
+rolling() call per symbol, so every symbol and window costs O(days). Columns
+are de-meaned before summing to keep the sum-of-squares variance stable on
+long histories. Like pandas rolling(window), a value needs a full window of
+non-missing returns (both symbols' for correlation and beta).
+"""
+
+import numpy as np
+import pandas as pd
+
+ROLLING_WINDOWS = (20, 60, 120)
+REGIME_LABELS = ['Low', 'Normal', 'High']
+
+
+def _window_sum(values, window):
+    """Trailing window sums along axis 0 via cumsum; NaN for the first window - 1 rows"""
+    csum = np.cumsum(values, axis=0, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        out[window - 1] = csum[window - 1]
+        out[window:] = csum[window:] - csum[:-window]
+    return out
+
+
+def _centered(values):
+    """(values minus column mean with missing as 0, 0/1 presence mask, column means)"""
+    present = ~np.isnan(values)
+    # All-missing columns get a mean of 0 instead of a nanmean warning
+    column_mean = np.nanmean(np.where(present.any(axis=0), values, 0.0), axis=0)
+    return np.where(present, values - column_mean, 0.0), present.astype(np.float64), column_mean
+
+
+class RollingEngine:
+    """
+    Rolling statistics over a PricePanel's Daily_Return matrix.
+
+    Results are memoized per (statistic, window, reference), so an engine
+    cached per snapshot computes each one once.
+    """
+
+    def __init__(self, panel):
+        self.panel = panel
+        self.dates = panel.dates
+        self.symbols = panel.symbols
+        self.returns = panel.values[:, :, panel.field_index['Daily_Return']]
+        self._centered, self._present, self._column_mean = _centered(self.returns)
+        self._cache = {}
+
+    def _frame(self, values):
+        return pd.DataFrame(values, index=pd.Index(self.dates, name='Date'), columns=list(self.symbols))
+
+    def _memo(self, key, compute):
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def _moments(self, window):
+        """(full-window mask, mean of centered returns, sample variance) per date and symbol"""
+        def compute():
+            count = _window_sum(self._present, window)
+            total = _window_sum(self._centered, window)
+            squares = _window_sum(self._centered ** 2, window)
+            full = count == window
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean = total / count
+                variance = (squares - total * mean) / (count - 1)
+            return full, mean, np.where(full, np.maximum(variance, 0.0), np.nan)
+        return self._memo(('moments', window), compute)
+
+    def volatility(self, window):
+        """Rolling standard deviation of daily returns (same units as metrics_df Volatility)"""
+        return self._memo(('volatility', window), lambda: self._frame(np.sqrt(self._moments(window)[2])))
+
+    def mean_return(self, window):
+        """Rolling mean daily return (%)"""
+        def compute():
+            full, mean, _ = self._moments(window)
+            return self._frame(np.where(full, mean + self._column_mean, np.nan))
+        return self._memo(('mean_return', window), compute)
+
+    def _pair_moments(self, reference, window):
+        """Windowed co-moments of every symbol with the reference over jointly traded days"""
+        def compute():
+            j = self.panel.symbol_index[reference]
+            both = self._present * self._present[:, [j]]
+            x = self._centered * both
+            y = self._centered[:, [j]] * both
+            count = _window_sum(both, window)
+            sx, sy = _window_sum(x, window), _window_sum(y, window)
+            sxx, syy, sxy = _window_sum(x * x, window), _window_sum(y * y, window), _window_sum(x * y, window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = sxy - sx * sy / count
+                var_x = sxx - sx * sx / count
+                var_y = syy - sy * sy / count
+            return count == window, cov, var_x, var_y
+        return self._memo(('pair', reference, window), compute)
+
+    def correlation(self, reference, window):
+        """Rolling correlation of every symbol's returns with the reference symbol's"""
+        def compute():
+            full, cov, var_x, var_y = self._pair_moments(reference, window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                corr = np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0)
+            return self._frame(np.where(full, corr, np.nan))
+        return self._memo(('correlation', reference, window), compute)
+
+    def beta(self, reference, window):
+        """Rolling beta of every symbol to the reference symbol: cov(x, ref) / var(ref)"""
+        def compute():
+            full, cov, _, var_y = self._pair_moments(reference, window)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                beta = cov / var_y
+            return self._frame(np.where(full & (var_y > 0), beta, np.nan))
+        return self._memo(('beta', reference, window), compute)
+
+    def volatility_regimes(self, window):
+        """
+        Market volatility (cross-sectional median of rolling volatility) per
+        date, labelled Low / Normal / High by the terciles of its own history.
+        """
+        def compute():
+            market = self.volatility(window).median(axis=1, skipna=True).dropna()
+            if market.empty:
+                return pd.DataFrame(columns=['Market_Volatility', 'Regime'], index=market.index)
+            low, high = market.quantile([1 / 3, 2 / 3])
+            regime = np.select([market <= low, market <= high], REGIME_LABELS[:2], REGIME_LABELS[2])
+            return pd.DataFrame({'Market_Volatility': market, 'Regime': regime})
+        return self._memo(('regimes', window), compute)
+
+
+def regime_spans(regimes):
+    """Collapse a date-indexed Regime column into (start, end, label) runs"""
+    if regimes.empty:
+        return []
+    labels = regimes['Regime'].to_numpy()
+    starts = np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+    ends = np.r_[starts[1:], len(labels)] - 1
+    dates = regimes.index
+    return [(dates[s], dates[e], labels[s]) for s, e in zip(starts, ends)]
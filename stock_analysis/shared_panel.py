@@ -0,0 +1,275 @@
+"""
+Shared-Memory Panel
+One process publishes the price panel and correlation matrix; every worker attaches read-only
+
+Usage (publisher sidecar, next to N Streamlit workers started with
+STOCK_DASHBOARD_SHARED_PANEL=1):
+    python -m stock_analysis.shared_panel --interval 5
+
+The publisher copies the panel arrays (values, present, growth, dates) and
+the correlation matrix of the current snapshot into multiprocessing
+shared_memory segments named after the snapshot version, then writes a
+small JSON metadata segment last, so a worker that can open the metadata
+knows every array is complete. Workers map the segments as read-only NumPy
+views: N workers hold one copy of the data instead of N.
+
+Lifecycle: the publisher polls the snapshot manifest. On a new version it
+publishes the new segments before unlinking the old ones; workers still
+mapping the old version keep their pages until they call detach() after
+attaching the new one, which closes every older segment no longer
+referenced in that worker (and retries the rest on the next call). On SIGTERM /
+SIGINT it unlinks everything it published. If it dies without cleaning up,
+Python's resource tracker unlinks its segments, and a restarted publisher
+also removes any stale segments left behind (Linux /dev/shm scan).
+"""
+
+import argparse
+import json
+import os
+import signal
+import struct
+import sys
+import time
+import weakref
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from stock_analysis.panel import PricePanel, build_panel
+from stock_analysis.snapshot import SNAPSHOT_DIR, SnapshotError, load_table, read_manifest
+
+SEGMENT_PREFIX = 'snp'
+ARRAYS = ['dates', 'values', 'present', 'growth', 'correlation']
+ATTACH_TIMEOUT_S = 10.0
+_LENGTH = struct.Struct('<Q')
+
+# Segments attached by this process, by version, each with a weak reference to
+# the array viewing it. Kept here rather than on the returned objects: pandas
+# deep-copies DataFrame.attrs into derived frames, and copying a SharedMemory
+# re-attaches it with tracking, so the copy's resource tracker would unlink the
+# publisher's segments when this process exits.
+_attached = {}
+
+
+class SharedPanelError(Exception):
+    """No complete shared-memory panel is published for the requested version"""
+
+
+def segment_name(version, part):
+    return f"{SEGMENT_PREFIX}_{version}_{part}"
+
+
+def _open_segment(name):
+    """Attach to an existing segment without letting this process's resource tracker unlink it at exit"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13: no track argument
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+def _unlink_segment(name):
+    """Remove a segment by name (attach + unlink keeps the resource tracker's bookkeeping balanced)"""
+    segment = shared_memory.SharedMemory(name=name)
+    segment.close()
+    segment.unlink()
+
+# ============================================================================
+# PUBLISHER
+# ============================================================================
+
+class PanelPublisher:
+    """Owns the shared-memory segments of one snapshot version"""
+
+    def __init__(self, version, panel, correlation_matrix):
+        self.version = version
+        self.segments = []
+        arrays = {
+            'dates': panel.dates.asi8,
+            'values': panel.values,
+            'present': panel.present,
+            'growth': panel.growth,
+            'correlation': correlation_matrix.to_numpy(dtype=np.float64),
+        }
+        meta = {
+            'version': version,
+            'symbols': list(panel.symbols),
+            'fields': list(panel.fields),
+            'correlation_symbols': [str(symbol) for symbol in correlation_matrix.columns],
+            'arrays': {},
+        }
+        try:
+            for part in ARRAYS:
+                array = arrays[part]
+                order = 'F' if array.flags['F_CONTIGUOUS'] and not array.flags['C_CONTIGUOUS'] else 'C'
+                segment = self._create(segment_name(version, part), max(array.nbytes, 1))
+                view = np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf, order=order)
+                view[...] = array
+                meta['arrays'][part] = {'shape': list(array.shape), 'dtype': array.dtype.str, 'order': order}
+            # Metadata last: its presence means every array above is complete
+            payload = json.dumps(meta).encode('utf-8')
+            segment = self._create(segment_name(version, 'meta'), _LENGTH.size + len(payload))
+            segment.buf[:_LENGTH.size] = _LENGTH.pack(len(payload))
+            segment.buf[_LENGTH.size:_LENGTH.size + len(payload)] = payload
+        except BaseException:
+            self.close()
+            raise
+
+    def _create(self, name, size):
+        try:
+            segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a publisher that died mid-publish: replace it
+            _unlink_segment(name)
+            segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.segments.append(segment)
+        return segment
+
+    def close(self):
+        """Unlink every segment (attached workers keep their existing mappings)"""
+        # Metadata first, so no new worker attaches to a half-removed version
+        for segment in reversed(self.segments):
+            segment.close()
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+        self.segments = []
+
+
+def publish_snapshot(root=SNAPSHOT_DIR, manifest=None):
+    """Build the current snapshot's panel and publish it; returns the PanelPublisher"""
+    manifest = manifest or read_manifest(root)
+    panel = build_panel(load_table('master_data', root, manifest))
+    correlation_matrix = load_table('correlation_matrix', root, manifest)
+    return PanelPublisher(manifest['build_hash'], panel, correlation_matrix)
+
+
+def remove_stale_segments(keep_version=None, shm_dir='/dev/shm'):
+    """Unlink published segments of every version but keep_version (Linux only); returns their names"""
+    if not os.path.isdir(shm_dir):
+        return []
+    removed = []
+    for name in os.listdir(shm_dir):
+        if not name.startswith(f"{SEGMENT_PREFIX}_") or name.startswith(f"{SEGMENT_PREFIX}_{keep_version}_"):
+            continue
+        try:
+            _unlink_segment(name)
+            removed.append(name)
+        except FileNotFoundError:
+            pass
+    return removed
+
+# ============================================================================
+# WORKERS
+# ============================================================================
+
+def attach_panel(version, timeout=ATTACH_TIMEOUT_S):
+    """
+    (PricePanel, correlation DataFrame) backed by read-only views of the
+    published segments, waiting up to timeout seconds for the publisher.
+    The segments stay mapped until detach() is called with a newer version.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            meta_segment = _open_segment(segment_name(version, 'meta'))
+            break
+        except FileNotFoundError:
+            if time.monotonic() >= deadline:
+                raise SharedPanelError(f"No shared panel published for snapshot {version}")
+            time.sleep(0.2)
+
+    (length,) = _LENGTH.unpack(bytes(meta_segment.buf[:_LENGTH.size]))
+    meta = json.loads(bytes(meta_segment.buf[_LENGTH.size:_LENGTH.size + length]).decode('utf-8'))
+    meta_segment.close()
+
+    segments, arrays = [], {}
+    try:
+        for part in ARRAYS:
+            spec = meta['arrays'][part]
+            segment = _open_segment(segment_name(version, part))
+            array = np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']),
+                               buffer=segment.buf, order=spec['order'])
+            array.flags.writeable = False
+            # Views of array keep it as their base, so the weak reference dies with the last view
+            segments.append((segment, weakref.ref(array)))
+            arrays[part] = array
+    except FileNotFoundError:
+        # The publisher moved to a newer version while we were attaching
+        raise SharedPanelError(f"Shared panel for snapshot {version} was unpublished during attach")
+
+    _attached.setdefault(version, []).extend(segments)
+    panel = PricePanel(pd.DatetimeIndex(arrays['dates'].view('datetime64[ns]')), meta['symbols'],
+                       meta['fields'], arrays['values'], present=arrays['present'], growth=arrays['growth'])
+    symbols = pd.Index(meta['correlation_symbols'], name='Symbol')
+    correlation_matrix = pd.DataFrame(arrays['correlation'], index=symbols, columns=symbols.copy(), copy=False)
+    return panel, correlation_matrix
+
+def detach(current_version):
+    """
+    Close this process's mappings of every version but current_version;
+    returns the versions fully released. A segment whose array (or any view
+    of it) is still referenced here stays mapped until a later call.
+    """
+    released = []
+    for version in [version for version in _attached if version != current_version]:
+        still_mapped = []
+        for segment, array_ref in _attached[version]:
+            # NumPy holds no buffer export on the mapping: closing it under a live view would crash
+            if array_ref() is None:
+                segment.close()
+            else:
+                still_mapped.append((segment, array_ref))
+        if still_mapped:
+            _attached[version] = still_mapped
+        else:
+            del _attached[version]
+            released.append(version)
+    return released
+
+# ============================================================================
+# PUBLISHER PROCESS
+# ============================================================================
+
+def run_publisher(root=SNAPSHOT_DIR, interval=5.0):
+    """Publish the current snapshot and republish whenever the manifest moves to a new version"""
+    current = None
+    stop = []
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.append(True))
+    try:
+        while not stop:
+            try:
+                manifest = read_manifest(root)
+            except SnapshotError as e:
+                print(f"Warning: {e}; retrying in {interval:.0f}s")
+                manifest = None
+            if manifest is not None and (current is None or manifest['build_hash'] != current.version):
+                published = publish_snapshot(root, manifest)
+                if current is not None:
+                    current.close()
+                current = published
+                for name in remove_stale_segments(keep_version=current.version):
+                    print(f"Warning: removed stale segment {name}")
+                print(f"✓ Published snapshot {current.version} "
+                      f"({sum(s.size for s in current.segments) / 2**20:.1f} MB shared)")
+            time.sleep(interval)
+    finally:
+        if current is not None:
+            current.close()
+            print(f"✓ Unpublished snapshot {current.version}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Publish the snapshot's price panel into shared memory")
+    parser.add_argument('--snapshot', default=SNAPSHOT_DIR)
+    parser.add_argument('--interval', type=float, default=5.0, help="seconds between manifest checks")
+    args = parser.parse_args(argv)
+    run_publisher(args.snapshot, args.interval)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,180 @@
+"""
+Dashboard Snapshot Bundle
+Versioned Arrow IPC tables + JSON manifest, memory-mapped by app.py
+
+Layout:
+    processed_data/snapshot/manifest.json          <- current version pointer
+    processed_data/snapshot/<build_hash>/*.arrow   <- uncompressed Arrow IPC files
+
+Tables are written uncompressed so readers can memory-map them: loading is
+near-instant and every worker shares the same OS page-cache pages instead
+of holding a private unpickled copy. A new build lands in its own
+directory and the manifest is swapped atomically, so running readers keep
+a consistent view until they reload. The previous version is always kept
+and older ones only go once they have been superseded for
+RETIRED_GRACE_S, so a reader still on an older manifest can finish its
+lazy loads.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import pyarrow as pa
+
+from stock_analysis.pyramid import PYRAMID_TABLES
+
+SCHEMA_VERSION = 1
+SNAPSHOT_DIR = './processed_data/snapshot'
+MANIFEST_FILE = 'manifest.json'
+# Seconds a superseded version directory outlives the manifest that pointed to it
+RETIRED_GRACE_S = 600
+
+# Keys match the dict app.py used to unpickle from processed_data.pkl
+TABLES = ['master_data', 'metrics', 'correlation_matrix', 'monthly_performance']
+# Written when present in the export dict; readers fall back to building them
+OPTIONAL_TABLES = PYRAMID_TABLES + ['metrics_state', 'alerts']
+
+
+class SnapshotError(Exception):
+    """Snapshot missing, unreadable or built with an incompatible schema"""
+
+
+def _frame_to_table(name, df):
+    if name == 'correlation_matrix':
+        df = df.rename_axis('Symbol').reset_index()
+    elif name == 'master_data' and 'Month_Year' in df.columns:
+        # Period columns do not survive Arrow; rebuilt from Date on load
+        df = df.drop(columns='Month_Year')
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _table_to_frame(name, table):
+    df = table.to_pandas(split_blocks=True)
+    if name == 'correlation_matrix':
+        df = df.set_index('Symbol')
+        df.columns.name = 'Symbol'
+    elif name == 'master_data':
+        df['Month_Year'] = df['Date'].dt.to_period('M')
+    return df
+
+
+def _write_ipc(table, path):
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def write_snapshot(data, root=SNAPSHOT_DIR):
+    """
+    Write a snapshot bundle from the export dict (master_data, metrics,
+    correlation_matrix, monthly_performance, market_summary and optionally
+    the OHLCV pyramid tables, metrics_state and alerts).
+
+    Returns the build hash, which doubles as the snapshot version.
+    """
+    root = Path(root)
+    staging = root / f".staging-{uuid.uuid4().hex}"
+    staging.mkdir(parents=True)
+
+    digest = hashlib.sha256()
+    tables = {}
+    for name in TABLES + [name for name in OPTIONAL_TABLES if name in data]:
+        table = _frame_to_table(name, data[name])
+        file_name = f"{name}.arrow"
+        _write_ipc(table, staging / file_name)
+        with open(staging / file_name, 'rb') as f:
+            digest.update(f.read())
+        tables[name] = {'file': file_name, 'rows': table.num_rows}
+
+    market_summary = {k: (v.item() if hasattr(v, 'item') else v) for k, v in data['market_summary'].items()}
+    digest.update(json.dumps(market_summary, sort_keys=True).encode())
+    digest.update(str(SCHEMA_VERSION).encode())
+    build_hash = digest.hexdigest()[:16]
+
+    previous = snapshot_version(root)
+    version_dir = root / build_hash
+    if version_dir.exists():
+        shutil.rmtree(staging)
+    else:
+        os.replace(staging, version_dir)
+
+    manifest = {
+        'schema_version': SCHEMA_VERSION,
+        'build_hash': build_hash,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'path': build_hash,
+        'tables': tables,
+        'market_summary': market_summary,
+    }
+    tmp_manifest = root / f"{MANIFEST_FILE}.tmp"
+    with open(tmp_manifest, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_manifest, root / MANIFEST_FILE)
+
+    if previous not in (None, build_hash) and (root / previous).is_dir():
+        # The directory's mtime now records when it stopped being current
+        os.utime(root / previous)
+    _prune_versions(root, keep={build_hash, previous})
+    return build_hash
+
+
+def _prune_versions(root, keep, grace_s=RETIRED_GRACE_S):
+    """Drop version directories not in keep that were superseded more than grace_s seconds ago"""
+    cutoff = time.time() - grace_s
+    for version_dir in root.iterdir():
+        if not version_dir.is_dir() or version_dir.name.startswith('.') or version_dir.name in keep:
+            continue
+        if version_dir.stat().st_mtime < cutoff:
+            shutil.rmtree(version_dir, ignore_errors=True)
+
+
+def read_manifest(root=SNAPSHOT_DIR):
+    """Current snapshot manifest; raises SnapshotError if absent or incompatible"""
+    path = Path(root) / MANIFEST_FILE
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        raise SnapshotError(f"No snapshot manifest at {path}")
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        raise SnapshotError(f"Snapshot schema {manifest.get('schema_version')} != expected {SCHEMA_VERSION}")
+    return manifest
+
+
+def snapshot_version(root=SNAPSHOT_DIR):
+    """Build hash of the current snapshot, or None when there is none"""
+    try:
+        return read_manifest(root)['build_hash']
+    except SnapshotError:
+        return None
+
+
+def read_table(name, root=SNAPSHOT_DIR, manifest=None):
+    """Memory-map one snapshot table as an Arrow table (no copy)"""
+    manifest = manifest or read_manifest(root)
+    path = Path(root) / manifest['path'] / manifest['tables'][name]['file']
+    source = pa.memory_map(str(path), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_table(name, root=SNAPSHOT_DIR, manifest=None):
+    """One snapshot table as the DataFrame processed_data.pkl held under that key"""
+    return _table_to_frame(name, read_table(name, root, manifest))
+
+
+def load_snapshot(root=SNAPSHOT_DIR):
+    """
+    Load the current snapshot in the same dict shape as processed_data.pkl,
+    plus 'snapshot_version' (the build hash).
+    """
+    manifest = read_manifest(root)
+    data = {name: load_table(name, root, manifest) for name in manifest['tables']}
+    data['market_summary'] = manifest['market_summary']
+    data['snapshot_version'] = manifest['build_hash']
+    return data
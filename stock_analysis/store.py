@@ -0,0 +1,147 @@
+"""
+Partitioned History Store
+Canonical columnar history of master_df rows: Parquet dataset partitioned by Month
+
+Layout:
+    processed_data/history_store/Month=<YYYY-MM>/part-0.parquet
+
+Month lives in the directory name. Inside each file rows are sorted by
+Symbol and Date, Symbol/Sector are dictionary-encoded, and row groups are
+kept small, so read_store skips non-matching months entirely and prunes
+row groups on Symbol/Date statistics.
+
+This is the only stored history: stock_analysis.incremental reads it back
+instead of re-parsing YAML. Rows it writes carry their Source_File (the
+data-relative YAML path) so a changed file's rows can be replaced, and rows
+of symbols without a sector mapping are kept with a null Sector so a later
+mapping picks them up. Stores written from master_df alone (the notebook)
+have a null Source_File.
+
+A directory per Symbol as well would leave ~20 rows per file (one month of
+one stock); per-file Parquet overhead then makes the store larger than the
+CSV it replaces and a full read ~40x slower.
+"""
+
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+STORE_DIR = './processed_data/history_store'
+
+PARTITIONING = ds.partitioning(pa.schema([('Month', pa.string())]), flavor='hive')
+ROWS_PER_GROUP = 2048
+
+STORE_SCHEMA = pa.schema([
+    ('Date', pa.timestamp('ns')),
+    ('Symbol', pa.dictionary(pa.int32(), pa.string())),
+    ('Open', pa.float64()),
+    ('High', pa.float64()),
+    ('Low', pa.float64()),
+    ('Close', pa.float64()),
+    ('Volume', pa.int64()),
+    ('Daily_Return', pa.float64()),
+    ('Price_Change', pa.float64()),
+    ('Sector', pa.dictionary(pa.int32(), pa.string())),
+    ('Source_File', pa.dictionary(pa.int32(), pa.string())),
+    ('Month', pa.string()),
+])
+
+_WRITE_OPTIONS = ds.ParquetFileFormat().make_write_options(compression='zstd', use_dictionary=True)
+
+
+def _to_arrow(master_df):
+    """master_df -> Arrow table in STORE_SCHEMA (Month derived from Date, Source_File null if absent)"""
+    frame = master_df.assign(Month=master_df['Date'].dt.strftime('%Y-%m'))
+    if 'Source_File' not in frame.columns:
+        frame['Source_File'] = None
+    frame = frame.sort_values(['Symbol', 'Date'], kind='stable')
+    columns = [name for name in STORE_SCHEMA.names]
+    return pa.Table.from_pandas(frame[columns], schema=STORE_SCHEMA, preserve_index=False)
+
+
+def write_store(master_df, root=STORE_DIR, replace_all=True):
+    """
+    Write master_df into the partitioned store in a single pass.
+
+    With replace_all=False only the months present in master_df are
+    rewritten; every other partition is left untouched.
+    """
+    if replace_all:
+        shutil.rmtree(root, ignore_errors=True)
+
+    ds.write_dataset(
+        _to_arrow(master_df),
+        root,
+        format='parquet',
+        partitioning=PARTITIONING,
+        basename_template='part-{i}.parquet',
+        file_options=_WRITE_OPTIONS,
+        existing_data_behavior='delete_matching',
+        max_rows_per_group=ROWS_PER_GROUP,
+        min_rows_per_group=0,
+    )
+
+
+def open_store(root=STORE_DIR):
+    return ds.dataset(root, format='parquet', schema=STORE_SCHEMA, partitioning=PARTITIONING)
+
+
+def _month(value):
+    return pd.Timestamp(value).strftime('%Y-%m')
+
+
+def read_store(root=STORE_DIR, symbols=None, start=None, end=None, columns=None, exclude_sources=None):
+    """
+    Load rows for the requested symbols and inclusive [start, end] date range,
+    skipping rows whose Source_File is in exclude_sources.
+
+    The month range prunes whole partitions; Symbol and Date filters are
+    pushed down to Parquet row-group statistics. Returns a master_df-shaped frame
+    sorted by Symbol and Date (with Month_Year when Date is loaded).
+    """
+    if not Path(root).exists():
+        return pd.DataFrame(columns=columns or STORE_SCHEMA.names)
+
+    conditions = []
+    if symbols is not None:
+        conditions.append(pc.field('Symbol').isin(list(symbols)))
+    if start is not None:
+        conditions.append(pc.field('Month') >= _month(start))
+        conditions.append(pc.field('Date') >= pa.scalar(pd.Timestamp(start), pa.timestamp('ns')))
+    if end is not None:
+        conditions.append(pc.field('Month') <= _month(end))
+        conditions.append(pc.field('Date') <= pa.scalar(pd.Timestamp(end), pa.timestamp('ns')))
+    if exclude_sources:
+        conditions.append(pc.field('Source_File').is_null() | ~pc.field('Source_File').isin(list(exclude_sources)))
+
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+
+    table = open_store(root).to_table(columns=columns, filter=expression)
+    df = table.to_pandas()
+    for col in ('Symbol', 'Sector', 'Source_File'):
+        if col in df.columns:
+            df[col] = df[col].astype(object)
+
+    sort_keys = [key for key in ('Symbol', 'Date') if key in df.columns]
+    if sort_keys:
+        df = df.sort_values(sort_keys, kind='stable').reset_index(drop=True)
+    if 'Date' in df.columns:
+        df['Month_Year'] = df['Date'].dt.to_period('M')
+    return df
+
+
+def export_symbol_csvs(master_df, output_dir):
+    """Legacy <SYMBOL>_historical_data.csv files, written from one groupby pass"""
+    for symbol, symbol_data in master_df.groupby('Symbol', sort=False):
+        symbol_data.to_csv(f"{output_dir}/{symbol}_historical_data.csv", index=False)
+
+
+def store_size_bytes(root=STORE_DIR):
+    """Disk footprint of the store"""
+    return sum(p.stat().st_size for p in Path(root).rglob('*.parquet'))
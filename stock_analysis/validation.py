@@ -0,0 +1,238 @@
+"""
+Data-Quality Validation
+Vectorized row checks over a whole ingest batch, with a quarantine for failing rows
+
+validate_batch runs every check as one boolean mask over the batch's columns
+(no per-row or per-symbol Python loops) and ORs them into a reason bitmask:
+
+    BAD_DATE              Date missing or unparsable
+    MISSING_OHLC          Open / High / Low / Close missing or non-numeric
+    NON_POSITIVE_OHLC     a price <= 0
+    HIGH_BELOW_LOW        High < Low
+    OPEN_OUTSIDE_RANGE    Open outside [Low, High]
+    CLOSE_OUTSIDE_RANGE   Close outside [Low, High]
+    ZERO_VOLUME           Volume missing or <= 0
+    DUPLICATE_DATE        a second row for the same Symbol and Date (in the
+                          batch, or already in the known history)
+
+Rows with any reason are quarantined with a 'Reason' column ('|'-joined
+codes); the rest come back cleaned exactly as clean_batch would return
+them. Two checks are reported per symbol rather than per row: symbols
+without a sector mapping (their rows are dropped later by attach_sectors)
+and missing trading days (dates of the batch calendar, on or after the
+symbol's first date, with no row for it). The report holds row counts per
+reason, those symbol lists and the time taken by each check.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+QUARANTINE_DIR = 'quarantine'
+REPORT_FILE = 'quality_report.json'
+# Symbols listed per symbol-level check in the printed report
+REPORT_TOP = 10
+
+REASONS = ['BAD_DATE', 'MISSING_OHLC', 'NON_POSITIVE_OHLC', 'HIGH_BELOW_LOW', 'OPEN_OUTSIDE_RANGE',
+           'CLOSE_OUTSIDE_RANGE', 'ZERO_VOLUME', 'DUPLICATE_DATE']
+REASON_BITS = {reason: np.int32(1 << i) for i, reason in enumerate(REASONS)}
+
+OHLC_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def reason_labels(codes):
+    """Reason bitmasks -> '|'-joined reason codes (labels built once per distinct mask)"""
+    unique, inverse = np.unique(codes, return_inverse=True)
+    labels = np.array(['|'.join(reason for reason in REASONS if code & REASON_BITS[reason])
+                       for code in unique], dtype=object)
+    return labels[inverse]
+
+
+def _day_numbers(dates):
+    """Datetimes -> int64 nanoseconds (NaT = min int64), whatever resolution they are stored in"""
+    return np.asarray(dates, dtype='datetime64[ns]').view(np.int64)
+
+
+def _missing_days(symbols, row_symbols, row_days, known_symbols, known_days):
+    """
+    {symbol: trading days of the batch calendar missing for it}, from a
+    symbol x date presence grid. row_* describe the clean rows, known_* the
+    history (symbol codes into symbols, int64 days).
+    """
+    if not len(row_days):
+        return {}
+    calendar = np.sort(pd.unique(row_days))
+    first = np.full(len(symbols), np.iinfo(np.int64).max)
+    np.minimum.at(first, row_symbols, row_days)
+    np.minimum.at(first, known_symbols, known_days)
+
+    present = np.zeros((len(symbols), len(calendar)), dtype=bool)
+    present[row_symbols, np.searchsorted(calendar, row_days)] = True
+    # Days of the calendar the history already holds are not missing
+    known_codes = np.minimum(np.searchsorted(calendar, known_days), len(calendar) - 1)
+    in_calendar = calendar[known_codes] == known_days
+    present[known_symbols[in_calendar], known_codes[in_calendar]] = True
+
+    expected = np.arange(len(calendar)) >= np.searchsorted(calendar, first)[:, None]
+    missing = (expected & ~present).sum(axis=1)
+    return {symbols[i]: int(missing[i]) for i in np.flatnonzero(missing)}
+
+
+def validate_batch(raw_df, symbol_mapping=None, known=None):
+    """
+    Validate a raw columnar batch (all symbols at once).
+
+    symbol_mapping, when given, is checked for unmapped symbols; known is an
+    optional Symbol / Date frame of rows already ingested (duplicate and
+    missing-day checks then span the history). Returns (clean_df,
+    quarantine_df, report).
+    """
+    start = time.perf_counter()
+    timings = {}
+    stamp = start
+
+    def lap(name):
+        nonlocal stamp
+        now = time.perf_counter()
+        timings[name] = (now - stamp) * 1000.0
+        stamp = now
+
+    df = raw_df.copy()
+    # A batch holds few distinct dates: parse each once (missing dates factorize to -1 -> NaT)
+    date_codes, date_strings = pd.factorize(df['Date'])
+    dates = pd.Series(pd.DatetimeIndex(pd.to_datetime(date_strings, errors='coerce'))
+                      .take(date_codes, allow_fill=True, fill_value=pd.NaT), index=df.index, name='Date')
+    days = _day_numbers(dates)
+    prices = {col: pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=np.float64) for col in OHLC_COLUMNS}
+    volume = pd.to_numeric(df['Volume'], errors='coerce').to_numpy(dtype=np.float64)
+
+    # Symbol codes into one sorted universe (codes order like the names) shared by every check below
+    if known is None:
+        known = pd.DataFrame({'Symbol': pd.Series(dtype=object), 'Date': pd.Series(dtype='datetime64[ns]')})
+    row_codes, row_names = pd.factorize(df['Symbol'], sort=True)
+    known_codes, known_names = pd.factorize(known['Symbol'], sort=True)
+    universe = pd.Index(row_names).union(pd.Index(known_names))
+    row_symbols = universe.get_indexer(row_names)[row_codes]
+    known_symbols = universe.get_indexer(known_names)[known_codes]
+    symbols = np.asarray(universe, dtype=object)
+    known_days = _day_numbers(known['Date'])
+    lap('parse')
+
+    open_, high, low, close = (prices[col] for col in OHLC_COLUMNS)
+    with np.errstate(invalid='ignore'):
+        checks = {
+            'BAD_DATE': dates.isna().to_numpy(),
+            'MISSING_OHLC': np.isnan(open_) | np.isnan(high) | np.isnan(low) | np.isnan(close),
+            'NON_POSITIVE_OHLC': (open_ <= 0) | (high <= 0) | (low <= 0) | (close <= 0),
+            'HIGH_BELOW_LOW': high < low,
+            'OPEN_OUTSIDE_RANGE': (open_ < low) | (open_ > high),
+            'CLOSE_OUTSIDE_RANGE': (close < low) | (close > high),
+            'ZERO_VOLUME': ~(volume > 0),
+        }
+    codes = np.zeros(len(df), dtype=np.int32)
+    for reason, mask in checks.items():
+        codes |= np.where(mask, REASON_BITS[reason], np.int32(0))
+    lap('row_checks')
+
+    # Among rows that pass everything else, keep the first of each Symbol / Date. One stable sort
+    # of history + candidates puts repeats right after the row they repeat (history first, then
+    # batch rows in file order) and gives the clean rows clean_batch's Symbol / Date order
+    candidates = np.flatnonzero(codes == 0)
+    pair_symbols = np.concatenate([known_symbols, row_symbols[candidates]])
+    pair_days = np.concatenate([known_days, days[candidates]])
+    order = np.lexsort((pair_days, pair_symbols))
+    sorted_symbols, sorted_days = pair_symbols[order], pair_days[order]
+    repeat = np.r_[False, (sorted_symbols[1:] == sorted_symbols[:-1]) & (sorted_days[1:] == sorted_days[:-1])]
+    batch_position = order - len(known_days)
+    in_batch = batch_position >= 0
+    codes[candidates[batch_position[repeat & in_batch]]] |= REASON_BITS['DUPLICATE_DATE']
+    clean_rows = candidates[batch_position[~repeat & in_batch]]
+    lap('duplicates')
+
+    bad = codes != 0
+    quarantine_df = df[bad].reset_index(drop=True)
+    quarantine_df['Reason'] = reason_labels(codes[bad])
+
+    df['Date'] = dates
+    for col in OHLC_COLUMNS:
+        df[col] = prices[col]
+    clean_df = df.take(clean_rows).reset_index(drop=True)
+    lap('split')
+
+    rows_per_symbol = np.bincount(row_symbols[clean_rows], minlength=len(symbols))
+    unmapped = {}
+    if symbol_mapping is not None:
+        unmapped = {symbols[i]: int(rows_per_symbol[i]) for i in np.flatnonzero(rows_per_symbol)
+                    if symbols[i] not in symbol_mapping}
+        lap('sectors')
+    missing_days = _missing_days(symbols, row_symbols[clean_rows], days[clean_rows], known_symbols, known_days)
+    lap('missing_days')
+
+    seconds = time.perf_counter() - start
+    report = {
+        'rows_in': int(len(raw_df)),
+        'rows_clean': int(len(clean_df)),
+        'rows_quarantined': int(bad.sum()),
+        'reasons': {reason: int(np.count_nonzero(codes & REASON_BITS[reason])) for reason in REASONS},
+        'symbols': int(np.count_nonzero(rows_per_symbol)),
+        'trading_days': int(len(pd.unique(days[clean_rows]))),
+        'unmapped_symbols': unmapped,
+        'missing_days': missing_days,
+        'timings_ms': {name: round(ms, 3) for name, ms in timings.items()},
+        'seconds': seconds,
+        'rows_per_s': len(raw_df) / seconds if seconds > 0 else 0.0,
+    }
+    return clean_df, quarantine_df, report
+
+
+def format_report(report):
+    """Human-readable summary of a validate_batch report"""
+    lines = [f"Validated {report['rows_in']:,} rows in {report['seconds']:.3f}s "
+             f"({report['rows_per_s']:,.0f} rows/s): {report['rows_clean']:,} clean, "
+             f"{report['rows_quarantined']:,} quarantined"]
+    for reason, count in report['reasons'].items():
+        if count:
+            lines.append(f"  {reason:<20} {count:>10,}")
+    if report['unmapped_symbols']:
+        symbols = list(report['unmapped_symbols'])
+        lines.append(f"  No sector mapping for {len(symbols)} symbols: {', '.join(symbols[:REPORT_TOP])}"
+                     + (' ...' if len(symbols) > REPORT_TOP else ''))
+    if report['missing_days']:
+        worst = sorted(report['missing_days'].items(), key=lambda item: -item[1])[:REPORT_TOP]
+        lines.append(f"  Missing trading days for {len(report['missing_days'])} symbols "
+                     f"({sum(report['missing_days'].values()):,} in total): "
+                     + ', '.join(f"{symbol} ({count})" for symbol, count in worst))
+    lines.append("  Timings: " + ', '.join(f"{name} {ms:.1f}ms" for name, ms in report['timings_ms'].items()))
+    return '\n'.join(lines)
+
+
+def quarantine_part_path(output_dir, key):
+    """data-relative 'YYYY-MM/<stem>.yaml' -> <output_dir>/quarantine/YYYY-MM/<stem>.parquet"""
+    return Path(output_dir) / QUARANTINE_DIR / Path(key).with_suffix('.parquet')
+
+
+def write_quarantine(quarantine_df, output_dir, keys):
+    """
+    Write each source file's rejected rows (grouped by 'Source_File') to its
+    quarantine part; files in keys without rejected rows lose any stale part.
+    """
+    rejected = dict(tuple(quarantine_df.groupby('Source_File', sort=False)))
+    for key in keys:
+        part_path = quarantine_part_path(output_dir, key)
+        if key not in rejected:
+            part_path.unlink(missing_ok=True)
+            continue
+        part_path.parent.mkdir(parents=True, exist_ok=True)
+        rejected[key].to_parquet(part_path, index=False)
+
+
+def save_report(report, path):
+    """Write the report as JSON atomically"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    os.replace(tmp_path, path)